@@ -0,0 +1,75 @@
+# -*- mode: python ; coding: utf-8 -*-
+#
+# Fast-start build profile.
+#
+# EmailBot.spec produces a --onefile executable, which unpacks the whole
+# bundle to a temp directory on every launch before main() runs. This
+# profile builds a one-folder app instead (nothing to unpack), strips
+# docstrings/asserts from the bundled bytecode, and leaves out stdlib
+# modules that build/EmailBot/xref-EmailBot.html shows are only pulled in
+# transitively and never used by the app.
+#
+# Build with:  pyinstaller EmailBot-faststart.spec
+# Output:      dist/EmailBot-faststart/EmailBot-faststart(.exe)
+
+# Modules from the xref graph the app never imports at runtime. Keep this
+# in sync when a feature starts using one of them.
+excluded_modules = [
+    # Archive/compression formats (tarfile, lzma, bz2) reached via shutil
+    'tarfile', 'lzma', '_lzma', 'bz2', '_bz2', 'compression',
+    # Network protocols other than SMTP, reached via urllib/netrc
+    'ftplib', 'netrc', 'urllib.request',
+    # Numeric/statistics modules reached via random/fractions
+    'statistics', '_statistics', 'fractions', 'decimal', '_decimal', '_pydecimal',
+    # Developer tooling
+    'pydoc', 'doctest', 'unittest', 'pdb', 'tracemalloc', 'py_compile',
+    'pickle', '_pickle', '_compat_pickle',
+    # CJK codecs; the app only sends UTF-8
+    '_codecs_cn', '_codecs_hk', '_codecs_iso2022', '_codecs_jp',
+    '_codecs_kr', '_codecs_tw', '_multibytecodec',
+    # Never part of the app
+    'xmlrpc', 'sqlite3', 'asyncio', 'multiprocessing', 'lib2to3',
+]
+
+a = Analysis(
+    ['email_generator_bot.py'],
+    pathex=[],
+    binaries=[],
+    datas=[],
+    hiddenimports=[],
+    hookspath=[],
+    hooksconfig={},
+    runtime_hooks=[],
+    excludes=excluded_modules,
+    noarchive=False,
+    optimize=2,
+)
+pyz = PYZ(a.pure)
+
+exe = EXE(
+    pyz,
+    a.scripts,
+    [],
+    exclude_binaries=True,
+    name='EmailBot-faststart',
+    debug=False,
+    bootloader_ignore_signals=False,
+    strip=False,
+    upx=False,
+    console=False,
+    disable_windowed_traceback=False,
+    argv_emulation=False,
+    target_arch=None,
+    codesign_identity=None,
+    entitlements_file=None,
+)
+
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=False,
+    upx_exclude=[],
+    name='EmailBot-faststart',
+)
@@ -0,0 +1,112 @@
+"""
+Broadcast send benchmark
+Sends an announcement to many recipients through a local SMTP sink,
+once as one transaction per recipient and once in broadcast mode,
+reporting transactions, SMTP commands, bytes sent and time for each.
+
+Run from the project root:
+    python benchmarks/bench_broadcast.py [recipients]
+"""
+
+import os
+import smtplib
+import socketserver
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from email_generator_bot import EmailSender, EmailTemplateLibrary
+
+
+class SinkCounters:
+    transactions = 0
+    commands = 0
+    bytes = 0
+    lock = threading.Lock()
+
+
+class SinkHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP to accept mail: counts commands and bytes, stores nothing"""
+    
+    def handle(self):
+        self.wfile.write(b"220 sink ESMTP\r\n")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            self.count(len(line))
+            verb = line[:4].upper()
+            if verb == b"EHLO":
+                self.wfile.write(b"250-sink\r\n250 8BITMIME\r\n")
+            elif verb == b"DATA":
+                self.wfile.write(b"354 go ahead\r\n")
+                size = 0
+                for data_line in self.rfile:
+                    size += len(data_line)
+                    if data_line == b".\r\n":
+                        break
+                with SinkCounters.lock:
+                    SinkCounters.transactions += 1
+                    SinkCounters.bytes += size
+                self.wfile.write(b"250 2.0.0 queued\r\n")
+            elif verb == b"QUIT":
+                self.wfile.write(b"221 bye\r\n")
+                return
+            else:
+                self.wfile.write(b"250 ok\r\n")
+    
+    @staticmethod
+    def count(size: int):
+        with SinkCounters.lock:
+            SinkCounters.commands += 1
+            SinkCounters.bytes += size
+
+
+def announcement(count: int) -> list:
+    """The same formal_communication email for every recipient"""
+    template = EmailTemplateLibrary.get_templates()["formal_communication"]
+    values = {field.name: f"{field.label}" for field in template.fields}
+    message = template.message_for(values)
+    return [dict(message, to_email=f"member{i}@example.com") for i in range(count)]
+
+
+def run(port: int, label: str, send):
+    SinkCounters.transactions = SinkCounters.commands = SinkCounters.bytes = 0
+    server = smtplib.SMTP("127.0.0.1", port)
+    started = time.perf_counter()
+    results = send(server)
+    elapsed = time.perf_counter() - started
+    server.quit()
+    failed = sum(not result.success for result in results)
+    print(f"{label:<14} {SinkCounters.transactions:>12,} {SinkCounters.commands:>10,}"
+          f" {SinkCounters.bytes / 1024:>10,.0f} KiB"
+          f" {elapsed:>9.2f} s" + (f"  ({failed} failed)" if failed else ""))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    messages = announcement(count)
+    
+    sink = socketserver.ThreadingTCPServer(("127.0.0.1", 0), SinkHandler)
+    sink.daemon_threads = True
+    threading.Thread(target=sink.serve_forever, daemon=True).start()
+    port = sink.server_address[1]
+    
+    print(f"{count:,} recipients, identical content")
+    print("-" * 65)
+    print(f"{'mode':<14} {'transactions':>12} {'commands':>10} {'sent':>14} {'time':>11}")
+    try:
+        run(port, "per recipient", lambda server: [
+            EmailSender.send_email("sender@example.com", "", m["to_email"], m["subject"],
+                                   m["body"], html_body=m["html_body"], server=server)
+            for m in messages])
+        run(port, "broadcast", lambda server: EmailSender.send_broadcast(
+            "sender@example.com", "", messages, server=server))
+    finally:
+        sink.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+"""
+GUI screen benchmark
+Builds the real Tk screens and measures construction, show and hide
+times, widget counts and the memory each screen takes, plus the time of
+each navigation step in a running app, then compares the results with a
+stored baseline and exits with status 1 on a regression. When no
+baseline has been recorded yet, the first run records one and passes.
+
+A display is required. On headless Linux the benchmark starts Xvfb
+itself when DISPLAY is unset (or run it under xvfb-run). Run from the
+project root:
+    python benchmarks/bench_gui.py [--runs N] [--tolerance 0.25]
+    python benchmarks/bench_gui.py --save-baseline    # record a new baseline
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BASELINE_FILE = os.path.join(ROOT, "benchmarks", "gui_baseline.json")
+
+# Differences below these are noise, whatever the percentage
+MIN_DELTA_MS = 0.5
+MIN_DELTA_KIB = 64
+
+
+def start_virtual_display():
+    """Start Xvfb on a free display number and point DISPLAY at it"""
+    xvfb = shutil.which("Xvfb")
+    if not xvfb:
+        raise SystemExit("No display and Xvfb not found: install xvfb or run under xvfb-run")
+    read_fd, write_fd = os.pipe()
+    process = subprocess.Popen(
+        [xvfb, "-displayfd", str(write_fd), "-screen", "0", "1280x1024x24", "-nolisten", "tcp"],
+        pass_fds=(write_fd,), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as f:
+        number = f.readline().strip()
+    if not number:
+        process.kill()
+        raise SystemExit("Xvfb did not start")
+    os.environ["DISPLAY"] = f":{number}"
+    return process
+
+
+def rss_kib():
+    """Resident memory of this process, or None where /proc is unavailable"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") // 1024
+
+
+def count_widgets(widget) -> int:
+    return 1 + sum(count_widgets(child) for child in widget.winfo_children())
+
+
+def measure_screen(root, build, runs: int) -> dict:
+    """Median build/show/hide times, widget count and memory for one screen"""
+    build_times, show_times, hide_times, memory = [], [], [], []
+    widgets = 0
+    for _ in range(runs):
+        gc.collect()
+        before = rss_kib()
+        
+        started = time.perf_counter()
+        screen = build()
+        root.update_idletasks()
+        build_times.append(time.perf_counter() - started)
+        
+        started = time.perf_counter()
+        screen.show()
+        root.update()
+        show_times.append(time.perf_counter() - started)
+        
+        widgets = count_widgets(screen.frame)
+        after = rss_kib()
+        if before is not None and after is not None:
+            memory.append(after - before)
+        
+        started = time.perf_counter()
+        screen.hide()
+        root.update()
+        hide_times.append(time.perf_counter() - started)
+        
+        screen.frame.destroy()
+        root.update()
+    
+    return {
+        "build_ms": statistics.median(build_times) * 1000,
+        "show_ms": statistics.median(show_times) * 1000,
+        "hide_ms": statistics.median(hide_times) * 1000,
+        "widgets": widgets,
+        "memory_kib": statistics.median(memory) if memory else None,
+    }
+
+
+def measure_navigation(app, runs: int) -> dict:
+    """Median time of each navigation step, including the redraw"""
+    template_id = "job_application"
+    template = app.templates[template_id]
+    values = {field.name: field.options[0] if field.options else f"{field.label} value"
+              for field in template.fields}
+    values["recipient_email"] = "someone@example.com"
+    
+    steps = [
+        ("category -> form", lambda: app.show_form(template_id)),
+        ("form -> preview", lambda: app.generate_email(values)),
+        ("preview -> settings", app.show_settings),
+        ("settings -> preview", app.back_to_preview),
+        ("preview -> jobs", app.show_jobs),
+        ("jobs -> preview", app.back_to_preview),
+        ("preview -> form", app.back_to_form),
+        ("form -> category", app.show_category_selection),
+    ]
+    samples = {label: [] for label, _ in steps}
+    app.show_category_selection()
+    app.root.update()
+    for _ in range(runs):
+        for label, step in steps:
+            started = time.perf_counter()
+            step()
+            app.root.update()
+            samples[label].append(time.perf_counter() - started)
+    return {label: statistics.median(times) * 1000 for label, times in samples.items()}
+
+
+def run_benchmarks(runs: int) -> dict:
+    from email_generator_bot import (CategorySelectionScreen, EmailGeneratorBot, FormScreen,
+                                     GmailSettingsScreen, JobsScreen, PreviewScreen)
+    
+    app = EmailGeneratorBot()
+    root = app.root
+    app.show_category_selection()
+    root.update()
+    noop = lambda *args: None
+    
+    screens = {
+        "category": lambda: CategorySelectionScreen(root, app.templates, noop),
+        "preview": lambda: PreviewScreen(root, noop, noop, noop, app.scheduler, noop),
+        "settings": lambda: GmailSettingsScreen(root, noop),
+        "jobs": lambda: JobsScreen(root, noop, lambda: None),
+    }
+    for template_id, template in app.templates.items():
+        screens[f"form:{template_id}"] = (
+            lambda template=template, template_id=template_id:
+            FormScreen(root, template, noop, noop, template_id, app.draft_store))
+    
+    # The app's own category screen is covering the window; measure on top of it
+    app.category_screen.hide()
+    results = {"screens": {}, "navigation": {}}
+    for name, build in screens.items():
+        results["screens"][name] = measure_screen(root, build, runs)
+    results["navigation"] = measure_navigation(app, runs)
+    
+    app.on_closing()
+    return results
+
+
+def environment() -> dict:
+    import tkinter
+    
+    return {"python": platform.python_version(), "tk": str(tkinter.TkVersion),
+            "platform": platform.platform(), "display": os.environ.get("DISPLAY", "")}
+
+
+def flatten(results: dict) -> dict:
+    metrics = {}
+    for name, figures in results["screens"].items():
+        for key, value in figures.items():
+            metrics[f"{name} {key}"] = value
+    for step, value in results["navigation"].items():
+        metrics[f"{step} ms"] = value
+    return metrics
+
+
+def is_regression(metric: str, baseline, current, tolerance: float) -> bool:
+    if baseline is None or current is None:
+        return False
+    if metric.endswith("widgets"):
+        return current > baseline
+    minimum = MIN_DELTA_KIB if metric.endswith("memory_kib") else MIN_DELTA_MS
+    return current > baseline * (1 + tolerance) and current - baseline > minimum
+
+
+def report(results: dict, baseline, tolerance: float) -> int:
+    current = flatten(results)
+    previous = flatten(baseline["results"]) if baseline else {}
+    if baseline and baseline.get("environment") != environment():
+        print("Note: the baseline was recorded in a different environment:")
+        print(f"  {baseline.get('environment')}")
+    
+    print(f"{'metric':<44} {'baseline':>10} {'current':>10} {'change':>8}")
+    print("-" * 76)
+    regressions = []
+    for metric, value in current.items():
+        base = previous.get(metric)
+        change = ""
+        if base and value is not None:
+            change = f"{(value - base) / base:+.0%}"
+        flag = ""
+        if is_regression(metric, base, value, tolerance):
+            flag = "  REGRESSION"
+            regressions.append(metric)
+        print(f"{metric:<44} {format_value(base):>10} {format_value(value):>10}"
+              f" {change:>8}{flag}")
+    
+    print("-" * 76)
+    if not baseline:
+        print("No baseline to compare with; these results become the baseline")
+    elif regressions:
+        print(f"{len(regressions)} regression(s) beyond {tolerance:.0%}")
+        return 1
+    else:
+        print(f"No regressions beyond {tolerance:.0%}")
+    return 0
+
+
+def format_value(value) -> str:
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:.2f}"
+    return str(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown before a metric counts as a regression")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help=f"write the results to {os.path.relpath(BASELINE_FILE, ROOT)}")
+    args = parser.parse_args()
+    
+    baseline = None
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE) as f:
+            baseline = json.load(f)
+    
+    xvfb = None
+    if os.name == "posix" and sys.platform != "darwin" and not os.environ.get("DISPLAY"):
+        xvfb = start_virtual_display()
+    
+    # Run in an empty directory so no saved session, draft or template file
+    # changes what gets built
+    workdir = tempfile.mkdtemp(prefix="gui-bench-")
+    os.chdir(workdir)
+    try:
+        results = run_benchmarks(args.runs)
+    finally:
+        os.chdir(ROOT)
+        shutil.rmtree(workdir, ignore_errors=True)
+        if xvfb is not None:
+            xvfb.terminate()
+    
+    status = report(results, baseline, args.tolerance)
+    
+    # The baseline is machine-specific, so a fresh checkout or CI runner
+    # records its own on the first run instead of failing
+    if args.save_baseline or baseline is None:
+        with open(BASELINE_FILE, "w") as f:
+            json.dump({"environment": environment(), "runs": args.runs, "results": results},
+                      f, indent=2)
+        print(f"Baseline saved to {os.path.relpath(BASELINE_FILE, ROOT)}")
+        status = 0
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Startup benchmark: time from process launch to the first window
+Compares the --onefile build (EmailBot.spec), the fast-start one-folder
+build (EmailBot-faststart.spec) and, for reference, running from source.
+
+Build the executables first (setup.py options 1 and 5), then run from
+the project root:
+    python benchmarks/bench_startup.py [--runs N] [--timeout SECONDS]
+
+A display is required (use xvfb-run on headless Linux).
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from email_generator_bot import STARTUP_PROBE_ENV
+
+EXE_SUFFIX = ".exe" if os.name == "nt" else ""
+
+TARGETS = [
+    ("onefile", [os.path.join(ROOT, "dist", "EmailBot" + EXE_SUFFIX)]),
+    ("fast-start", [os.path.join(ROOT, "dist", "EmailBot-faststart",
+                                 "EmailBot-faststart" + EXE_SUFFIX)]),
+    ("source", [sys.executable, os.path.join(ROOT, "email_generator_bot.py")]),
+]
+
+
+def time_first_window(command, timeout: float) -> float:
+    """Launch once and return seconds until the app reported its first window"""
+    with tempfile.TemporaryDirectory() as workdir:
+        probe_path = os.path.join(workdir, "first_window.txt")
+        env = dict(os.environ, **{STARTUP_PROBE_ENV: probe_path})
+        
+        # Run in an empty directory so no saved session skips the splash
+        started = time.time()
+        process = subprocess.Popen(command, cwd=workdir, env=env)
+        try:
+            process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            raise RuntimeError("app did not exit after showing its window")
+        
+        if not os.path.exists(probe_path):
+            raise RuntimeError(f"no startup probe written (exit code {process.returncode})")
+        with open(probe_path) as f:
+            return float(f.read()) - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+    
+    print(f"Time to first window over {args.runs} runs")
+    print("-" * 60)
+    print(f"{'build':<12} {'median':>10} {'min':>10} {'max':>10}")
+    
+    medians = {}
+    for label, command in TARGETS:
+        if not os.path.exists(command[-1]):
+            print(f"{label:<12} skipped (not found: {os.path.relpath(command[-1], ROOT)})")
+            continue
+        
+        try:
+            # One untimed launch warms the OS file cache for both builds alike
+            time_first_window(command, args.timeout)
+            samples = [time_first_window(command, args.timeout) for _ in range(args.runs)]
+        except RuntimeError as e:
+            print(f"{label:<12} failed: {e}")
+            continue
+        medians[label] = statistics.median(samples)
+        print(f"{label:<12} {medians[label] * 1000:>8.0f}ms {min(samples) * 1000:>8.0f}ms"
+              f" {max(samples) * 1000:>8.0f}ms")
+    
+    if "onefile" in medians and "fast-start" in medians:
+        print("-" * 60)
+        print(f"fast-start starts in {medians['fast-start'] / medians['onefile']:.0%}"
+              f" of the onefile time")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Template library memory benchmark
+Measures memory and load time per 1,000 templates, comparing the
+interned, slotted definitions against plain dict-based field lists.
+
+Run from the project root:
+    python benchmarks/bench_template_memory.py [count]
+"""
+
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from email_generator_bot import EmailTemplate, EmailTemplateLibrary
+
+
+class DictFieldTemplate:
+    """Pre-interning layout: a regular object holding a list of field dicts"""
+    
+    def __init__(self, name, template, fields):
+        self.name = name
+        self.template = template
+        self.fields = fields
+
+
+def template_documents(count: int) -> list:
+    """Serialized template definitions, as a file-based library would store them"""
+    library = list(EmailTemplateLibrary.get_templates().values())
+    documents = []
+    for i in range(count):
+        base = library[i % len(library)]
+        documents.append(json.dumps({
+            "name": f"{base.name} #{i}",
+            "template": f"{base.template}\n\n-- variant {i}",
+            "fields": [field.to_dict() for field in base.fields],
+        }))
+    return documents
+
+
+def measure(factory, documents: list):
+    """Return (bytes retained, seconds) for loading every document"""
+    gc.collect()
+    tracemalloc.start()
+    start_bytes = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    
+    templates = []
+    for document in documents:
+        spec = json.loads(document)
+        templates.append(factory(spec["name"], spec["template"], spec["fields"]))
+    
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - start_bytes
+    tracemalloc.stop()
+    
+    # Keep the templates alive until after the measurement
+    del templates
+    return retained, elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    scale = 1000 / count
+    
+    documents = template_documents(count)
+    
+    # Warm the field registry so the measured run reflects a loaded library
+    measure(EmailTemplate, documents[:5])
+    
+    # Template text is unique per variant in both layouts, so report the
+    # definition overhead on top of it as well
+    text_bytes = sum(sys.getsizeof(json.loads(document)["template"])
+                     + sys.getsizeof(json.loads(document)["name"])
+                     for document in documents)
+    
+    print(f"Loading {count} templates (figures per 1,000 templates)")
+    print("-" * 72)
+    print(f"{'layout':<18} {'total':>12} {'excl. text':>14} {'load time':>14}")
+    for label, factory in (("dict fields", DictFieldTemplate),
+                           ("interned fields", EmailTemplate)):
+        retained, elapsed = measure(factory, documents)
+        overhead = max(retained - text_bytes, 0)
+        print(f"{label:<18} {retained * scale / 1024:>8.1f} KiB {overhead * scale / 1024:>10.1f} KiB"
+              f" {elapsed * scale * 1000:>11.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
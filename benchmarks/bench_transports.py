@@ -0,0 +1,81 @@
+"""
+Local transport export benchmark
+Renders a mail merge and writes it to the mbox, Maildir and .eml spool
+transports, fully offline, reporting messages per second for each.
+
+Run from the project root:
+    python benchmarks/bench_transports.py [count]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from email_generator_bot import (EmailTemplateLibrary, MaildirTransport, MboxTransport,
+                                 SpoolTransport)
+
+
+def merge_messages(count: int) -> list:
+    """Render one message per recipient from the first library template"""
+    template = next(iter(EmailTemplateLibrary.get_templates().values()))
+    messages = []
+    for i in range(count):
+        values = {field.name: f"{field.label} {i}" for field in template.fields}
+        content = template.generate(values)
+        subject = f"Merge message {i}"
+        body = content
+        if content.startswith("Subject: "):
+            subject, _, body = content[len("Subject: "):].partition("\n")
+            body = body.lstrip("\n")
+        messages.append({"to_email": f"recipient{i}@example.com",
+                         "subject": subject, "body": body})
+    return messages
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    
+    started = time.perf_counter()
+    messages = merge_messages(count)
+    render_time = time.perf_counter() - started
+    print(f"Rendered {count} messages in {render_time:.2f} s")
+    print("-" * 56)
+    print(f"{'transport':<12} {'seconds':>10} {'msg/s':>12} {'on disk':>14}")
+    
+    root = tempfile.mkdtemp(prefix="transport-bench-")
+    try:
+        for label, factory, target in (
+                ("mbox", MboxTransport, "export.mbox"),
+                ("maildir", MaildirTransport, "Maildir"),
+                ("spool", SpoolTransport, "spool")):
+            path = os.path.join(root, target)
+            started = time.perf_counter()
+            with factory(path, "sender@example.com") as transport:
+                results = transport.send_batch(messages)
+            elapsed = time.perf_counter() - started
+            
+            failed = sum(not result.success for result in results)
+            if failed:
+                print(f"{label}: {failed} messages failed, e.g. "
+                      f"{next(r for r in results if not r.success).message}")
+            print(f"{label:<12} {elapsed:>10.2f} {count / elapsed:>12,.0f}"
+                  f" {disk_usage(path) / 1024 / 1024:>10.1f} MiB")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def disk_usage(path: str) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for directory, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(directory, name)) for name in files)
+    return total
+
+
+if __name__ == "__main__":
+    main()
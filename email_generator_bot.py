@@ -5,150 +5,4051 @@ without AI or internet connectivity.
 """
 
 import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext
+from tkinter import ttk, messagebox, scrolledtext, filedialog, simpledialog
 import json
+import re
+import hashlib
+import sys
+import time
+import zlib
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 import os
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+import threading
+from collections import OrderedDict
+from functools import lru_cache
 import base64
 
+# smtplib, email.mime, html.parser, mimetypes, mmap and tempfile are only
+# needed once the user sends, attaches or saves something, so they are
+# imported where used to keep them off the startup path
+
+
+# Set by benchmarks/bench_startup.py: the app writes the time its first
+# window appeared to this path and exits
+STARTUP_PROBE_ENV = "EMAILBOT_STARTUP_PROBE"
+
 
 class GmailConfig:
     """Manages Gmail SMTP configuration and credentials"""
     
-    CONFIG_FILE = "gmail_config.dat"
+    CONFIG_FILE = "gmail_config.dat"
+    ACCOUNTS_FILE = "sender_accounts.json"
+    DEFAULT_HOST = "smtp.gmail.com"
+    DEFAULT_PORT = 587
+    # Gmail's documented daily limit for regular accounts
+    DEFAULT_DAILY_LIMIT = 500
+    DEFAULT_CONNECT_TIMEOUT = 10.0
+    DEFAULT_READ_TIMEOUT = 30.0
+    
+    @staticmethod
+    def save_credentials(email: str, app_password: str,
+                         connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+                         read_timeout: float = DEFAULT_READ_TIMEOUT):
+        """Save Gmail credentials (encoded for basic obfuscation)"""
+        data = {
+            "email": base64.b64encode(email.encode()).decode(),
+            "password": base64.b64encode(app_password.encode()).decode(),
+            "connect_timeout": connect_timeout,
+            "read_timeout": read_timeout
+        }
+        try:
+            with open(GmailConfig.CONFIG_FILE, 'w') as f:
+                json.dump(data, f)
+            return True
+        except Exception as e:
+            print(f"Error saving credentials: {e}")
+            return False
+    
+    @staticmethod
+    def load_credentials() -> Optional[Dict[str, str]]:
+        """Load saved Gmail credentials"""
+        try:
+            if os.path.exists(GmailConfig.CONFIG_FILE):
+                with open(GmailConfig.CONFIG_FILE, 'r') as f:
+                    data = json.load(f)
+                return {
+                    "email": base64.b64decode(data["email"]).decode(),
+                    "password": base64.b64decode(data["password"]).decode()
+                }
+        except Exception as e:
+            print(f"Error loading credentials: {e}")
+        return None
+    
+    @staticmethod
+    def load_timeouts() -> Tuple[float, float]:
+        """Load the saved (connect, read) timeouts in seconds"""
+        try:
+            if os.path.exists(GmailConfig.CONFIG_FILE):
+                with open(GmailConfig.CONFIG_FILE, 'r') as f:
+                    data = json.load(f)
+                return (float(data.get("connect_timeout", GmailConfig.DEFAULT_CONNECT_TIMEOUT)),
+                        float(data.get("read_timeout", GmailConfig.DEFAULT_READ_TIMEOUT)))
+        except Exception as e:
+            print(f"Error loading timeouts: {e}")
+        return GmailConfig.DEFAULT_CONNECT_TIMEOUT, GmailConfig.DEFAULT_READ_TIMEOUT
+    
+    @staticmethod
+    def delete_credentials():
+        """Delete saved credentials"""
+        try:
+            if os.path.exists(GmailConfig.CONFIG_FILE):
+                os.remove(GmailConfig.CONFIG_FILE)
+            return True
+        except Exception as e:
+            print(f"Error deleting credentials: {e}")
+            return False
+    
+    @staticmethod
+    def save_accounts(accounts: Sequence[Dict]) -> bool:
+        """
+        Save additional sender accounts
+        
+        Each account is a dict with email and password, and optionally
+        host, port, weight and daily_limit for other relays.
+        """
+        data = []
+        for account in accounts:
+            entry = dict(account)
+            entry["email"] = base64.b64encode(account["email"].encode()).decode()
+            entry["password"] = base64.b64encode(account["password"].encode()).decode()
+            data.append(entry)
+        try:
+            with open(GmailConfig.ACCOUNTS_FILE, 'w') as f:
+                json.dump(data, f, indent=2)
+            return True
+        except Exception as e:
+            print(f"Error saving accounts: {e}")
+            return False
+    
+    @staticmethod
+    def load_accounts() -> List[Dict]:
+        """Load every sender account, the saved Gmail credentials first"""
+        accounts = []
+        credentials = GmailConfig.load_credentials()
+        if credentials:
+            accounts.append(credentials)
+        
+        try:
+            if os.path.exists(GmailConfig.ACCOUNTS_FILE):
+                with open(GmailConfig.ACCOUNTS_FILE, 'r') as f:
+                    data = json.load(f)
+                for entry in data:
+                    account = dict(entry)
+                    account["email"] = base64.b64decode(entry["email"]).decode()
+                    account["password"] = base64.b64decode(entry["password"]).decode()
+                    accounts.append(account)
+        except Exception as e:
+            print(f"Error loading accounts: {e}")
+        
+        # The same login on the same relay is one account
+        unique = {}
+        for account in accounts:
+            key = (account["email"].lower(), account.get("host", GmailConfig.DEFAULT_HOST),
+                   int(account.get("port", GmailConfig.DEFAULT_PORT)))
+            unique.setdefault(key, account)
+        return list(unique.values())
+
+
+class DraftStore:
+    """Autosaves form drafts per template from a background writer thread"""
+    
+    DRAFTS_DIR = "drafts"
+    
+    def __init__(self, directory: str = DRAFTS_DIR):
+        self.directory = directory
+        self._pending = {}
+        self._writing = False
+        self._closing = False
+        self._cond = threading.Condition()
+        self._thread = None
+    
+    def path_for(self, template_id: str) -> str:
+        """Draft file path for a template"""
+        safe_id = re.sub(r"[^\w-]", "_", template_id)
+        return os.path.join(self.directory, f"{safe_id}.json")
+    
+    def load(self, template_id: str) -> Optional[Dict[str, str]]:
+        """Load the saved draft for a template, including unsaved edits"""
+        with self._cond:
+            if template_id in self._pending:
+                return dict(self._pending[template_id])
+        try:
+            with open(self.path_for(template_id), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                return {str(k): str(v) for k, v in data.items()}
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Error loading draft: {e}")
+        return None
+    
+    def save(self, template_id: str, values: Dict[str, str]):
+        """Queue a draft for writing; newer edits replace queued ones"""
+        with self._cond:
+            self._pending[template_id] = dict(values)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="DraftWriter",
+                                                daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+    
+    def delete(self, template_id: str, timeout: float = 2.0):
+        """Discard the draft for a template"""
+        with self._cond:
+            self._pending.pop(template_id, None)
+            # A write already in progress would recreate the file
+            self._cond.wait_for(lambda: not self._writing, timeout)
+        try:
+            os.remove(self.path_for(template_id))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Error deleting draft: {e}")
+    
+    def flush(self, timeout: float = 2.0) -> bool:
+        """Wait until every queued draft has been written"""
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: not self._pending and not self._writing, timeout)
+    
+    def close(self):
+        """Flush outstanding drafts and stop the writer thread"""
+        self.flush()
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+    
+    def _run(self):
+        """Writer loop: take every queued draft and write it out"""
+        while True:
+            with self._cond:
+                while not self._pending and not self._closing:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                batch = self._pending
+                self._pending = {}
+                self._writing = True
+            
+            for template_id, values in batch.items():
+                self._write(template_id, values)
+            
+            with self._cond:
+                self._writing = False
+                self._cond.notify_all()
+    
+    def _write(self, template_id: str, values: Dict[str, str]):
+        """Write one draft atomically via a temp file and rename"""
+        import tempfile
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(values, f)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp_path, self.path_for(template_id))
+            except BaseException:
+                os.remove(temp_path)
+                raise
+        except Exception as e:
+            print(f"Error saving draft: {e}")
+
+
+class ValidationReport:
+    """Result of validating a batch of recipient addresses"""
+    
+    def __init__(self):
+        self.valid = []        # normalized addresses, in input order
+        self.valid_rows = []   # input row index of each valid address
+        self.rejected = []     # (row, raw value, reason)
+        self.duplicates = []   # (row, normalized address, first row)
+        self.seen = {}         # lower-cased address -> first row, for continuing
+    
+    @property
+    def total(self) -> int:
+        return len(self.valid) + len(self.rejected) + len(self.duplicates)
+    
+    def summary(self) -> str:
+        """Short human-readable summary"""
+        return (f"{len(self.valid)} valid, {len(self.rejected)} rejected, "
+                f"{len(self.duplicates)} duplicates out of {self.total}")
+    
+    def rejection_lines(self, limit: int = 10) -> List[str]:
+        """Describe the first few rejected rows"""
+        lines = [f"Row {row + 1}: '{raw}' - {reason}"
+                 for row, raw, reason in self.rejected[:limit]]
+        if len(self.rejected) > limit:
+            lines.append(f"... and {len(self.rejected) - limit} more")
+        return lines
+    
+    def write_report(self, path: str):
+        """Write rejected and duplicate rows to a CSV report"""
+        import csv
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(["row", "value", "problem"])
+            for row, raw, reason in self.rejected:
+                writer.writerow([row + 1, raw, reason])
+            for row, address, first_row in self.duplicates:
+                writer.writerow([row + 1, address, f"duplicate of row {first_row + 1}"])
+
+
+class RecipientValidator:
+    """Validates, normalizes and de-duplicates recipient addresses in bulk"""
+    
+    _ATOM = r"[A-Za-z0-9!#$%&'*+/=?^_`{|}~-]+"
+    _LABEL = r"[A-Za-z0-9](?:[A-Za-z0-9-]{0,61}[A-Za-z0-9])?"
+    LOCAL_PART_MATCH = re.compile(rf"{_ATOM}(?:\.{_ATOM})*").fullmatch
+    DOMAIN_MATCH = re.compile(
+        rf"(?:{_LABEL}\.)+(?:[A-Za-z]{{2,63}}|xn--[A-Za-z0-9-]{{1,59}})").fullmatch
+    SEPARATOR_PATTERN = re.compile(r"[,;]")
+    
+    MAX_LOCAL_LENGTH = 64
+    MAX_ADDRESS_LENGTH = 254
+    
+    @staticmethod
+    @lru_cache(maxsize=65536)
+    def normalize_domain(domain: str) -> Tuple[Optional[str], str]:
+        """
+        Case-fold and IDNA-encode a domain, caching the result
+        
+        Returns:
+            tuple: (ascii domain or None, rejection reason)
+        """
+        domain = domain.rstrip(".")
+        if not domain.isascii():
+            try:
+                domain = domain.encode("idna").decode("ascii")
+            except UnicodeError:
+                return None, "invalid internationalized domain"
+        domain = domain.lower()
+        if len(domain) > 253 or not RecipientValidator.DOMAIN_MATCH(domain):
+            return None, "invalid domain"
+        return domain, ""
+    
+    @classmethod
+    def normalize(cls, address: str) -> Tuple[Optional[str], str]:
+        """
+        Normalize a single address
+        
+        Returns:
+            tuple: (normalized address or None, rejection reason)
+        """
+        address = address.strip()
+        if not address:
+            return None, "empty address"
+        if "<" in address:
+            # Accept "Name <user@example.com>" and keep just the address
+            start = address.rfind("<")
+            end = address.find(">", start)
+            if end == -1:
+                return None, "unbalanced angle brackets"
+            address = address[start + 1:end].strip()
+        
+        local, at, domain = address.rpartition("@")
+        if not at or not local or not domain:
+            return None, "missing '@'"
+        if len(local) > cls.MAX_LOCAL_LENGTH:
+            return None, "local part too long"
+        if not local.isascii():
+            return None, "non-ASCII local part"
+        if not cls.LOCAL_PART_MATCH(local):
+            return None, "invalid characters in local part"
+        
+        domain, reason = cls.normalize_domain(domain)
+        if domain is None:
+            return None, reason
+        
+        address = f"{local}@{domain}"
+        if len(address) > cls.MAX_ADDRESS_LENGTH:
+            return None, "address too long"
+        return address, ""
+    
+    @classmethod
+    def validate_many(cls, addresses: Iterable[str],
+                      report: Optional[ValidationReport] = None) -> ValidationReport:
+        """
+        Validate a whole merge column in one pass
+        
+        Passing the report of an earlier call continues it: rows are
+        numbered on from its total and duplicates are caught across calls.
+        """
+        if report is None:
+            report = ValidationReport()
+        normalize = cls.normalize
+        valid_append = report.valid.append
+        row_append = report.valid_rows.append
+        rejected_append = report.rejected.append
+        duplicate_append = report.duplicates.append
+        seen = report.seen
+        
+        for row, raw in enumerate(addresses, report.total):
+            address, reason = normalize(raw)
+            if address is None:
+                rejected_append((row, raw, reason))
+                continue
+            # Local parts are matched case-insensitively, as every major provider does
+            key = address.lower()
+            first_row = seen.get(key)
+            if first_row is not None:
+                duplicate_append((row, address, first_row))
+                continue
+            seen[key] = row
+            valid_append(address)
+            row_append(row)
+        
+        return report
+    
+    @classmethod
+    def split_recipients(cls, field: str) -> List[str]:
+        """Split a To: field on commas or semicolons"""
+        return [part for part in cls.SEPARATOR_PATTERN.split(field) if part.strip()]
+
+
+class AttachmentCache:
+    """Encodes file attachments once and shares the MIME parts between messages"""
+    
+    # 57 raw bytes encode to one 76-character base64 line, so chunks that are
+    # a multiple of 57 can be encoded independently and simply concatenated
+    CHUNK_SIZE = 57 * 1024
+    MAX_CACHE_BYTES = 64 * 1024 * 1024
+    
+    def __init__(self, max_bytes: int = MAX_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._parts = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _cache_key(path: str) -> tuple:
+        """Build a cache key from the file path and its modification time"""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        return (path, stat.st_mtime_ns, stat.st_size)
+    
+    @classmethod
+    def encode_file(cls, path: str) -> str:
+        """Base64-encode a file in chunks through a read-only memory map"""
+        import mmap
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return ""
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                chunks = []
+                for offset in range(0, len(mapped), cls.CHUNK_SIZE):
+                    chunks.append(base64.encodebytes(mapped[offset:offset + cls.CHUNK_SIZE]))
+        return b"".join(chunks).decode("ascii")
+    
+    @staticmethod
+    def build_part(path: str, encoded: str) -> "MIMEBase":
+        """Wrap an already-encoded payload in a MIME attachment part"""
+        import mimetypes
+        from email.mime.base import MIMEBase
+        
+        ctype, encoding = mimetypes.guess_type(path)
+        if ctype is None or encoding is not None:
+            ctype = "application/octet-stream"
+        maintype, subtype = ctype.split("/", 1)
+        
+        part = MIMEBase(maintype, subtype)
+        part.set_payload(encoded)
+        part['Content-Transfer-Encoding'] = 'base64'
+        part.add_header('Content-Disposition', 'attachment',
+                        filename=os.path.basename(path))
+        return part
+    
+    def get_part(self, path: str) -> "MIMEBase":
+        """Return the MIME part for a file, encoding it only on a cache miss"""
+        key = self._cache_key(path)
+        with self._lock:
+            part = self._parts.get(key)
+            if part is not None:
+                self._parts.move_to_end(key)
+                return part
+        
+        encoded = self.encode_file(key[0])
+        part = self.build_part(key[0], encoded)
+        
+        with self._lock:
+            if key not in self._parts:
+                self._parts[key] = part
+                self._size += len(encoded)
+                # Evict least recently used parts once over budget
+                while self._size > self.max_bytes and len(self._parts) > 1:
+                    _, old_part = self._parts.popitem(last=False)
+                    self._size -= len(old_part.get_payload())
+            return self._parts[key]
+    
+    def clear(self):
+        """Drop every cached part"""
+        with self._lock:
+            self._parts.clear()
+            self._size = 0
+
+
+def credential_fingerprint(from_email: str, app_password: str) -> str:
+    """Stable, non-reversible identifier for a set of credentials"""
+    return hashlib.sha256(f"{from_email}\0{app_password}".encode("utf-8")).hexdigest()
+
+
+class AuthStatusCache:
+    """Remembers whether credentials recently authenticated, by fingerprint"""
+    
+    VERIFIED_TTL = 3600.0
+    REJECTED_TTL = 600.0
+    
+    _entries = {}
+    _lock = threading.Lock()
+    
+    @classmethod
+    def record(cls, from_email: str, app_password: str, verified: bool, detail: str = ""):
+        with cls._lock:
+            cls._entries[credential_fingerprint(from_email, app_password)] = (
+                verified, time.time(), detail)
+    
+    @classmethod
+    def lookup(cls, from_email: str, app_password: str) -> Optional[tuple]:
+        """
+        Cached status for these credentials
+        
+        Returns:
+            tuple: (verified: bool, checked_at: float, detail: str), or None
+            when unknown or expired
+        """
+        fingerprint = credential_fingerprint(from_email, app_password)
+        with cls._lock:
+            entry = cls._entries.get(fingerprint)
+            if entry is None:
+                return None
+            ttl = cls.VERIFIED_TTL if entry[0] else cls.REJECTED_TTL
+            if time.time() - entry[1] > ttl:
+                del cls._entries[fingerprint]
+                return None
+            return entry
+    
+    @classmethod
+    def forget(cls, from_email: str, app_password: str):
+        with cls._lock:
+            cls._entries.pop(credential_fingerprint(from_email, app_password), None)
+
+
+class SendResult:
+    """
+    Outcome of sending one message
+    
+    Unpacks like the old (success, message) tuple, and also carries the
+    SMTP reply code and a category for retry decisions:
+    "sent", "transient", "rate_limited", "quota", "auth", "permanent"
+    or "invalid".
+    """
+    
+    __slots__ = ("success", "message", "code", "enhanced_code", "category")
+    
+    RETRYABLE = ("transient", "rate_limited")
+    
+    ENHANCED_CODE_SEARCH = re.compile(r"\b([245]\.\d{1,3}\.\d{1,3})\b").search
+    RATE_LIMIT_SEARCH = re.compile(
+        r"rate limit|too many|try again later|temporarily deferred|unusual", re.I).search
+    
+    def __init__(self, success: bool, message: str, code: Optional[int] = None,
+                 enhanced_code: str = "", category: str = ""):
+        self.success = success
+        self.message = message
+        self.code = code
+        self.enhanced_code = enhanced_code
+        self.category = category or ("sent" if success else "permanent")
+    
+    def __iter__(self):
+        yield self.success
+        yield self.message
+    
+    def __repr__(self):
+        return f"SendResult({self.category}, {self.code}, {self.message!r})"
+    
+    @property
+    def retryable(self) -> bool:
+        return self.category in self.RETRYABLE
+    
+    @classmethod
+    def sent(cls) -> "SendResult":
+        return cls(True, "Email sent successfully!", 250, "2.0.0", "sent")
+    
+    @classmethod
+    def invalid(cls, message: str) -> "SendResult":
+        return cls(False, message, None, "", "invalid")
+    
+    @classmethod
+    def from_reply(cls, code: Optional[int], text: str, message: str) -> "SendResult":
+        """Classify an SMTP reply code and text"""
+        match = cls.ENHANCED_CODE_SEARCH(text)
+        enhanced = match.group(1) if match else ""
+        
+        if code is None:
+            category = "transient"
+        elif enhanced == "5.4.5" or (code == 550 and "quota" in text.lower()):
+            # Daily sending limit: nothing will succeed until it resets
+            category = "quota"
+        elif code in (421, 454) or enhanced.startswith("4.7.") or (
+                400 <= code < 500 and cls.RATE_LIMIT_SEARCH(text)):
+            category = "rate_limited"
+        elif code == 535 or enhanced.startswith("5.7.8"):
+            category = "auth"
+        elif 400 <= code < 500:
+            category = "transient"
+        else:
+            category = "permanent"
+        return cls(False, message, code, enhanced, category)
+    
+    @classmethod
+    def from_exception(cls, error: Exception) -> "SendResult":
+        """Classify an exception raised while talking to the server"""
+        import smtplib
+        
+        message = EmailSender.describe_error(error)
+        if isinstance(error, smtplib.SMTPRecipientsRefused):
+            # Report the first refused recipient's reply
+            for code, text in error.recipients.values():
+                return cls.from_reply(code, cls._text(text), message)
+            return cls(False, message, None, "", "permanent")
+        if isinstance(error, smtplib.SMTPResponseException):
+            return cls.from_reply(error.smtp_code, cls._text(error.smtp_error), message)
+        if isinstance(error, (smtplib.SMTPServerDisconnected, OSError)):
+            # Dropped connections, timeouts and DNS failures are worth retrying
+            return cls(False, message, None, "", "transient")
+        return cls(False, message, None, "", "permanent")
+    
+    @staticmethod
+    def _text(text) -> str:
+        if isinstance(text, bytes):
+            return text.decode("utf-8", "replace")
+        return str(text)
+
+
+class RetryPolicy:
+    """Decides whether and when a failed send is retried"""
+    
+    def __init__(self, max_attempts: int = 5, base_delay: float = 2.0,
+                 max_delay: float = 600.0, rate_limit_delay: float = 60.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.rate_limit_delay = rate_limit_delay
+    
+    def next_delay(self, attempt: int, result: SendResult) -> Optional[float]:
+        """
+        Seconds to wait before the next attempt, or None to give up
+        
+        `attempt` counts the attempts made so far (1 after the first
+        failure). Delays use exponential backoff with full jitter so
+        many failing messages do not retry in lockstep.
+        """
+        import random
+        
+        if not result.retryable or attempt >= self.max_attempts:
+            return None
+        ceiling = min(self.max_delay, self.base_delay * (2 ** attempt))
+        delay = random.uniform(0, ceiling)
+        if result.category == "rate_limited":
+            delay = max(delay, self.rate_limit_delay)
+        return delay
+
+
+class SendThrottle:
+    """
+    Pipeline-wide brake for rate-limit replies
+    
+    One rate-limit reply pauses every sender sharing the throttle, with
+    the pause doubling on repeated limits and relaxing again as sends
+    succeed, so a throttled server is not hammered by parallel retries.
+    """
+    
+    def __init__(self, initial_pause: float = 30.0, max_pause: float = 900.0):
+        self.initial_pause = initial_pause
+        self.max_pause = max_pause
+        self._pause = 0.0
+        self._resume_at = 0.0
+        self._lock = threading.Lock()
+    
+    def remaining(self) -> float:
+        """Seconds until sending may resume"""
+        return max(0.0, self._resume_at - time.time())
+    
+    def wait(self, cancelled: Optional[threading.Event] = None):
+        """Block while the pipeline is paused"""
+        while True:
+            delay = self.remaining()
+            if delay <= 0:
+                return
+            if cancelled is not None:
+                if cancelled.wait(delay):
+                    return
+            else:
+                time.sleep(delay)
+    
+    def record(self, result: SendResult):
+        """Feed a send outcome into the throttle"""
+        with self._lock:
+            if result.category in ("rate_limited", "quota"):
+                self._pause = min(self.max_pause,
+                                  self._pause * 2 if self._pause else self.initial_pause)
+                self._resume_at = max(self._resume_at, time.time() + self._pause)
+            elif result.success and self._pause:
+                self._pause = self._pause / 2 if self._pause > self.initial_pause / 4 else 0.0
+
+
+class EmailSender:
+    """Handles email sending via Gmail SMTP"""
+    
+    attachment_cache = AttachmentCache()
+    # Recipients per message Gmail accepts over SMTP
+    BROADCAST_MAX_RECIPIENTS = 100
+    BROADCAST_TO = "undisclosed-recipients:;"
+    
+    @staticmethod
+    def build_message(from_email: str, to_email: str, subject: str, body: str,
+                      attachments: Optional[Sequence[str]] = None,
+                      html_body: Optional[str] = None) -> "MIMEMultipart":
+        """Build the MIME message, reusing cached attachment parts"""
+        from email.mime.text import MIMEText
+        from email.mime.multipart import MIMEMultipart
+        
+        if html_body:
+            # Plain text first so clients that prefer it still pick it
+            alternative = MIMEMultipart('alternative', boundary=EmailSender.new_boundary())
+            alternative.attach(MIMEText(body, 'plain'))
+            alternative.attach(MIMEText(html_body, 'html'))
+        
+        if html_body and not attachments:
+            msg = alternative
+        else:
+            msg = MIMEMultipart(boundary=EmailSender.new_boundary())
+            msg.attach(alternative if html_body else MIMEText(body, 'plain'))
+        
+        msg['From'] = from_email
+        msg['To'] = to_email
+        msg['Subject'] = subject
+        
+        # Add attachments
+        for path in attachments or ():
+            msg.attach(EmailSender.attachment_cache.get_part(path))
+        
+        return msg
+    
+    @staticmethod
+    def new_boundary() -> str:
+        """
+        Random MIME boundary
+        
+        128 random bits cannot plausibly occur in the content, which saves
+        the generator from scanning every part with a freshly compiled
+        regex to pick one.
+        """
+        return f"==============={os.urandom(16).hex()}=="
+    
+    @staticmethod
+    def check_recipients(to_email: str) -> tuple:
+        """
+        Validate and normalize a To field
+        
+        Returns:
+            tuple: (normalized To field or None, error message)
+        """
+        report = RecipientValidator.validate_many(
+            RecipientValidator.split_recipients(to_email))
+        if report.rejected or not report.valid:
+            problems = "\n".join(report.rejection_lines()) or "No recipient address given."
+            return None, f"Invalid recipient address:\n{problems}"
+        return ", ".join(report.valid), ""
+    
+    @staticmethod
+    def prepare_message(from_email: str, to_email: str, subject: str, body: str,
+                        attachments: Optional[Sequence[str]] = None,
+                        html_body: Optional[str] = None) -> tuple:
+        """
+        Validate recipients and build the MIME message
+        
+        Returns:
+            tuple: (message or None, error message)
+        """
+        # Reject bad recipients before spending a round trip on them
+        to_email, error = EmailSender.check_recipients(to_email)
+        if to_email is None:
+            return None, error
+        
+        try:
+            msg = EmailSender.build_message(from_email, to_email, subject,
+                                            body, attachments, html_body)
+        except OSError as e:
+            return None, f"Could not read attachment: {str(e)}"
+        return msg, ""
+    
+    @staticmethod
+    def connect(from_email: str, app_password: str,
+                connect_timeout: Optional[float] = None,
+                read_timeout: Optional[float] = None,
+                progress=None, host: str = GmailConfig.DEFAULT_HOST,
+                port: int = GmailConfig.DEFAULT_PORT) -> "smtplib.SMTP":
+        """
+        Open an authenticated SMTP session (Gmail unless another relay is given)
+        
+        `progress(stage, server)` is called before each handshake step;
+        closing `server` from another thread aborts the handshake.
+        The outcome of the login is recorded in AuthStatusCache.
+        """
+        import smtplib
+        
+        if connect_timeout is None or read_timeout is None:
+            saved_connect, saved_read = GmailConfig.load_timeouts()
+            connect_timeout = connect_timeout or saved_connect
+            read_timeout = read_timeout or saved_read
+        
+        server = smtplib.SMTP(timeout=connect_timeout)
+        
+        # Connect to Gmail SMTP server
+        if progress:
+            progress(f"Connecting to {host}...", server)
+        server.connect(host, port)
+        server.sock.settimeout(read_timeout)
+        
+        if progress:
+            progress("Starting TLS...", server)
+        server.starttls()
+        
+        # Login
+        if progress:
+            progress("Authenticating...", server)
+        try:
+            server.login(from_email, app_password)
+        except smtplib.SMTPAuthenticationError as e:
+            AuthStatusCache.record(from_email, app_password, False,
+                                   SendResult._text(e.smtp_error))
+            server.close()
+            raise
+        AuthStatusCache.record(from_email, app_password, True)
+        return server
+    
+    @staticmethod
+    def describe_error(error: Exception) -> str:
+        """Turn a sending exception into a user-facing message"""
+        import smtplib
+        
+        if isinstance(error, smtplib.SMTPAuthenticationError):
+            return "Authentication failed. Please check your email and app password."
+        if isinstance(error, smtplib.SMTPException):
+            return f"SMTP error: {str(error)}"
+        return f"Error sending email: {str(error)}"
+    
+    @staticmethod
+    def send_email(from_email: str, app_password: str, to_email: str, 
+                   subject: str, body: str,
+                   attachments: Optional[Sequence[str]] = None,
+                   html_body: Optional[str] = None, server=None) -> SendResult:
+        """
+        Send email using Gmail SMTP
+        
+        An already-authenticated `server` session may be passed in; it is
+        used as-is and left open for the caller.
+        
+        Returns:
+            SendResult: unpacks as (success: bool, message: str)
+        """
+        # Create message
+        msg, error = EmailSender.prepare_message(from_email, to_email, subject,
+                                                 body, attachments, html_body)
+        if msg is None:
+            return SendResult.invalid(error)
+        
+        try:
+            if server is not None:
+                server.send_message(msg)
+                return SendResult.sent()
+            
+            server = EmailSender.connect(from_email, app_password)
+            
+            # Send email
+            server.send_message(msg)
+            server.quit()
+            
+            return SendResult.sent()
+            
+        except Exception as e:
+            return SendResult.from_exception(e)
+    
+    @staticmethod
+    def send_batch(from_email: str, app_password: str,
+                   messages: Sequence[Dict], host: str = GmailConfig.DEFAULT_HOST,
+                   port: int = GmailConfig.DEFAULT_PORT) -> List[SendResult]:
+        """
+        Send several messages over a single SMTP session
+        
+        Each message is a dict with to_email, subject, body and optionally
+        attachments and html_body.
+        
+        Returns:
+            list: one SendResult per message
+        """
+        results = [None] * len(messages)
+        prepared = []
+        for index, message in enumerate(messages):
+            msg, error = EmailSender.prepare_message(
+                from_email,
+                message["to_email"],
+                message["subject"],
+                message["body"],
+                message.get("attachments"),
+                message.get("html_body")
+            )
+            if msg is None:
+                results[index] = SendResult.invalid(error)
+            else:
+                prepared.append((index, msg))
+        
+        if prepared:
+            try:
+                server = EmailSender.connect(from_email, app_password, host=host, port=port)
+            except Exception as e:
+                result = SendResult.from_exception(e)
+                for index, _ in prepared:
+                    results[index] = result
+                return results
+            
+            for position, (index, msg) in enumerate(prepared):
+                try:
+                    server.send_message(msg)
+                    results[index] = SendResult.sent()
+                except Exception as e:
+                    results[index] = SendResult.from_exception(e)
+                    if not EmailSender.is_connected(server):
+                        # The session is gone; the rest were never attempted
+                        unsent = SendResult(False, results[index].message, None, "", "transient")
+                        for rest_index, _ in prepared[position + 1:]:
+                            results[rest_index] = unsent
+                        break
+            try:
+                server.quit()
+            except Exception:
+                pass
+        
+        return results
+    
+    @staticmethod
+    def broadcast_key(message: Dict) -> bytes:
+        """Digest of everything but the recipient; equal keys mean identical content"""
+        digest = hashlib.blake2b(digest_size=16)
+        for part in (message["subject"], message["body"], message.get("html_body") or "",
+                     "\0".join(message.get("attachments") or ())):
+            data = part.encode("utf-8")
+            digest.update(len(data).to_bytes(8, "big"))
+            digest.update(data)
+        return digest.digest()
+    
+    @staticmethod
+    def send_broadcast(from_email: str, app_password: str,
+                       messages: Sequence[Dict], host: str = GmailConfig.DEFAULT_HOST,
+                       port: int = GmailConfig.DEFAULT_PORT, server=None,
+                       max_recipients: int = BROADCAST_MAX_RECIPIENTS) -> List[SendResult]:
+        """
+        Send messages, merging identical ones into multi-recipient transactions
+        
+        Messages whose subject, bodies and attachments match go out as one
+        message addressed to "undisclosed-recipients:;", with one RCPT TO
+        per recipient and up to `max_recipients` per transaction. The
+        chunk shrinks if the server refuses recipients as too many (452).
+        Messages with unique content are sent one by one as usual. Takes
+        the same arguments as send_batch, plus an optional open `server`.
+        
+        Returns:
+            list: one SendResult per message, in order
+        """
+        results = [None] * len(messages)
+        groups = {}
+        for index, message in enumerate(messages):
+            to_email, error = EmailSender.check_recipients(message["to_email"])
+            if to_email is None:
+                results[index] = SendResult.invalid(error)
+                continue
+            groups.setdefault(EmailSender.broadcast_key(message), []).append(
+                (index, to_email.split(", ")))
+        if not groups:
+            return results
+        
+        own_server = server is None
+        if own_server:
+            try:
+                server = EmailSender.connect(from_email, app_password, host=host, port=port)
+            except Exception as e:
+                result = SendResult.from_exception(e)
+                return [result if r is None else r for r in results]
+        
+        try:
+            for group in groups.values():
+                if len(group) == 1:
+                    index = group[0][0]
+                    message = messages[index]
+                    results[index] = EmailSender.send_email(
+                        from_email, app_password, message["to_email"], message["subject"],
+                        message["body"], message.get("attachments"),
+                        message.get("html_body"), server)
+                else:
+                    EmailSender._send_group(from_email, server, messages[group[0][0]],
+                                            group, max_recipients, results)
+                if not EmailSender.is_connected(server):
+                    break
+        finally:
+            if own_server and EmailSender.is_connected(server):
+                try:
+                    server.quit()
+                except Exception:
+                    pass
+        
+        # The session dropped; whatever is left was never attempted
+        for index, result in enumerate(results):
+            if result is None:
+                results[index] = SendResult(False, "Connection lost before sending.",
+                                            None, "", "transient")
+        return results
+    
+    @staticmethod
+    def _send_group(from_email: str, server, message: Dict, group: List[tuple],
+                    max_recipients: int, results: List):
+        """Send one content group in as few transactions as the server allows"""
+        from collections import deque
+        
+        try:
+            msg = EmailSender.build_message(from_email, EmailSender.BROADCAST_TO,
+                                            message["subject"], message["body"],
+                                            message.get("attachments"),
+                                            message.get("html_body"))
+        except OSError as e:
+            for index, _ in group:
+                results[index] = SendResult.invalid(f"Could not read attachment: {str(e)}")
+            return
+        # Serialized once and reused for every transaction
+        data = msg.as_bytes(policy=msg.policy.clone(linesep="\r\n"))
+        
+        pending = deque(group)
+        while pending and EmailSender.is_connected(server):
+            chunk = []
+            count = 0
+            while pending and (not chunk or count + len(pending[0][1]) <= max_recipients):
+                entry = pending.popleft()
+                chunk.append(entry)
+                count += len(entry[1])
+            recipients = [address for _, addresses in chunk for address in addresses]
+            
+            try:
+                refused = server.sendmail(from_email, recipients, data)
+            except Exception as e:
+                import smtplib
+                
+                refused = getattr(e, "recipients", None)
+                if not isinstance(e, smtplib.SMTPRecipientsRefused) or len(chunk) == 1 or any(
+                        code != 452 for code, _ in refused.values()):
+                    result = SendResult.from_exception(e)
+                    for index, addresses in chunk:
+                        results[index] = EmailSender._recipient_result(
+                            addresses, refused, result)
+                    continue
+            
+            # 452: too many recipients for one message; retry those addresses
+            # in a later, smaller transaction
+            retry = []
+            for index, addresses in chunk:
+                deferred = [address for address in addresses
+                            if refused and refused.get(address, (0,))[0] == 452]
+                if deferred:
+                    retry.append((index, deferred))
+                else:
+                    results[index] = EmailSender._recipient_result(
+                        addresses, refused, SendResult.sent())
+            if retry:
+                accepted = count - sum(len(addresses) for _, addresses in retry)
+                max_recipients = max(1, min(max_recipients, accepted) or count // 2)
+                pending.extendleft(reversed(retry))
+    
+    @staticmethod
+    def _recipient_result(addresses: List[str], refused: Optional[Dict],
+                          default: SendResult) -> SendResult:
+        """The reply for the first refused address of a message, else `default`"""
+        for address in addresses:
+            if refused and address in refused:
+                code, text = refused[address]
+                text = SendResult._text(text)
+                return SendResult.from_reply(code, text, f"Recipient refused: {address} ({text})")
+        return default
+    
+    @staticmethod
+    def is_connected(server) -> bool:
+        """Whether an SMTP session still has a live socket"""
+        return getattr(server, "sock", None) is not None
+
+
+_fast_fold_policy = None
+
+
+def _get_fast_fold_policy():
+    """
+    compat32 policy that writes short ASCII headers without folding
+    
+    Folding dominates serialization time; headers that already fit on
+    one line come out byte-for-byte the same as compat32 would write them.
+    """
+    global _fast_fold_policy
+    if _fast_fold_policy is not None:
+        return _fast_fold_policy
+    
+    from email.policy import Compat32
+    
+    class FastFoldPolicy(Compat32):
+        def fold_binary(self, name, value):
+            if (isinstance(value, str) and value.isascii() and "\n" not in value
+                    and "\r" not in value
+                    and len(name) + len(value) + 2 <= self.max_line_length):
+                return f"{name}: {value}{self.linesep}".encode("ascii")
+            return super().fold_binary(name, value)
+    
+    _fast_fold_policy = FastFoldPolicy()
+    return _fast_fold_policy
+
+
+class Transport:
+    """
+    Destination for outgoing messages
+    
+    send_batch() takes the same message dicts as EmailSender.send_batch
+    and returns one SendResult per message, so any transport can be
+    handed to SendScheduler as its send_batch.
+    """
+    
+    def send_batch(self, messages: Sequence[Dict]) -> List[SendResult]:
+        raise NotImplementedError
+    
+    def send_email(self, to_email: str, subject: str, body: str,
+                   attachments: Optional[Sequence[str]] = None,
+                   html_body: Optional[str] = None) -> SendResult:
+        """Send a single message"""
+        return self.send_batch([{"to_email": to_email, "subject": subject, "body": body,
+                                 "attachments": attachments, "html_body": html_body}])[0]
+    
+    def close(self):
+        pass
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SMTPTransport(Transport):
+    """
+    Delivers over an authenticated SMTP session (Gmail by default)
+    
+    With `broadcast` set, messages with identical content share one
+    transaction (see EmailSender.send_broadcast).
+    """
+    
+    def __init__(self, from_email: str, app_password: str,
+                 host: str = GmailConfig.DEFAULT_HOST, port: int = GmailConfig.DEFAULT_PORT,
+                 broadcast: bool = False):
+        self.from_email = from_email
+        self.app_password = app_password
+        self.host = host
+        self.port = port
+        self.broadcast = broadcast
+    
+    def send_batch(self, messages: Sequence[Dict]) -> List[SendResult]:
+        send = EmailSender.send_broadcast if self.broadcast else EmailSender.send_batch
+        return send(self.from_email, self.app_password, messages,
+                    host=self.host, port=self.port)
+
+
+class LocalTransport(Transport):
+    """
+    Base for transports that write messages to local files
+    
+    Messages are serialized once and written through large buffers;
+    fsync runs once every FSYNC_EVERY messages and at the end of each
+    batch rather than per message.
+    """
+    
+    FSYNC_EVERY = 1000
+    BUFFER_SIZE = 1024 * 1024
+    
+    def __init__(self, path: str, from_email: str, fsync_every: int = FSYNC_EVERY):
+        self.path = path
+        self.from_email = from_email
+        self.fsync_every = max(1, fsync_every)
+        # Result indices of messages written since the last sync
+        self._unsynced = []
+        domain = from_email.rpartition("@")[2]
+        self._id_domain = (domain and RecipientValidator.normalize_domain(domain)[0]
+                           or "localhost")
+    
+    # The layout build_message() produces for a plain-text message, plus
+    # the Date and Message-ID added for archiving; the email package
+    # writes exactly these bytes for ASCII content
+    PLAIN_LAYOUT = (
+        'Content-Type: multipart/mixed;\n boundary="{boundary}"\n'
+        "MIME-Version: 1.0\n"
+        "From: {from_email}\n"
+        "To: {to_email}\n"
+        "Subject: {subject}\n"
+        "Date: {date}\n"
+        "Message-ID: {message_id}\n"
+        "\n"
+        "--{boundary}\n"
+        'Content-Type: text/plain; charset="us-ascii"\n'
+        "MIME-Version: 1.0\n"
+        "Content-Transfer-Encoding: 7bit\n"
+        "\n"
+        "{body}\n"
+        "--{boundary}--\n"
+    )
+    # RFC 5322 line limit, and the header length compat32 folds beyond
+    MAX_LINE_LENGTH = 998
+    MAX_HEADER_LENGTH = 78
+    
+    def stamp(self) -> Tuple[str, str]:
+        """Date and Message-ID headers for the next message written"""
+        from email.utils import formatdate, make_msgid
+        
+        return formatdate(localtime=True), make_msgid(domain=self._id_domain)
+    
+    @classmethod
+    def serialize_plain(cls, from_email: str, to_email: str, subject: str,
+                        body: str, date: str, message_id: str) -> Optional[bytes]:
+        """
+        Serialize a plain-text message without the email package
+        
+        Only handles content that needs no encoding or folding; returns
+        None otherwise so the caller falls back to build_message().
+        """
+        headers = (("From", from_email), ("To", to_email), ("Subject", subject),
+                   ("Date", date), ("Message-ID", message_id))
+        if not (body.isascii() and all(value.isascii() for _, value in headers)):
+            return None
+        if "\r" in body or "\n" in subject or "\r" in subject:
+            return None
+        for name, value in headers:
+            if len(name) + len(value) + 2 > cls.MAX_HEADER_LENGTH:
+                return None
+        if len(body) > cls.MAX_LINE_LENGTH and any(
+                len(line) > cls.MAX_LINE_LENGTH for line in body.split("\n")):
+            return None
+        
+        return cls.PLAIN_LAYOUT.format(boundary=EmailSender.new_boundary(),
+                                       from_email=from_email, to_email=to_email,
+                                       subject=subject, date=date, message_id=message_id,
+                                       body=body).encode("ascii")
+    
+    @staticmethod
+    def serialize(msg) -> bytes:
+        """Flatten a MIME message to bytes with LF line endings"""
+        import io
+        from email.generator import BytesGenerator
+        
+        buffer = io.BytesIO()
+        BytesGenerator(buffer, mangle_from_=False,
+                       policy=_get_fast_fold_policy()).flatten(msg)
+        return buffer.getvalue()
+    
+    def send_batch(self, messages: Sequence[Dict]) -> List[SendResult]:
+        results = []
+        try:
+            for message in messages:
+                to_email, error = EmailSender.check_recipients(message["to_email"])
+                if to_email is None:
+                    results.append(SendResult.invalid(error))
+                    continue
+                
+                # The SMTP server adds these on sending; an archive has to
+                date, message_id = self.stamp()
+                data = None
+                if not message.get("attachments") and not message.get("html_body"):
+                    data = self.serialize_plain(self.from_email, to_email,
+                                                message["subject"], message["body"],
+                                                date, message_id)
+                if data is None:
+                    msg, error = EmailSender.prepare_message(
+                        self.from_email,
+                        to_email,
+                        message["subject"],
+                        message["body"],
+                        message.get("attachments"),
+                        message.get("html_body")
+                    )
+                    if msg is None:
+                        results.append(SendResult.invalid(error))
+                        continue
+                    msg["Date"] = date
+                    msg["Message-ID"] = message_id
+                    data = self.serialize(msg)
+                
+                self._write(data)
+                self._unsynced.append(len(results))
+                results.append(SendResult.sent())
+                if len(self._unsynced) >= self.fsync_every:
+                    self._sync()
+            self._sync()
+        except OSError as e:
+            # Nothing written since the last sync can be trusted to be on
+            # disk; rows rejected as invalid keep their own result
+            failed = SendResult.from_exception(e)
+            for index in self._unsynced:
+                results[index] = failed
+            results.extend([failed] * (len(messages) - len(results)))
+            self._discard()
+        return results
+    
+    def _write(self, data: bytes):
+        raise NotImplementedError
+    
+    def _sync(self):
+        self._unsynced = []
+    
+    def _discard(self):
+        """Drop whatever was written since the last sync"""
+        self._unsynced = []
+
+
+class MboxTransport(LocalTransport):
+    """Appends messages to an mbox file (mboxrd "From " quoting)"""
+    
+    FROM_LINE_PATTERN = re.compile(rb"^(>*From )", re.M)
+    
+    def __init__(self, path: str, from_email: str,
+                 fsync_every: int = LocalTransport.FSYNC_EVERY):
+        super().__init__(path, from_email, fsync_every)
+        self._file = None
+        self._synced_size = None
+    
+    def _write(self, data: bytes):
+        if self._file is None:
+            self._file = open(self.path, "ab", buffering=self.BUFFER_SIZE)
+            self._synced_size = self._file.tell()
+        
+        envelope = f"From {self.from_email or 'MAILER-DAEMON'} {time.asctime()}\n"
+        self._file.write(envelope.encode("ascii", "replace"))
+        self._file.write(self.FROM_LINE_PATTERN.sub(rb">\1", data))
+        self._file.write(b"\n" if data.endswith(b"\n") else b"\n\n")
+    
+    def _sync(self):
+        if self._file is not None and self._unsynced:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._synced_size = self._file.tell()
+        super()._sync()
+    
+    def _discard(self):
+        # Close without trusting the buffer, then cut the file back to the
+        # last synced size so no message reported as failed stays behind
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+            self._file = None
+            try:
+                os.truncate(self.path, self._synced_size)
+            except OSError as e:
+                print(f"Error truncating mbox {self.path}: {e}")
+        super()._discard()
+    
+    def close(self):
+        if self._file is not None:
+            self._sync()
+            self._file.close()
+            self._file = None
+
+
+class MaildirTransport(LocalTransport):
+    """
+    Delivers messages into a Maildir (tmp/ then new/)
+    
+    Files stay open in tmp/ until the next sync; they are fsynced
+    together, renamed into new/ and the directory is fsynced once, so
+    readers never see a partial message.
+    """
+    
+    # Keeps staged descriptors well under common per-process limits
+    MAX_OPEN_FILES = 256
+    
+    def __init__(self, path: str, from_email: str,
+                 fsync_every: int = LocalTransport.FSYNC_EVERY):
+        super().__init__(path, from_email, fsync_every)
+        self._staged = []
+        self._counter = 0
+        self._hostname = self._safe_hostname()
+        self._prepare_directories()
+    
+    @staticmethod
+    def _safe_hostname() -> str:
+        import socket
+        
+        # '/' and ':' are not allowed in Maildir names
+        return socket.gethostname().replace("/", r"\057").replace(":", r"\072")
+    
+    def _prepare_directories(self):
+        for name in ("tmp", "new", "cur"):
+            os.makedirs(os.path.join(self.path, name), exist_ok=True)
+    
+    def _next_name(self) -> str:
+        self._counter += 1
+        now = time.time()
+        return (f"{int(now)}.M{int(now % 1 * 1_000_000)}P{os.getpid()}"
+                f"Q{self._counter}.{self._hostname}")
+    
+    def _staging_path(self, name: str) -> str:
+        return os.path.join(self.path, "tmp", name)
+    
+    def _final_path(self, name: str) -> str:
+        return os.path.join(self.path, "new", name)
+    
+    @property
+    def _final_directory(self) -> str:
+        return os.path.join(self.path, "new")
+    
+    def _write(self, data: bytes):
+        if len(self._staged) >= self.MAX_OPEN_FILES:
+            self._sync()
+        name = self._next_name()
+        staging = self._staging_path(name)
+        fd = os.open(staging, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0),
+                     0o600)
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+        except OSError:
+            os.close(fd)
+            os.remove(staging)
+            raise
+        self._staged.append((fd, name))
+    
+    def _sync(self):
+        if self._staged:
+            # On failure the files stay staged for _discard() to remove
+            for fd, _ in self._staged:
+                os.fsync(fd)
+            staged, self._staged = self._staged, []
+            for fd, _ in staged:
+                os.close(fd)
+            for _, name in staged:
+                os.replace(self._staging_path(name), self._final_path(name))
+            self._sync_directory(self._final_directory)
+        super()._sync()
+    
+    def _discard(self):
+        staged, self._staged = self._staged, []
+        for fd, name in staged:
+            try:
+                os.close(fd)
+                os.remove(self._staging_path(name))
+            except OSError:
+                pass
+        super()._discard()
+    
+    @staticmethod
+    def _sync_directory(path: str):
+        # Directory fsync makes the renames durable; unsupported on Windows
+        if os.name == "nt":
+            return
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    
+    def close(self):
+        self._sync()
+
+
+class SpoolTransport(MaildirTransport):
+    """
+    Writes one .eml file per message into a pickup directory
+    
+    Files appear under their final .eml name only once complete, so
+    another MTA or archiver can watch the directory safely.
+    """
+    
+    def _prepare_directories(self):
+        os.makedirs(self.path, exist_ok=True)
+    
+    def _staging_path(self, name: str) -> str:
+        return os.path.join(self.path, f".{name}.tmp")
+    
+    def _final_path(self, name: str) -> str:
+        return os.path.join(self.path, f"{name}.eml")
+    
+    @property
+    def _final_directory(self) -> str:
+        return self.path
+
+
+class SenderAccount:
+    """One sending account on one relay, with its quota and health"""
+    
+    __slots__ = ("email", "password", "host", "port", "weight", "daily_limit",
+                 "sent_today", "day", "in_flight", "failures", "disabled_until",
+                 "current_weight", "throttle")
+    
+    # Cool-down after a connection failure, doubled per consecutive failure
+    FAILURE_COOLDOWN = 30.0
+    MAX_COOLDOWN = 900.0
+    # Replies about the whole session or account rather than one recipient
+    COOLDOWN_CODES = (421, 454)
+    
+    def __init__(self, email: str, password: str, host: str = GmailConfig.DEFAULT_HOST,
+                 port: int = GmailConfig.DEFAULT_PORT, weight: float = 1.0,
+                 daily_limit: int = GmailConfig.DEFAULT_DAILY_LIMIT):
+        self.email = email
+        self.password = password
+        self.host = host
+        self.port = int(port)
+        self.weight = max(float(weight), 0.01)
+        self.daily_limit = int(daily_limit)
+        self.sent_today = 0
+        self.day = datetime.now().date()
+        self.in_flight = 0
+        self.failures = 0
+        self.disabled_until = 0.0
+        self.current_weight = 0.0
+        self.throttle = SendThrottle()
+    
+    def __repr__(self):
+        return f"SenderAccount({self.email!r}, {self.host}:{self.port})"
+    
+    @classmethod
+    def from_config(cls, account: Dict) -> "SenderAccount":
+        return cls(account["email"], account["password"],
+                   account.get("host", GmailConfig.DEFAULT_HOST),
+                   account.get("port", GmailConfig.DEFAULT_PORT),
+                   account.get("weight", 1.0),
+                   account.get("daily_limit", GmailConfig.DEFAULT_DAILY_LIMIT))
+    
+    @property
+    def key(self) -> tuple:
+        return (credential_fingerprint(self.email, self.password), self.host, self.port)
+    
+    def capacity(self, now: float) -> int:
+        """How many more messages this account may take right now"""
+        if self.day != datetime.now().date():
+            self.day = datetime.now().date()
+            self.sent_today = 0
+        if now < self.disabled_until or self.throttle.remaining() > 0:
+            return 0
+        status = AuthStatusCache.lookup(self.email, self.password)
+        if status and not status[0]:
+            return 0
+        return max(0, self.daily_limit - self.sent_today - self.in_flight)
+    
+    def record(self, results: Sequence[SendResult]):
+        """Update quota and health from one session's results"""
+        now = time.time()
+        for result in results:
+            self.throttle.record(result)
+            if result.success:
+                self.sent_today += 1
+                self.failures = 0
+            elif result.category == "quota":
+                # The server says we are out; believe it until tomorrow
+                self.sent_today = self.daily_limit
+            elif result.category == "auth":
+                self.disabled_until = now + AuthStatusCache.REJECTED_TTL
+                break
+            elif result.code in self.COOLDOWN_CODES or (
+                    result.code is None and result.category == "transient"):
+                # A per-recipient 4xx (450 mailbox busy) says nothing about
+                # the account and is left to the retry path
+                self.failures += 1
+                self.disabled_until = now + min(
+                    self.MAX_COOLDOWN, self.FAILURE_COOLDOWN * 2 ** (self.failures - 1))
+                break
+
+
+class ShardedSender:
+    """
+    Spreads a batch of messages across several sender accounts
+    
+    Messages are assigned with smooth weighted round-robin ("weighted")
+    or to the account with the least in-flight work relative to its
+    weight ("least_loaded"). Each account's share goes out over its own
+    SMTP session in parallel, so throughput grows with the number of
+    accounts. Messages that fail for account-level reasons (auth, quota,
+    rate limits, connection errors) are re-routed to the remaining
+    healthy accounts within the same call.
+    """
+    
+    STRATEGIES = ("weighted", "least_loaded")
+    
+    _shared = None
+    _shared_lock = threading.Lock()
+    
+    def __init__(self, accounts: Sequence[SenderAccount], strategy: str = "weighted",
+                 send_batch=None):
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Unknown sharding strategy: {strategy}")
+        self.accounts = list(accounts)
+        self.strategy = strategy
+        self._send_batch = send_batch or EmailSender.send_batch
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def shared(cls, accounts: Sequence[Dict]) -> "ShardedSender":
+        """
+        Process-wide sender for the configured accounts
+        
+        Kept between batches so quota counts and health survive; rebuilt
+        when the account list changes, keeping state for unchanged accounts.
+        Edited weights and daily limits apply to kept accounts too.
+        """
+        with cls._shared_lock:
+            wanted = [SenderAccount.from_config(account) for account in accounts]
+            current = cls._shared
+            if current is None or [a.key for a in current.accounts] != [a.key for a in wanted]:
+                known = {a.key: a for a in current.accounts} if current else {}
+                cls._shared = cls([known.get(a.key, a) for a in wanted],
+                                  send_batch=AdaptiveSender.shared().send_batch)
+            for account, config in zip(cls._shared.accounts, wanted):
+                account.weight = config.weight
+                account.daily_limit = config.daily_limit
+            return cls._shared
+    
+    def assign(self, indices: Sequence[int]) -> Dict[SenderAccount, List[int]]:
+        """Split message indices between accounts with spare capacity"""
+        now = time.time()
+        capacity = {account: account.capacity(now) for account in self.accounts}
+        shards = {}
+        for index in indices:
+            candidates = [account for account in self.accounts if capacity[account] > 0]
+            if not candidates:
+                break
+            account = self._pick(candidates, shards)
+            capacity[account] -= 1
+            shards.setdefault(account, []).append(index)
+        return shards
+    
+    def _pick(self, candidates: List[SenderAccount],
+              shards: Dict[SenderAccount, List[int]]) -> SenderAccount:
+        if self.strategy == "least_loaded":
+            return min(candidates, key=lambda a: (a.in_flight + len(shards.get(a, ())))
+                       / a.weight)
+        
+        # Smooth weighted round-robin: spreads picks evenly within a cycle
+        total = 0.0
+        best = None
+        for account in candidates:
+            account.current_weight += account.weight
+            total += account.weight
+            if best is None or account.current_weight > best.current_weight:
+                best = account
+        best.current_weight -= total
+        return best
+    
+    def send_batch(self, messages: Sequence[Dict]) -> List[SendResult]:
+        """
+        Send messages across all accounts
+        
+        Returns:
+            list: one SendResult per message, in order
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        
+        results = [None] * len(messages)
+        pending = list(range(len(messages)))
+        
+        # Each round removes at least one account from rotation on failure
+        for _ in range(len(self.accounts)):
+            if not pending:
+                break
+            with self._lock:
+                shards = self.assign(pending)
+                for account, indices in shards.items():
+                    account.in_flight += len(indices)
+            if not shards:
+                break
+            
+            with ThreadPoolExecutor(max_workers=len(shards)) as pool:
+                futures = {
+                    account: pool.submit(self._send_shard, account,
+                                         [messages[i] for i in indices])
+                    for account, indices in shards.items()
+                }
+            
+            pending = []
+            with self._lock:
+                for account, indices in shards.items():
+                    shard_results = futures[account].result()
+                    account.in_flight -= len(indices)
+                    account.record(shard_results)
+                    for index, result in zip(indices, shard_results):
+                        results[index] = result
+                        if not result.success and result.category in (
+                                "auth", "quota", "rate_limited", "transient"):
+                            pending.append(index)
+            pending.sort()
+        
+        for index, result in enumerate(results):
+            if result is None:
+                results[index] = SendResult(False, "No sender account has capacity left.",
+                                            category="rate_limited")
+        return results
+    
+    def _send_shard(self, account: SenderAccount, messages: List[Dict]) -> List[SendResult]:
+        try:
+            return self._send_batch(account.email, account.password, messages,
+                                    host=account.host, port=account.port)
+        except Exception as e:
+            return [SendResult.from_exception(e)] * len(messages)
+
+
+class ConcurrencyController:
+    """
+    AIMD limit on parallel SMTP sends
+    
+    The limit grows by one after each healthy round (as many completions
+    as the current limit). A round is healthy when its mean latency stays
+    within LATENCY_TOLERANCE of the best seen and transient errors stay
+    under MAX_ERROR_RATE. A throttling reply (421, 454 and other
+    rate_limited results) halves the limit at once. Only one cut is made
+    per round: replies to sends that started before the last cut are
+    counted but do not cut again. After a cut the limit climbs back to
+    one below where it was throttled and holds there, probing one step
+    higher after PROBE_ROUNDS healthy rounds. Each probe that is
+    throttled again doubles the wait before the next.
+    """
+    
+    LATENCY_TOLERANCE = 2.0
+    MAX_ERROR_RATE = 0.05
+    THROTTLE_FACTOR = 0.5
+    ERROR_FACTOR = 0.75
+    # Lets the latency baseline follow a network that got slower for good
+    BASELINE_DRIFT = 1.1
+    MIN_ROUND = 4
+    PROBE_ROUNDS = 20
+    MAX_PROBE_ROUNDS = 640
+    
+    def __init__(self, initial: int = 1, minimum: int = 1, maximum: int = 8):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = max(minimum, min(maximum, initial))
+        self.in_flight = 0
+        self.generation = 0
+        self.throttled = 0
+        self.baseline = None
+        self.last_latency = None
+        # Lowest limit that drew a throttling reply, until probed past
+        self.ceiling = None
+        self._held_rounds = 0
+        self._probe_rounds = self.PROBE_ROUNDS
+        self._cond = threading.Condition()
+        self._reset_round()
+    
+    def _reset_round(self):
+        self._count = 0
+        self._errors = 0
+        self._succeeded = 0
+        self._latency = 0.0
+    
+    def acquire(self) -> int:
+        """Block until a send slot is free; returns a ticket for release()"""
+        with self._cond:
+            while self.in_flight >= self.limit:
+                self._cond.wait()
+            self.in_flight += 1
+            return self.generation
+    
+    def release(self, ticket: int, latency: Optional[float] = None,
+                result: Optional[SendResult] = None):
+        """Free a slot and feed the send's latency and outcome into the limit"""
+        with self._cond:
+            self.in_flight -= 1
+            if result is not None:
+                self._record(ticket, latency, result)
+            self._cond.notify_all()
+    
+    def _record(self, ticket: int, latency: Optional[float], result: SendResult):
+        if result.category == "rate_limited":
+            self.throttled += 1
+            if ticket == self.generation:
+                if self.ceiling is not None and self.limit >= self.ceiling:
+                    self._probe_rounds = min(self.MAX_PROBE_ROUNDS, self._probe_rounds * 2)
+                self.ceiling = self.limit
+                self._held_rounds = 0
+                self._cut(self.THROTTLE_FACTOR)
+            return
+        
+        self._count += 1
+        if result.category == "transient":
+            self._errors += 1
+        elif result.success and latency is not None:
+            self._succeeded += 1
+            self._latency += latency
+        if self._count < max(self.limit, self.MIN_ROUND):
+            return
+        
+        mean = self._latency / self._succeeded if self._succeeded else None
+        if self._errors / self._count > self.MAX_ERROR_RATE:
+            self._cut(self.ERROR_FACTOR)
+            return
+        if mean is not None:
+            self.last_latency = mean
+            if self.baseline is not None and mean > self.baseline * self.LATENCY_TOLERANCE:
+                self.limit = max(self.minimum, self.limit - 1)
+            elif self.ceiling is not None and self.limit + 1 >= self.ceiling:
+                self._held_rounds += 1
+                if self._held_rounds >= self._probe_rounds:
+                    self._held_rounds = 0
+                    self.limit = min(self.maximum, self.limit + 1)
+                    if self.limit > self.ceiling:
+                        self.ceiling = None
+                        self._probe_rounds = self.PROBE_ROUNDS
+            else:
+                self.limit = min(self.maximum, self.limit + 1)
+            self.baseline = mean if self.baseline is None else min(
+                mean, self.baseline * self.BASELINE_DRIFT)
+        self._reset_round()
+    
+    def _cut(self, factor: float):
+        self.limit = max(self.minimum, int(self.limit * factor))
+        self.generation += 1
+        self._reset_round()
+    
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                "concurrency": self.limit,
+                "in_flight": self.in_flight,
+                "throttled": self.throttled,
+                "ceiling": self.ceiling,
+                "latency_ms": None if self.last_latency is None
+                else round(self.last_latency * 1000, 1),
+                "baseline_ms": None if self.baseline is None
+                else round(self.baseline * 1000, 1),
+            }
+
+
+class SMTPSessionStats:
+    """One pooled SMTP session and its send latency"""
+    
+    __slots__ = ("id", "server", "last_used", "sent", "failed", "latency")
+    
+    # Weight of the newest sample in the latency moving average
+    SMOOTHING = 0.2
+    
+    def __init__(self, session_id: int, server):
+        self.id = session_id
+        self.server = server
+        self.last_used = time.time()
+        self.sent = 0
+        self.failed = 0
+        self.latency = None
+    
+    def record(self, latency: float, result: SendResult):
+        self.last_used = time.time()
+        if result.success:
+            self.sent += 1
+            self.latency = latency if self.latency is None else (
+                self.latency + self.SMOOTHING * (latency - self.latency))
+        else:
+            self.failed += 1
+    
+    def to_dict(self) -> Dict:
+        return {"id": self.id, "sent": self.sent, "failed": self.failed,
+                "latency_ms": None if self.latency is None else round(self.latency * 1000, 1)}
+
+
+class AdaptiveSender:
+    """
+    Sends batches over a pool of SMTP sessions sized by AIMD
+    
+    Each account (address and relay) gets its own ConcurrencyController
+    and session pool. send_batch() has the same signature as
+    EmailSender.send_batch, so it can stand in for it anywhere, including
+    as ShardedSender's per-account sender. Sessions are kept open between
+    batches and dropped once idle for IDLE_SECONDS.
+    """
+    
+    IDLE_SECONDS = 60.0
+    # Account-level failures that make the rest of the batch pointless
+    FATAL = ("auth", "quota")
+    
+    _shared = None
+    _shared_lock = threading.Lock()
+    
+    def __init__(self, initial: int = 1, minimum: int = 1, maximum: int = 8, connect=None):
+        import itertools
+        
+        self.initial = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.connect = connect or EmailSender.connect
+        self._controllers = {}
+        self._sessions = {}
+        self._idle = {}
+        self._session_ids = itertools.count(1)
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def shared(cls) -> "AdaptiveSender":
+        """Process-wide sender, so limits and sessions carry over between batches"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+    
+    @classmethod
+    def close_shared(cls):
+        with cls._shared_lock:
+            if cls._shared is not None:
+                cls._shared.close()
+    
+    def controller(self, from_email: str, host: str = GmailConfig.DEFAULT_HOST,
+                   port: int = GmailConfig.DEFAULT_PORT) -> ConcurrencyController:
+        key = (from_email, host, port)
+        with self._lock:
+            controller = self._controllers.get(key)
+            if controller is None:
+                controller = self._controllers[key] = ConcurrencyController(
+                    self.initial, self.minimum, self.maximum)
+                self._sessions[key] = []
+                self._idle[key] = []
+            return controller
+    
+    def send_batch(self, from_email: str, app_password: str,
+                   messages: Sequence[Dict], host: str = GmailConfig.DEFAULT_HOST,
+                   port: int = GmailConfig.DEFAULT_PORT) -> List[SendResult]:
+        """
+        Send messages over up to `controller.limit` sessions at once
+        
+        Returns:
+            list: one SendResult per message, in order
+        """
+        import itertools
+        from concurrent.futures import ThreadPoolExecutor
+        
+        if not messages:
+            return []
+        key = (from_email, host, port)
+        controller = self.controller(from_email, host, port)
+        results = [None] * len(messages)
+        indices = itertools.count()
+        fatal = []
+        
+        def worker():
+            session = None
+            try:
+                while True:
+                    ticket = controller.acquire()
+                    index = next(indices)
+                    if index >= len(messages):
+                        controller.release(ticket)
+                        return
+                    if fatal:
+                        results[index] = fatal[0]
+                        controller.release(ticket)
+                        continue
+                    
+                    if session is None:
+                        session, result = self._checkout(key, app_password)
+                        if session is None:
+                            results[index] = result
+                            controller.release(ticket, None, result)
+                            if result.category in self.FATAL:
+                                fatal.append(result)
+                            continue
+                    
+                    result, latency = self._send(session, from_email, messages[index])
+                    if result.category == "transient" and result.code is None:
+                        # The session dropped; retry once on a fresh connection
+                        self._discard(key, session)
+                        session, reconnect_error = self._checkout(key, app_password)
+                        if session is None:
+                            result = reconnect_error
+                        else:
+                            result, latency = self._send(session, from_email, messages[index])
+                    if session is not None:
+                        session.record(latency, result)
+                    results[index] = result
+                    controller.release(ticket, latency, result)
+                    if result.category in self.FATAL:
+                        fatal.append(result)
+                    if session is not None and not EmailSender.is_connected(session.server):
+                        self._discard(key, session)
+                        session = None
+            finally:
+                if session is not None:
+                    self._checkin(key, session)
+        
+        workers = min(controller.maximum, len(messages))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for future in [pool.submit(worker) for _ in range(workers)]:
+                future.result()
+        return results
+    
+    @staticmethod
+    def _send(session: SMTPSessionStats, from_email: str, message: Dict) -> tuple:
+        started = time.perf_counter()
+        result = EmailSender.send_email(
+            from_email,
+            "",
+            message["to_email"],
+            message["subject"],
+            message["body"],
+            message.get("attachments"),
+            message.get("html_body"),
+            session.server
+        )
+        return result, time.perf_counter() - started
+    
+    def _checkout(self, key: tuple, app_password: str) -> tuple:
+        """An idle session for the account, or a new one; (session, error)"""
+        stale = []
+        session = None
+        with self._lock:
+            idle = self._idle[key]
+            while idle:
+                candidate = idle.pop()
+                if time.time() - candidate.last_used > self.IDLE_SECONDS:
+                    stale.append(candidate)
+                else:
+                    session = candidate
+                    break
+        for candidate in stale:
+            self._discard(key, candidate)
+        if session is not None:
+            return session, None
+        
+        from_email, host, port = key
+        try:
+            server = self.connect(from_email, app_password, host=host, port=port)
+        except Exception as e:
+            return None, SendResult.from_exception(e)
+        session = SMTPSessionStats(next(self._session_ids), server)
+        with self._lock:
+            self._sessions[key].append(session)
+        return session, None
+    
+    def _checkin(self, key: tuple, session: SMTPSessionStats):
+        with self._lock:
+            self._idle[key].append(session)
+    
+    def _discard(self, key: tuple, session: SMTPSessionStats):
+        with self._lock:
+            if session in self._sessions[key]:
+                self._sessions[key].remove(session)
+        try:
+            session.server.quit()
+        except Exception:
+            pass
+    
+    def close(self):
+        """Quit every pooled session"""
+        with self._lock:
+            idle = [(key, session) for key, sessions in self._idle.items()
+                    for session in sessions]
+            for sessions in self._idle.values():
+                sessions.clear()
+        for key, session in idle:
+            self._discard(key, session)
+    
+    def stats(self) -> Dict:
+        """Concurrency, latency and per-session figures for every account"""
+        with self._lock:
+            accounts = list(self._controllers.items())
+            sessions = {key: list(value) for key, value in self._sessions.items()}
+        return {
+            f"{email} via {host}:{port}": dict(controller.stats(), sessions=[
+                session.to_dict() for session in sessions[(email, host, port)]])
+            for (email, host, port), controller in accounts
+        }
+
+
+class WarmSMTPSession:
+    """
+    Keeps an authenticated SMTP session ready for a likely send
+    
+    warm() connects, runs STARTTLS and logs in on a background thread,
+    then sends NOOP periodically so the server does not drop the idle
+    session. take() hands the live session to the sender, leaving only
+    the message transfer on the critical path.
+    """
+    
+    KEEPALIVE_SECONDS = 30.0
+    MAX_IDLE_SECONDS = 300.0
+    
+    def __init__(self, connect=None):
+        self.connect = connect or EmailSender.connect
+        self._lock = threading.Lock()
+        # Held while the keepalive talks to the server, never with the Tk
+        # thread waiting on it; taken after _lock when both are needed
+        self._io_lock = threading.Lock()
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._server = None
+        self._fingerprint = None
+        self._thread = None
+    
+    fingerprint = staticmethod(credential_fingerprint)
+    
+    def warm(self, from_email: str, app_password: str):
+        """Start opening a session for these credentials, if not already"""
+        status = AuthStatusCache.lookup(from_email, app_password)
+        if status and not status[0]:
+            return  # known to be rejected; do not burn a login attempt
+        fingerprint = self.fingerprint(from_email, app_password)
+        with self._lock:
+            if (self._fingerprint == fingerprint and self._thread is not None
+                    and self._thread.is_alive()):
+                return
+        self.close()
+        
+        with self._lock:
+            self._fingerprint = fingerprint
+            self._ready.clear()
+            self._stop = threading.Event()
+            self._thread = threading.Thread(
+                target=self._run,
+                args=(from_email, app_password, self._stop),
+                name="WarmSMTPSession",
+                daemon=True
+            )
+            self._thread.start()
+    
+    def take(self, from_email: str, app_password: str, timeout: float = 15.0):
+        """
+        Hand over the warm session, waiting for a handshake in progress
+        
+        Returns None when no usable session exists; the caller then
+        connects normally.
+        """
+        fingerprint = self.fingerprint(from_email, app_password)
+        with self._lock:
+            if self._fingerprint != fingerprint or self._thread is None:
+                return None
+            stop = self._stop
+        
+        self._ready.wait(timeout)
+        with self._lock:
+            server = self._server
+            self._server = None
+            stop.set()
+            self._thread = None
+            self._fingerprint = None
+        # Let a keepalive NOOP in flight finish before the socket is reused
+        with self._io_lock:
+            pass
+        return server
+    
+    def release(self, server, from_email: str, app_password: str):
+        """Take back a session after a send so the next send is fast too"""
+        if server is None:
+            return
+        if not EmailSender.is_connected(server):
+            return
+        self.close()
+        with self._lock:
+            self._server = server
+            self._fingerprint = self.fingerprint(from_email, app_password)
+            self._ready.set()
+            self._stop = threading.Event()
+            self._thread = threading.Thread(
+                target=self._keepalive,
+                args=(server, self._stop),
+                name="WarmSMTPSession",
+                daemon=True
+            )
+            self._thread.start()
+    
+    def close(self):
+        """Drop any warm session without waiting for the server"""
+        with self._lock:
+            server = self._server
+            self._server = None
+            self._stop.set()
+            self._thread = None
+            self._fingerprint = None
+            self._ready.clear()
+        if server is not None:
+            # QUIT waits on the server; keep it off the caller's (Tk) thread
+            threading.Thread(target=self._quit_when_idle, args=(server,),
+                             name="WarmSMTPSessionQuit", daemon=True).start()
+    
+    def _run(self, from_email: str, app_password: str, stop: threading.Event):
+        try:
+            server = self.connect(from_email, app_password)
+        except Exception:
+            # The real send will connect again and report the error
+            self._ready.set()
+            return
+        
+        with self._lock:
+            if stop.is_set():
+                abandoned = True
+            else:
+                abandoned = False
+                self._server = server
+            self._ready.set()
+        if abandoned:
+            self._quit(server)
+            return
+        self._keepalive(server, stop)
+    
+    def _keepalive(self, server, stop: threading.Event):
+        idle_since = time.time()
+        while not stop.wait(self.KEEPALIVE_SECONDS):
+            with self._lock:
+                if stop.is_set() or self._server is not server:
+                    return
+                expired = time.time() - idle_since > self.MAX_IDLE_SECONDS
+                if expired:
+                    self._drop()
+                else:
+                    self._io_lock.acquire()
+            if expired:
+                self._quit(server)
+                return
+            
+            # NOOP outside _lock: a stalled server must not block close()
+            # or warm() on the Tk thread
+            try:
+                server.noop()
+                alive = True
+            except Exception:
+                alive = False
+            finally:
+                self._io_lock.release()
+            with self._lock:
+                if stop.is_set() or self._server is not server:
+                    return  # taken or closed during the NOOP
+                if not alive:
+                    self._drop()
+            if not alive:
+                self._quit(server)
+                return
+    
+    def _drop(self):
+        """Forget the current session; the caller holds the lock"""
+        self._server = None
+        self._fingerprint = None
+        self._ready.clear()
+    
+    def _quit_when_idle(self, server):
+        with self._io_lock:
+            self._quit(server)
+    
+    @staticmethod
+    def _quit(server):
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+
+class SendScheduler:
+    """
+    Sends emails at a chosen time
+    
+    Due messages are kept in a min-heap ordered by due time and persisted
+    in an append-only journal. A single thread sleeps until the earliest
+    deadline (or until a new earlier message arrives), so a large queue
+    costs nothing while idle. Messages that are due together go out over
+    one SMTP session via EmailSender.send_batch.
+    """
+    
+    QUEUE_FILE = "scheduled_emails.jsonl"
+    BATCH_SIZE = 50
+    # Upper bound on a single sleep so wall-clock jumps (suspend/resume,
+    # clock changes) are noticed; not a polling interval
+    MAX_SLEEP_SECONDS = 60.0
+    
+    def __init__(self, path: str = QUEUE_FILE, send_batch=None, on_result=None,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 throttle: Optional[SendThrottle] = None):
+        self.path = path
+        self.send_batch = send_batch or self._send_with_saved_credentials
+        self.on_result = on_result
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.throttle = throttle or SendThrottle()
+        self._heap = []
+        self._messages = {}
+        self._sequence = 0
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopping = False
+        self._loaded = False
+        self._journal = None
+    
+    def start(self):
+        """Load the journal and start the scheduler thread"""
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="SendScheduler",
+                                            daemon=True)
+            self._thread.start()
+    
+    def stop(self, timeout: float = 2.0):
+        """Stop the scheduler thread; pending messages stay in the journal"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        with self._cond:
+            self._thread = None
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+    
+    def schedule(self, due: float, to_email: str, subject: str, body: str,
+                 html_body: Optional[str] = None,
+                 attachments: Optional[Sequence[str]] = None) -> str:
+        """Queue a message for sending at `due` (a time.time() timestamp)"""
+        import uuid
+        
+        message = {
+            "id": uuid.uuid4().hex,
+            "due": float(due),
+            "to_email": to_email,
+            "subject": subject,
+            "body": body,
+            "html_body": html_body,
+            "attachments": list(attachments or ()),
+        }
+        with self._cond:
+            self._ensure_loaded()
+            self._append_journal({"op": "add", "message": message})
+            self._push(message)
+            # Wake the thread only if this message is now the earliest
+            if self._heap[0][2] == message["id"]:
+                self._cond.notify_all()
+        return message["id"]
+    
+    def cancel(self, message_id: str) -> bool:
+        """Cancel a scheduled message"""
+        with self._cond:
+            self._ensure_loaded()
+            if self._messages.pop(message_id, None) is None:
+                return False
+            self._append_journal({"op": "cancel", "id": message_id})
+            return True
+    
+    def pending(self) -> List[Dict]:
+        """Scheduled messages, earliest first"""
+        with self._cond:
+            self._ensure_loaded()
+            return sorted(self._messages.values(), key=lambda m: m["due"])
+    
+    def _push(self, message: Dict):
+        import heapq
+        
+        self._messages[message["id"]] = message
+        self._sequence += 1
+        heapq.heappush(self._heap, (message["due"], self._sequence, message["id"]))
+    
+    def _ensure_loaded(self):
+        """Replay the journal once, compacting it if mostly finished entries"""
+        if self._loaded:
+            return
+        self._loaded = True
+        
+        records = 0
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # torn final line from an interrupted write
+                    records += 1
+                    if record.get("op") == "add":
+                        self._push(record["message"])
+                    else:
+                        self._messages.pop(record.get("id"), None)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"Error loading scheduled emails: {e}")
+            return
+        
+        if records > 2 * len(self._messages) + 100:
+            self._compact()
+    
+    def _compact(self):
+        """Rewrite the journal with only the messages still pending"""
+        import tempfile
+        
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        
+        directory = os.path.dirname(os.path.abspath(self.path))
+        try:
+            fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    for message in self._messages.values():
+                        f.write(json.dumps({"op": "add", "message": message}) + "\n")
+                os.replace(temp_path, self.path)
+            except BaseException:
+                os.remove(temp_path)
+                raise
+        except Exception as e:
+            print(f"Error compacting scheduled emails: {e}")
+    
+    def _append_journal(self, record: Dict):
+        try:
+            if self._journal is None:
+                self._journal = open(self.path, 'a', encoding='utf-8')
+            self._journal.write(json.dumps(record) + "\n")
+            self._journal.flush()
+        except Exception as e:
+            print(f"Error saving scheduled emails: {e}")
+    
+    def _take_due_batch(self) -> Optional[List[Dict]]:
+        """Sleep until messages are due; returns None when stopping"""
+        import heapq
+        
+        with self._cond:
+            self._ensure_loaded()
+            while not self._stopping:
+                # Drop heap entries for cancelled, sent or rescheduled messages
+                while self._heap and not self._is_current(self._heap[0]):
+                    heapq.heappop(self._heap)
+                
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                
+                # A rate-limited server holds back the whole queue
+                delay = max(self._heap[0][0] - time.time(), self.throttle.remaining())
+                if delay > 0:
+                    self._cond.wait(min(delay, self.MAX_SLEEP_SECONDS))
+                    continue
+                
+                batch = []
+                now = time.time()
+                while self._heap and len(batch) < self.BATCH_SIZE and self._heap[0][0] <= now:
+                    entry = heapq.heappop(self._heap)
+                    if self._is_current(entry):
+                        batch.append(self._messages[entry[2]])
+                if batch:
+                    return batch
+            return None
+    
+    def _is_current(self, entry: tuple) -> bool:
+        """Whether a heap entry still matches a pending message"""
+        message = self._messages.get(entry[2])
+        return message is not None and message["due"] == entry[0]
+    
+    def _run(self):
+        while True:
+            batch = self._take_due_batch()
+            if batch is None:
+                return
+            
+            try:
+                results = self.send_batch(batch)
+            except Exception as e:
+                results = [SendResult.from_exception(e)] * len(batch)
+            
+            finished = []
+            with self._cond:
+                for message, result in zip(batch, results):
+                    self.throttle.record(result)
+                    attempts = message.get("attempts", 0) + 1
+                    delay = None if result.success else self.retry_policy.next_delay(attempts, result)
+                    
+                    if delay is not None:
+                        # Transient failure: push it back into the heap
+                        retry = dict(message, due=time.time() + delay, attempts=attempts)
+                        self._append_journal({"op": "add", "message": retry})
+                        self._push(retry)
+                        continue
+                    
+                    self._messages.pop(message["id"], None)
+                    self._append_journal({"op": "sent" if result.success else "failed",
+                                          "id": message["id"], "code": result.code,
+                                          "detail": result.message})
+                    finished.append((message, result))
+            
+            if self.on_result:
+                for message, result in finished:
+                    self.on_result(message, result)
+    
+    @staticmethod
+    def _send_with_saved_credentials(batch: List[Dict]) -> List[SendResult]:
+        accounts = GmailConfig.load_accounts()
+        if not accounts:
+            return [SendResult(False, "Gmail credentials not configured.",
+                               category="auth")] * len(batch)
+        return ShardedSender.shared(accounts).send_batch(batch)
+
+
+class JobProgress:
+    """Snapshot of a bulk job, posted from the worker to the UI"""
+    
+    FINAL_STATES = ("finished", "cancelled", "failed")
+    
+    __slots__ = ("job_id", "state", "batch", "batch_done", "batch_size", "sent", "failed",
+                 "failures", "total", "rate", "elapsed")
+    
+    def __init__(self, job_id: int, state: str, batch: int, batch_done: int, batch_size: int,
+                 sent: int, failed: int, failures: Dict[str, int], total: Optional[int],
+                 rate: float, elapsed: float):
+        self.job_id = job_id
+        self.state = state
+        self.batch = batch
+        self.batch_done = batch_done
+        self.batch_size = batch_size
+        self.sent = sent
+        self.failed = failed
+        self.failures = failures
+        self.total = total
+        self.rate = rate
+        self.elapsed = elapsed
+    
+    @property
+    def done(self) -> int:
+        return self.sent + self.failed
+    
+    @property
+    def final(self) -> bool:
+        """Whether this is the job's last update"""
+        return self.state in self.FINAL_STATES
+    
+    @property
+    def eta(self) -> Optional[float]:
+        """Seconds left at the current rate, or None when unknown"""
+        if not self.total or self.rate <= 0 or self.state != "running":
+            return None
+        return max(0, self.total - self.done) / self.rate
+
+
+class BulkJob:
+    """
+    A long-running send of many messages, controlled from the Jobs screen
+    
+    The worker thread sends one message at a time and checks the pause
+    and cancel flags before each one (again after any throttle wait), so
+    both take effect within one message. Progress goes to `updates` as
+    JobProgress snapshots at most every REPORT_INTERVAL seconds (plus on
+    batch and state changes), so a 50k-message job puts a few hundred
+    items on the queue, not 50k.
+    """
+    
+    REPORT_INTERVAL = 0.1
+    # Messages per second are measured over this trailing window
+    RATE_WINDOW = 5.0
+    
+    _ids = None
+    
+    def __init__(self, name: str, batches: Iterable[Sequence[Dict]], updates,
+                 total: Optional[int] = None, send_one=None,
+                 throttle: Optional[SendThrottle] = None):
+        import itertools
+        
+        if BulkJob._ids is None:
+            BulkJob._ids = itertools.count(1)
+        self.id = next(BulkJob._ids)
+        self.name = name
+        self.batches = batches
+        self.updates = updates
+        self.total = total
+        self.send_one = send_one or self._send_over_session
+        self.throttle = throttle or SendThrottle()
+        self.state = "queued"
+        self._resume = threading.Event()
+        self._resume.set()
+        self._cancelled = threading.Event()
+        self._thread = None
+        self._server = None
+        self._credentials = None
+        self.error = ""
+    
+    @classmethod
+    def from_merge_file(cls, path: str, template, updates,
+                        batch_size: Optional[int] = None,
+                        check: Optional["MergeCheck"] = None, **kwargs) -> "BulkJob":
+        """
+        Job sending `template` to every row of a CSV or JSONL merge file
+        
+        Only rows passing MergeCheck are sent; the rest were shown to the
+        user in the check's report before the job was started. `check` is
+        that finished check, giving the total; without one the file is
+        checked first on the worker thread. The file is never read on the
+        caller's thread.
+        """
+        job = cls(f"{template.name}: {os.path.basename(path)}", (), updates, **kwargs)
+        
+        def batches():
+            done = check or MergeCheck(path, template, batch_size).run()
+            job.total = done.ready
+            for table, report in MergeCheck(path, template, batch_size).batches():
+                messages = [template.message_for(table.row(row)) for row in report.valid_rows()]
+                if messages:
+                    yield messages
+        
+        job.batches = batches()
+        return job
+    
+    def start(self):
+        """Start sending on a background thread"""
+        if self._thread is not None:
+            return
+        self.state = "running"
+        self._thread = threading.Thread(target=self._run, name=f"BulkJob-{self.id}",
+                                        daemon=True)
+        self._thread.start()
+    
+    def pause(self):
+        if not self.finished:
+            self._resume.clear()
+    
+    def resume(self):
+        self._resume.set()
+    
+    def cancel(self):
+        self._cancelled.set()
+        self._resume.set()
+    
+    @property
+    def paused(self) -> bool:
+        """Whether a pause is in effect or pending"""
+        return not self._resume.is_set()
+    
+    @property
+    def finished(self) -> bool:
+        """Whether the job has stopped; set only after its final update is posted"""
+        return self.state in JobProgress.FINAL_STATES
+    
+    def _run(self):
+        from collections import deque
+        
+        sent = failed = 0
+        failures = {}
+        batch_number = batch_done = batch_size = 0
+        active = 0.0  # seconds spent sending, excluding pauses
+        resumed_at = time.perf_counter()
+        samples = deque([(0.0, 0)])
+        next_report = 0.0
+        
+        def report(state):
+            elapsed = active + time.perf_counter() - resumed_at if state == "running" else active
+            while len(samples) > 1 and elapsed - samples[0][0] > self.RATE_WINDOW:
+                samples.popleft()
+            samples.append((elapsed, sent + failed))
+            span = elapsed - samples[0][0]
+            rate = (sent + failed - samples[0][1]) / span if span > 0 else 0.0
+            if state in JobProgress.FINAL_STATES and elapsed > 0:
+                rate = (sent + failed) / elapsed  # overall average once done
+            self.updates.put(JobProgress(self.id, state, batch_number, batch_done, batch_size,
+                                         sent, failed, dict(failures), self.total, rate,
+                                         elapsed))
+        
+        report("running")
+        try:
+            for batch in self.batches:
+                batch_number += 1
+                batch_done = 0
+                batch_size = len(batch)
+                report("running")
+                for message in batch:
+                    while True:
+                        if not self._resume.is_set():
+                            active += time.perf_counter() - resumed_at
+                            self.state = "paused"
+                            report("paused")
+                            self._close_session()
+                            self._resume.wait()
+                            resumed_at = time.perf_counter()
+                            self.state = "running"
+                        if self._cancelled.is_set():
+                            raise _JobCancelled()
+                        
+                        self.throttle.wait(self._cancelled)
+                        # A pause or cancel made during the wait applies before sending
+                        if self._resume.is_set() and not self._cancelled.is_set():
+                            break
+                    
+                    if "error" in message:
+                        result = SendResult.invalid(message["error"])
+                    else:
+                        result = self.send_one(message)
+                    self.throttle.record(result)
+                    if result.success:
+                        sent += 1
+                    else:
+                        failed += 1
+                        failures[result.category] = failures.get(result.category, 0) + 1
+                    batch_done += 1
+                    
+                    now = time.perf_counter()
+                    if now >= next_report:
+                        next_report = now + self.REPORT_INTERVAL
+                        report("running")
+            state = "finished"
+        except _JobCancelled:
+            state = "cancelled"
+        except Exception as e:
+            print(f"Error running job {self.name}: {e}")
+            self.error = str(e)
+            state = "failed"
+        finally:
+            self._close_session()
+        
+        # Post the final update before the job counts as finished, so the
+        # Jobs screen never stops polling with it still queued
+        active += time.perf_counter() - resumed_at
+        report(state)
+        self.state = state
+    
+    def _send_over_session(self, message: Dict) -> SendResult:
+        """Send through one SMTP session kept open for the whole job"""
+        if self._credentials is None:
+            self._credentials = GmailConfig.load_credentials() or {}
+        email = self._credentials.get("email")
+        password = self._credentials.get("password")
+        if not email:
+            return SendResult(False, "Gmail credentials not configured.", category="auth")
+        
+        for attempt in range(2):
+            fresh = self._server is None
+            if fresh:
+                try:
+                    self._server = EmailSender.connect(email, password)
+                except Exception as e:
+                    return SendResult.from_exception(e)
+            result = EmailSender.send_email(
+                email,
+                password,
+                message["to_email"],
+                message["subject"],
+                message["body"],
+                message.get("attachments"),
+                message.get("html_body"),
+                self._server
+            )
+            if result.category == "transient" and result.code is None:
+                # The session dropped; retry once on a fresh connection
+                self._close_session()
+                if not fresh:
+                    continue
+            return result
+        return result
+    
+    def _close_session(self):
+        server, self._server = self._server, None
+        if server is not None:
+            try:
+                server.quit()
+            except Exception:
+                pass
+
+
+class _JobCancelled(Exception):
+    pass
+
+
+PLACEHOLDER_PATTERN = re.compile(r"\{(\w+)\}")
+TAG_PATTERN = re.compile(r"\{(?:(#if|#each) (\w+)|(#else)|(/if|/each)|(\w+|\.))\}")
+STANDALONE_TAG_PATTERN = re.compile(
+    r"^[ \t]*(\{(?:#if \w+|#each \w+|#else|/if|/each)\})[ \t]*\r?\n", re.M)
+PARTIAL_PATTERN = re.compile(r"\{>(\w+)\}")
+EXTENDS_PATTERN = re.compile(r"\A\{#extends (\w+)\}")
+BLOCK_PATTERN = re.compile(r"\{#block (\w+)\}(.*?)\{/block\}", re.S)
+STANDALONE_LAYOUT_TAG_PATTERN = re.compile(
+    r"^[ \t]*(\{(?:#extends \w+|#block \w+|/block)\})[ \t]*\r?\n", re.M)
+LIST_MARKER_PATTERN = re.compile(r"^(?:[-*•]|\d+[.)])\s+")
+HEADER_LINE_PATTERN = re.compile(r"^(To|Subject): ")
+
+# Newlines become <br> so multi-line textarea values keep their shape in HTML
+_HTML_ESCAPE_TABLE = str.maketrans({
+    "&": "&amp;",
+    "<": "&lt;",
+    ">": "&gt;",
+    '"': "&quot;",
+    "'": "&#x27;",
+    "\n": "<br>\n",
+})
+_HTML_SPECIAL_SEARCH = re.compile(r"[&<>\"'\n]").search
+
+
+def escape_html(value: str) -> str:
+    """Escape a placeholder value for HTML, skipping values that need nothing"""
+    if _HTML_SPECIAL_SEARCH(value) is None:
+        return value
+    return value.translate(_HTML_ESCAPE_TABLE)
+
+
+def split_header_block(source: str) -> Tuple[str, str]:
+    """Split leading 'To:'/'Subject:' lines from the rest of a template"""
+    lines = source.split("\n")
+    count = 0
+    while count < len(lines) and HEADER_LINE_PATTERN.match(lines[count]):
+        count += 1
+    if count == 0:
+        return "", source
+    header = "\n".join(lines[:count]) + "\n"
+    rest = "\n".join(lines[count:])
+    return header, rest
+
+
+_html_to_text_parser = None
+
+
+def _get_html_to_text_parser():
+    """Define the HTML-to-text parser on first use (html.parser is lazy-loaded)"""
+    global _html_to_text_parser
+    if _html_to_text_parser is not None:
+        return _html_to_text_parser
+    
+    from html.parser import HTMLParser
+    
+    class HTMLToTextParser(HTMLParser):
+        """Converts an HTML template body into readable plain text"""
+        
+        BLOCK_TAGS = {"p", "div", "h1", "h2", "h3", "h4", "h5", "h6",
+                      "ul", "ol", "table", "tr", "blockquote", "section"}
+        SKIP_TAGS = {"script", "style", "head", "title"}
+        
+        def __init__(self):
+            super().__init__(convert_charrefs=True)
+            self.parts = []
+            self.skip_depth = 0
+            self.link_href = None
+        
+        def handle_starttag(self, tag, attrs):
+            if tag in self.SKIP_TAGS:
+                self.skip_depth += 1
+            elif tag == "br":
+                self.parts.append("\n")
+            elif tag == "li":
+                self.parts.append("\n- ")
+            elif tag in self.BLOCK_TAGS:
+                self.parts.append("\n\n")
+            elif tag == "a":
+                self.link_href = dict(attrs).get("href")
+        
+        def handle_endtag(self, tag):
+            if tag in self.SKIP_TAGS:
+                self.skip_depth = max(0, self.skip_depth - 1)
+            elif tag in self.BLOCK_TAGS:
+                self.parts.append("\n\n")
+            elif tag == "a" and self.link_href:
+                self.parts.append(f" ({self.link_href})")
+                self.link_href = None
+        
+        def handle_data(self, data):
+            if not self.skip_depth:
+                self.parts.append(re.sub(r"\s+", " ", data))
+        
+        def get_text(self) -> str:
+            text = "".join(self.parts)
+            text = re.sub(r" *\n *", "\n", text)
+            text = re.sub(r"\n{3,}", "\n\n", text)
+            return text.strip()
+        
+    _html_to_text_parser = HTMLToTextParser
+    return _html_to_text_parser
+
+
+def html_to_text(html_source: str) -> str:
+    """Derive a plain-text template from an HTML template, keeping placeholders"""
+    header, body = split_header_block(html_source)
+    parser = _get_html_to_text_parser()()
+    parser.feed(body)
+    parser.close()
+    return header + ("\n" if header else "") + parser.get_text()
+
+
+def _split_items(value) -> List[str]:
+    """Turn a field value into loop items (textarea values split by line)"""
+    if isinstance(value, (list, tuple)):
+        return [str(item) for item in value]
+    items = []
+    for line in value.splitlines():
+        line = LIST_MARKER_PATTERN.sub("", line.strip())
+        if line:
+            items.append(line)
+    return items
+
+
+def parse_template(source: str) -> tuple:
+    """
+    Parse template source into a tree of plain tuples
+    
+    Nodes are ("text", str), ("var", name), ("item",),
+    ("if", name, then_nodes, else_nodes) and ("each", name, body_nodes).
+    Block tags that sit alone on a line take the whole line with them, so
+    skipped sections leave no blank lines behind.
+    """
+    source = STANDALONE_TAG_PATTERN.sub(r"\1", source)
+    
+    root = []
+    stack = []  # (kind, name, then_nodes, else_nodes)
+    current = root
+    position = 0
+    
+    for match in TAG_PATTERN.finditer(source):
+        if match.start() > position:
+            current.append(("text", source[position:match.start()]))
+        position = match.end()
+        
+        block, block_name, else_tag, close_tag, name = match.groups()
+        if name == ".":
+            current.append(("item",))
+        elif name:
+            current.append(("var", name))
+        elif block:
+            stack.append((block[1:], block_name, [], None))
+            current = stack[-1][2]
+        elif else_tag:
+            if not stack or stack[-1][0] != "if" or stack[-1][3] is not None:
+                raise ValueError(f"Unexpected {{#else}} at offset {match.start()}")
+            kind, block_name, then_nodes, _ = stack.pop()
+            stack.append((kind, block_name, then_nodes, []))
+            current = stack[-1][3]
+        else:
+            if not stack or stack[-1][0] != close_tag[1:]:
+                raise ValueError(f"Unexpected {{{close_tag}}} at offset {match.start()}")
+            kind, block_name, then_nodes, else_nodes = stack.pop()
+            if kind == "if":
+                node = ("if", block_name, tuple(then_nodes), tuple(else_nodes or ()))
+            else:
+                node = ("each", block_name, tuple(then_nodes))
+            current = (stack[-1][3] if stack[-1][3] is not None else stack[-1][2]) if stack else root
+            current.append(node)
+    
+    if stack:
+        raise ValueError(f"Unclosed {{#{stack[-1][0]} {stack[-1][1]}}} block")
+    if position < len(source):
+        root.append(("text", source[position:]))
+    return tuple(root)
+
+
+def _compile_nodes(nodes: tuple, escape):
+    """Compile a node sequence into a closure taking (values, item)"""
+    parts = []
+    var_slots = []
+    item_slots = []
+    block_slots = []
+    
+    for node in nodes:
+        kind = node[0]
+        if kind == "text":
+            parts.append(node[1])
+            continue
+        index = len(parts)
+        if kind == "var":
+            parts.append("{" + node[1] + "}")
+            var_slots.append((index, node[1]))
+        elif kind == "item":
+            parts.append("")
+            item_slots.append(index)
+        elif kind == "if":
+            parts.append("")
+            block_slots.append((index, _compile_if(node, escape)))
+        else:
+            parts.append("")
+            block_slots.append((index, _compile_each(node, escape)))
+    
+    var_slots = tuple(var_slots)
+    item_slots = tuple(item_slots)
+    block_slots = tuple(block_slots)
+    
+    def render(values: Dict[str, str], item: str = "") -> str:
+        out = parts[:]
+        get = values.get
+        shown = item
+        if escape is None:
+            for index, name in var_slots:
+                value = get(name)
+                if value is not None:
+                    out[index] = value
+        else:
+            for index, name in var_slots:
+                value = get(name)
+                if value is not None:
+                    out[index] = escape(value)
+            if item_slots:
+                shown = escape(item)
+        for index in item_slots:
+            out[index] = shown
+        # Nested blocks get the raw item and escape it themselves
+        for index, block in block_slots:
+            out[index] = block(values, item)
+        return "".join(out)
+    
+    return render
+
+
+def _compile_if(node: tuple, escape):
+    """Compile an {#if} block into a closure"""
+    _, name, then_nodes, else_nodes = node
+    render_then = _compile_nodes(then_nodes, escape)
+    render_else = _compile_nodes(else_nodes, escape)
+    
+    def render_if(values: Dict[str, str], item: str) -> str:
+        value = values.get(name)
+        if value and (not isinstance(value, str) or value.strip()):
+            return render_then(values, item)
+        return render_else(values, item)
+    
+    return render_if
+
+
+def _compile_each(node: tuple, escape):
+    """Compile an {#each} block into a closure"""
+    _, name, body_nodes = node
+    render_body = _compile_nodes(body_nodes, escape)
+    
+    def render_each(values: Dict[str, str], item: str) -> str:
+        value = values.get(name)
+        if not value:
+            return ""
+        return "".join([render_body(values, entry) for entry in _split_items(value)])
+    
+    return render_each
+
+
+class TemplateCache:
+    """
+    Parsed template trees keyed by a digest of their source
+    
+    Bounded LRU: every edit of a watched template file adds a new source,
+    so the trees of old versions are dropped once MAX_TREES is reached.
+    """
+    
+    MAX_TREES = 512
+    
+    _trees = OrderedDict()
+    _lock = threading.Lock()
+    
+    @staticmethod
+    def digest(source: str) -> str:
+        return hashlib.sha1(source.encode("utf-8")).hexdigest()
+    
+    @classmethod
+    def parse(cls, source: str) -> tuple:
+        """Return the parsed tree for a source, parsing only on a miss"""
+        key = cls.digest(source)
+        with cls._lock:
+            tree = cls._trees.get(key)
+            if tree is not None:
+                cls._trees.move_to_end(key)
+                return tree
+        tree = parse_template(source)
+        cls._store(key, tree)
+        return tree
+    
+    @classmethod
+    def _store(cls, key: str, tree: tuple):
+        with cls._lock:
+            cls._trees[key] = tree
+            while len(cls._trees) > cls.MAX_TREES:
+                cls._trees.popitem(last=False)
+    
+    @classmethod
+    def export(cls, sources: Iterable[str]) -> Dict[str, list]:
+        """Cached trees of the given sources, in a JSON-friendly form"""
+        keys = {cls.digest(source) for source in sources}
+        with cls._lock:
+            return {key: tree for key, tree in cls._trees.items() if key in keys}
+    
+    @classmethod
+    def load(cls, trees: Dict[str, list]):
+        """Seed the cache from exported trees"""
+        for key, nodes in trees.items():
+            if key not in cls._trees:
+                cls._store(key, cls._nodes_from_json(nodes))
+    
+    @classmethod
+    def _nodes_from_json(cls, nodes: list) -> tuple:
+        """Rebuild tuple nodes from their JSON (list) form"""
+        result = []
+        for node in nodes:
+            kind = node[0]
+            if kind in ("text", "var"):
+                result.append((kind, str(node[1])))
+            elif kind == "item":
+                result.append(("item",))
+            elif kind == "if":
+                result.append(("if", str(node[1]), cls._nodes_from_json(node[2]),
+                               cls._nodes_from_json(node[3])))
+            elif kind == "each":
+                result.append(("each", str(node[1]), cls._nodes_from_json(node[2])))
+            else:
+                raise ValueError(f"Unknown template node: {kind}")
+        return tuple(result)
+
+
+# Bounded like TemplateCache; templates keep their own renderers, so an
+# evicted entry only costs a recompile for the next identical source
+MAX_RENDERERS = 512
+_RENDERERS = OrderedDict()
+_RENDERERS_LOCK = threading.Lock()
+
+
+def compile_template(source: str, escape=None):
+    """
+    Compile a template into a render function
+    
+    Parsing happens once here; the returned function only walks
+    prebuilt closures, filling placeholder slots and joining literals.
+    Placeholders without a value are left in place. Renderers hold no
+    per-template state, so identical sources share one.
+    """
+    key = (TemplateCache.digest(source), escape)
+    with _RENDERERS_LOCK:
+        render = _RENDERERS.get(key)
+        if render is not None:
+            _RENDERERS.move_to_end(key)
+            return render
+    render = _compile_nodes(TemplateCache.parse(source), escape)
+    with _RENDERERS_LOCK:
+        _RENDERERS[key] = render
+        while len(_RENDERERS) > MAX_RENDERERS:
+            _RENDERERS.popitem(last=False)
+    return render
+
+
+class TemplatePartials:
+    """
+    Named partials and layouts, flattened into templates when they load
+    
+    A template includes a partial with {>name}. A template that starts
+    with {#extends name} supplies {#block x}...{/block} sections that
+    replace the layout's blocks of the same name (the layout's block
+    text is the default). The result is ordinary template source, so
+    rendering costs the same as for a hand-written template.
+    Re-registering a partial re-flattens only the templates using it,
+    and only once every one of them still compiles.
+    """
+    
+    _sources = {}
+    _dependents = {}
+    
+    @classmethod
+    def register(cls, name: str, source: str) -> int:
+        """
+        Add or replace a partial
+        
+        Raises ValueError, keeping the previous source, if a template
+        using the partial would no longer compile.
+        
+        Returns:
+            int: number of loaded templates that were re-flattened
+        """
+        previous = cls._sources.get(name)
+        if previous == source:
+            return 0
+        cls._sources[name] = source
+        dependents = list(cls._dependents.get(name, ()))
+        try:
+            for template in dependents:
+                template.check()
+        except ValueError as e:
+            if previous is None:
+                del cls._sources[name]
+            else:
+                cls._sources[name] = previous
+            raise ValueError(f"{template.name}: {e}") from e
+        
+        for template in dependents:
+            template.flatten()
+        return len(dependents)
+    
+    @classmethod
+    def get(cls, name: str) -> Optional[str]:
+        return cls._sources.get(name)
+    
+    @classmethod
+    def track(cls, template, names: Iterable[str]):
+        """Record that a template was flattened from these partials"""
+        import weakref
+        
+        for dependents in cls._dependents.values():
+            dependents.discard(template)
+        for name in names:
+            dependents = cls._dependents.get(name)
+            if dependents is None:
+                dependents = cls._dependents[name] = weakref.WeakSet()
+            dependents.add(template)
+    
+    @classmethod
+    def flatten(cls, source: str) -> tuple:
+        """
+        Resolve partials and layouts in a template source
+        
+        Returns:
+            tuple: (flattened source, frozenset of partial names used)
+        """
+        if "{>" not in source and "{#extends" not in source and "{#block" not in source:
+            return source, frozenset()
+        used = set()
+        return cls._expand(source, {}, (), used), frozenset(used)
+    
+    @classmethod
+    def _expand(cls, source: str, overrides: Dict[str, str], chain: tuple,
+                used: set) -> str:
+        source = STANDALONE_LAYOUT_TAG_PATTERN.sub(r"\1", source)
+        
+        match = EXTENDS_PATTERN.match(source)
+        if match:
+            blocks = {name: body for name, body in BLOCK_PATTERN.findall(source)}
+            # The most derived template's blocks win
+            blocks.update(overrides)
+            return cls._expand(cls._resolve(match.group(1), chain, used), blocks,
+                               chain + (match.group(1),), used)
+        
+        if overrides:
+            source = BLOCK_PATTERN.sub(
+                lambda block: overrides.get(block.group(1), block.group(2)), source)
+        else:
+            source = BLOCK_PATTERN.sub(r"\2", source)
+        
+        return PARTIAL_PATTERN.sub(
+            lambda include: cls._expand(cls._resolve(include.group(1), chain, used), {},
+                                        chain + (include.group(1),), used),
+            source)
+    
+    @classmethod
+    def _resolve(cls, name: str, chain: tuple, used: set) -> str:
+        if name in chain:
+            raise ValueError(f"Partial cycle: {' -> '.join(chain + (name,))}")
+        source = cls._sources.get(name)
+        if source is None:
+            raise ValueError(f"Unknown partial: {name}")
+        used.add(name)
+        return source
+
+
+class TemplateField:
+    """Immutable form field definition, shared between templates"""
+    
+    __slots__ = ("name", "label", "type", "placeholder", "options", "required",
+                 "max_length")
+    
+    _registry = {}
+    
+    def __init__(self, name: str, label: str, type: str = "text",
+                 placeholder: str = "", options: tuple = (), required: bool = True,
+                 max_length: int = 0):
+        setattr_ = object.__setattr__
+        setattr_(self, "name", sys.intern(name))
+        setattr_(self, "label", sys.intern(label))
+        setattr_(self, "type", sys.intern(type))
+        setattr_(self, "placeholder", placeholder)
+        setattr_(self, "options", tuple(options))
+        setattr_(self, "required", bool(required))
+        setattr_(self, "max_length", int(max_length or 0))
+    
+    def __setattr__(self, key, value):
+        raise AttributeError("TemplateField is immutable")
+    
+    def __delattr__(self, key):
+        raise AttributeError("TemplateField is immutable")
+    
+    def __repr__(self):
+        return f"TemplateField({self.name!r}, {self.label!r}, {self.type!r})"
+    
+    @classmethod
+    def intern(cls, name: str, label: str, type: str = "text", placeholder: str = "",
+               options: Sequence[str] = (), required: bool = True,
+               max_length: int = 0) -> "TemplateField":
+        """Return the shared instance for this definition, creating it once"""
+        key = (name, label, type, placeholder, tuple(options), bool(required),
+               int(max_length or 0))
+        field = cls._registry.get(key)
+        if field is None:
+            field = cls(*key)
+            cls._registry[key] = field
+        return field
+    
+    @classmethod
+    def coerce(cls, spec) -> "TemplateField":
+        """Accept either a TemplateField or the dict form used in template definitions"""
+        if isinstance(spec, cls):
+            return spec
+        return cls.intern(
+            spec["name"],
+            spec["label"],
+            spec.get("type", "text"),
+            spec.get("placeholder", ""),
+            spec.get("options", ()),
+            spec.get("required", True),
+            spec.get("max_length", 0),
+        )
+    
+    def to_dict(self) -> Dict:
+        """Dict form of the field, as used in template definitions"""
+        data = {"name": self.name, "label": self.label, "type": self.type}
+        if self.placeholder:
+            data["placeholder"] = self.placeholder
+        if self.options:
+            data["options"] = list(self.options)
+        if not self.required:
+            data["required"] = False
+        if self.max_length:
+            data["max_length"] = self.max_length
+        return data
+    
+    # Dict-style access keeps existing field["name"] code working
+    def __getitem__(self, key: str):
+        if key in self.__slots__:
+            return getattr(self, key)
+        raise KeyError(key)
+    
+    def get(self, key: str, default=None):
+        if key in self.__slots__:
+            return getattr(self, key)
+        return default
+
+
+class MergeTable:
+    """Mail-merge data held column by column"""
+    
+    def __init__(self, columns: Dict[str, List[str]], row_count: int,
+                 unreadable: Optional[Dict[int, str]] = None):
+        self.columns = columns
+        self.row_count = row_count
+        # row -> why its record could not be read; such rows hold empty values
+        self.unreadable = unreadable or {}
+    
+    def __len__(self) -> int:
+        return self.row_count
     
-    @staticmethod
-    def save_credentials(email: str, app_password: str):
-        """Save Gmail credentials (encoded for basic obfuscation)"""
-        data = {
-            "email": base64.b64encode(email.encode()).decode(),
-            "password": base64.b64encode(app_password.encode()).decode()
-        }
-        try:
-            with open(GmailConfig.CONFIG_FILE, 'w') as f:
-                json.dump(data, f)
-            return True
-        except Exception as e:
-            print(f"Error saving credentials: {e}")
-            return False
+    @classmethod
+    def from_rows(cls, header: Sequence[str], rows: Sequence[Sequence[str]]) -> "MergeTable":
+        """Transpose rows into columns; short rows are padded with empty values"""
+        columns = {}
+        for index, name in enumerate(header):
+            name = name.strip()
+            if name and name not in columns:
+                columns[name] = [row[index] if len(row) > index else "" for row in rows]
+        return cls(columns, len(rows))
+    
+    @classmethod
+    def from_csv(cls, path: str, encoding: str = "utf-8-sig") -> "MergeTable":
+        """Load a CSV file whose first row names the template fields"""
+        import csv
+        
+        with open(path, newline="", encoding=encoding) as f:
+            reader = csv.reader(f)
+            header = next(reader, [])
+            rows = list(reader)
+        return cls.from_rows(header, rows)
+    
+    def column(self, name: str) -> Optional[List[str]]:
+        return self.columns.get(name)
+    
+    def row(self, index: int) -> Dict[str, str]:
+        """Values of one row, as passed to EmailTemplate.generate"""
+        return {name: column[index] for name, column in self.columns.items()}
+
+
+class MergeReport:
+    """
+    Per-row error bitmap for a merge table checked against a template
+    
+    row_errors holds one integer per row with bit i set when field i of
+    the template failed for that row; problems counts failures per field
+    and kind. Rows whose record could not be read at all are kept apart
+    in `unreadable` and never marked against a field.
+    """
+    
+    MISSING = "missing"
+    NOT_AN_OPTION = "not an allowed option"
+    TOO_LONG = "too long"
+    DUPLICATE = "duplicate address"
+    
+    SAMPLE_ROWS = 5
+    
+    def __init__(self, fields: Sequence[TemplateField], row_count: int):
+        from array import array
+        
+        self.fields = tuple(fields)
+        self.row_count = row_count
+        # 8 bytes per row; wider templates fall back to Python ints
+        self.row_errors = (array("Q", bytes(8 * row_count)) if len(self.fields) <= 64
+                           else [0] * row_count)
+        self.problems = {}        # (field name, problem) -> count
+        self.samples = {}         # (field name, problem) -> first few rows
+        self.missing_columns = []
+        self.unreadable = {}      # row -> message
+    
+    def mark(self, field_index: int, problem: str, rows: Sequence[int]):
+        """Flag `rows` as failing the field at `field_index`"""
+        if self.unreadable:
+            rows = [row for row in rows if row not in self.unreadable]
+        if not rows:
+            return
+        bit = 1 << field_index
+        errors = self.row_errors
+        for row in rows:
+            errors[row] |= bit
+        key = (self.fields[field_index].name, problem)
+        self.problems[key] = self.problems.get(key, 0) + len(rows)
+        self.samples.setdefault(key, list(rows[:self.SAMPLE_ROWS]))
+    
+    def append(self, other: "MergeReport"):
+        """Add the rows of a later batch checked against the same fields"""
+        offset = self.row_count
+        self.row_errors.extend(other.row_errors)
+        for key, count in other.problems.items():
+            self.problems[key] = self.problems.get(key, 0) + count
+            samples = self.samples.setdefault(key, [])
+            room = self.SAMPLE_ROWS - len(samples)
+            if room > 0:
+                samples.extend(offset + row for row in other.samples.get(key, ())[:room])
+        for name in other.missing_columns:
+            if name not in self.missing_columns:
+                self.missing_columns.append(name)
+        for row, message in other.unreadable.items():
+            self.unreadable[offset + row] = message
+        self.row_count += other.row_count
+    
+    @property
+    def failed_rows(self) -> int:
+        return self.row_count - self.row_errors.count(0) + len(self.unreadable)
+    
+    @property
+    def ok(self) -> bool:
+        return not self.problems and not self.unreadable
+    
+    def errors_for(self, row: int) -> List[str]:
+        """Names of the fields that failed for one row"""
+        mask = self.row_errors[row]
+        return [field.name for index, field in enumerate(self.fields) if mask >> index & 1]
+    
+    def valid_rows(self) -> List[int]:
+        unreadable = self.unreadable
+        return [row for row, mask in enumerate(self.row_errors)
+                if not mask and row not in unreadable]
+    
+    def summary(self) -> str:
+        """Short human-readable summary"""
+        return (f"{self.row_count - self.failed_rows} of {self.row_count} rows ready, "
+                f"{self.failed_rows} with problems")
+    
+    def report_lines(self) -> List[str]:
+        """One line per failing field and problem, with example rows"""
+        lines = [f"Missing column: {name}" for name in self.missing_columns]
+        for (name, problem), count in self.problems.items():
+            examples = ", ".join(str(row + 1) for row in self.samples.get((name, problem), ()))
+            line = f"{name}: {count} rows {problem}"
+            if examples:
+                line += f" (e.g. rows {examples})"
+            lines.append(line)
+        if self.unreadable:
+            examples = "; ".join(list(self.unreadable.values())[:self.SAMPLE_ROWS])
+            lines.append(f"{len(self.unreadable)} rows unreadable (e.g. {examples})")
+        return lines
+    
+    def write_report(self, path: str):
+        """Write every failing row and its fields to a CSV report"""
+        import csv
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(["row", "fields"])
+            for row, mask in enumerate(self.row_errors):
+                if mask:
+                    writer.writerow([row + 1, " ".join(self.errors_for(row))])
+                elif row in self.unreadable:
+                    writer.writerow([row + 1, self.unreadable[row]])
+
+
+class MergeValidator:
+    """
+    Checks a whole MergeTable against a template's fields before sending
+    
+    Each field is checked down its column in one pass: required values,
+    select options and length limits. A cheap whole-column test (done in
+    C by builtins) runs first, so clean columns never reach the per-row
+    Python loop.
+    """
     
     @staticmethod
-    def load_credentials() -> Optional[Dict[str, str]]:
-        """Load saved Gmail credentials"""
-        try:
-            if os.path.exists(GmailConfig.CONFIG_FILE):
-                with open(GmailConfig.CONFIG_FILE, 'r') as f:
-                    data = json.load(f)
-                return {
-                    "email": base64.b64decode(data["email"]).decode(),
-                    "password": base64.b64decode(data["password"]).decode()
-                }
-        except Exception as e:
-            print(f"Error loading credentials: {e}")
-        return None
+    def validate(template, table: MergeTable) -> MergeReport:
+        fields = template.fields if hasattr(template, "fields") else tuple(template)
+        report = MergeReport(fields, len(table))
+        report.unreadable = dict(table.unreadable)
+        
+        for index, field in enumerate(report.fields):
+            column = table.column(field.name)
+            if column is None:
+                if field.required:
+                    report.missing_columns.append(field.name)
+                    report.mark(index, MergeReport.MISSING, range(len(table)))
+                continue
+            
+            if field.required and not all(map(str.strip, column)):
+                report.mark(index, MergeReport.MISSING,
+                            [row for row, value in enumerate(column)
+                             if not value or value.isspace()])
+            
+            if field.options:
+                allowed = frozenset(field.options)
+                allowed_or_empty = allowed | {""}
+                if not set(column) <= allowed_or_empty:
+                    report.mark(index, MergeReport.NOT_AN_OPTION,
+                                [row for row, value in enumerate(column)
+                                 if value and value not in allowed])
+            
+            limit = field.max_length
+            if limit and column and max(map(len, column)) > limit:
+                report.mark(index, MergeReport.TOO_LONG,
+                            [row for row, value in enumerate(column) if len(value) > limit])
+        
+        return report
     
     @staticmethod
-    def delete_credentials():
-        """Delete saved credentials"""
-        try:
-            if os.path.exists(GmailConfig.CONFIG_FILE):
-                os.remove(GmailConfig.CONFIG_FILE)
-            return True
-        except Exception as e:
-            print(f"Error deleting credentials: {e}")
-            return False
+    def check_values(template, values: Dict[str, str]) -> List[Tuple[TemplateField, str]]:
+        """Problems with a single set of form values, as (field, problem)"""
+        table = MergeTable({name: [value] for name, value in values.items()}, 1)
+        report = MergeValidator.validate(template, table)
+        return [(field, problem) for field in report.fields
+                for (name, problem) in report.problems if name == field.name]
 
 
-class EmailSender:
-    """Handles email sending via Gmail SMTP"""
+class MergeReader:
+    """
+    Streams merge records out of a memory-mapped CSV or JSONL file
+    
+    The file is scanned a slice at a time, so memory stays bounded by the
+    slice and batch sizes however large the file is. Only the columns
+    named in `columns` (normally the template's fields) are decoded.
+    Every batch reports the byte offset of the next record, which can be
+    passed back as `start` to resume an interrupted run.
+    """
+    
+    SLICE_BYTES = 4 * 1024 * 1024
+    BATCH_ROWS = 10000
+    
+    def __init__(self, path: str, columns: Optional[Iterable[str]] = None,
+                 format: Optional[str] = None):
+        import mmap
+        
+        self.path = path
+        self.format = format or ("jsonl" if path.lower().endswith((".jsonl", ".ndjson"))
+                                 else "csv")
+        self._file = open(path, "rb")
+        self.size = os.fstat(self._file.fileno()).st_size
+        self._mm = None
+        if self.size:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            if hasattr(self._mm, "madvise"):
+                # Pages behind the scan can be dropped early
+                self._mm.madvise(mmap.MADV_SEQUENTIAL)
+        
+        self.header = []
+        self.data_start = 0
+        if self.format == "csv" and self._mm is not None:
+            end = self._record_end(0)
+            self.header = [name.strip() for name in self._parse_csv(self._mm[0:end])]
+            self.data_start = end
+        
+        names = list(columns) if columns is not None else list(self.header)
+        if self.format == "csv":
+            positions = {name: index for index, name in reversed(list(enumerate(self.header)))}
+            self.columns = [name for name in names if name in positions]
+            self._indexes = [positions[name] for name in self.columns]
+        else:
+            self.columns = names
+    
+    @classmethod
+    def for_template(cls, path: str, template) -> "MergeReader":
+        """Reader decoding only the fields the template uses"""
+        return cls(path, [field.name for field in template.fields])
+    
+    def estimate_records(self) -> int:
+        """Number of lines after the header; exact unless quoted values span lines"""
+        count = 0
+        for _, chunk in self._slices(self.data_start):
+            count += chunk.count(b"\n")
+        if self.size > self.data_start and self._mm[self.size - 1] != ord("\n"):
+            count += 1
+        return count
+    
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def batches(self, size: int = BATCH_ROWS, start: int = 0):
+        """
+        Yield (MergeTable, next offset) for up to `size` records at a time
+        
+        `start` is 0 for the beginning of the file, or an offset from a
+        previous batch to resume after it.
+        """
+        columns = {name: [] for name in self.columns}
+        appenders = [columns[name].append for name in self.columns]
+        unreadable = {}
+        rows = 0
+        offset = start
+        for offset, values, problem in self._records(start):
+            for append, value in zip(appenders, values):
+                append(value)
+            if problem:
+                unreadable[rows] = problem
+            rows += 1
+            if rows == size:
+                yield MergeTable(columns, rows, unreadable), offset
+                columns = {name: [] for name in self.columns}
+                appenders = [columns[name].append for name in self.columns]
+                unreadable = {}
+                rows = 0
+        if rows:
+            yield MergeTable(columns, rows, unreadable), offset
+    
+    def _records(self, start: int):
+        """
+        Yield (offset after the record, values in `columns` order, problem)
+        
+        `problem` is None, or a message for a record that could not be
+        read; its values are then all empty.
+        """
+        if self._mm is None:
+            return
+        position = max(start, self.data_start)
+        if self.format == "csv":
+            yield from self._csv_records(position)
+        else:
+            yield from self._jsonl_records(position)
+    
+    def _slices(self, position: int):
+        """Yield (slice start, bytes) cut on line boundaries"""
+        mm = self._mm
+        while position < self.size:
+            end = min(self.size, position + self.SLICE_BYTES)
+            if end < self.size:
+                newline = mm.rfind(b"\n", position, end)
+                if newline < 0:
+                    newline = mm.find(b"\n", end)
+                end = self.size if newline < 0 else newline + 1
+            yield position, mm[position:end]
+            position = end
+    
+    def _csv_records(self, position: int):
+        indexes = self._indexes
+        width = max(indexes) + 1 if indexes else 0
+        pending = None  # start offset of a quoted record spanning lines
+        
+        for base, chunk in self._slices(position):
+            offset = base
+            quoted = b'"' in chunk
+            for line in chunk.split(b"\n"):
+                if offset >= base + len(chunk):
+                    break  # the empty string after the final newline
+                line_start = offset
+                offset += len(line) + 1
+                if pending is None and (not quoted or b'"' not in line):
+                    # Fast path: no quoting, split and decode only what is used
+                    if line.endswith(b"\r"):
+                        line = line[:-1]
+                    if not line:
+                        continue
+                    cells = line.split(b",")
+                    if len(cells) < width:
+                        cells += [b""] * (width - len(cells))
+                    yield min(offset, self.size), [cells[i].decode("utf-8", "replace")
+                                                   for i in indexes], None
+                    continue
+                
+                if pending is None:
+                    pending = line_start
+                record = self._mm[pending:min(offset, self.size)]
+                if record.count(b'"') % 2:
+                    continue  # newline inside quotes; keep reading
+                pending = None
+                cells = self._parse_csv(record)
+                if not cells:
+                    continue
+                cells += [""] * (width - len(cells))
+                yield min(offset, self.size), [cells[i] for i in indexes], None
+        
+        if pending is not None:
+            # Unterminated quote at end of file: take the rest as one record
+            cells = self._parse_csv(self._mm[pending:self.size])
+            cells += [""] * (width - len(cells))
+            yield self.size, [cells[i] for i in indexes], None
+    
+    def _jsonl_records(self, position: int):
+        names = self.columns
+        blank = [""] * len(names)
+        first_line = None  # counted only once a bad line needs its number
+        lines = 0
+        for base, chunk in self._slices(position):
+            offset = base
+            for line in chunk.split(b"\n"):
+                if offset >= base + len(chunk):
+                    break
+                offset += len(line) + 1
+                lines += 1
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                    get = record.get
+                except (ValueError, AttributeError) as e:
+                    # Report the line and keep going; one bad line must not end the run
+                    if first_line is None:
+                        first_line = self._line_number(position)
+                    problem = ("not a JSON object" if isinstance(e, AttributeError)
+                               else "not valid JSON")
+                    number = first_line + lines - 1
+                    yield min(offset, self.size), blank, f"Line {number}: {problem}"
+                    continue
+                values = []
+                for name in names:
+                    value = get(name)
+                    if value is None:
+                        value = ""
+                    elif isinstance(value, list):
+                        # One item per line, as {#each} expects
+                        value = "\n".join(str(item) for item in value)
+                    elif not isinstance(value, str):
+                        value = str(value)
+                    values.append(value)
+                yield min(offset, self.size), values, None
+    
+    def _line_number(self, position: int) -> int:
+        """1-based number of the line starting at `position`"""
+        count = 1
+        for start in range(0, position, self.SLICE_BYTES):
+            count += self._mm[start:min(position, start + self.SLICE_BYTES)].count(b"\n")
+        return count
+    
+    def _record_end(self, position: int) -> int:
+        """Offset just past the CSV record starting at `position`"""
+        end = position
+        while True:
+            newline = self._mm.find(b"\n", end)
+            end = self.size if newline < 0 else newline + 1
+            if self._mm[position:end].count(b'"') % 2 == 0 or end >= self.size:
+                return end
     
     @staticmethod
-    def send_email(from_email: str, app_password: str, to_email: str, 
-                   subject: str, body: str) -> tuple[bool, str]:
+    def _parse_csv(record: bytes) -> List[str]:
+        import csv
+        
+        text = record.decode("utf-8-sig", "replace").rstrip("\r\n")
+        if not text:
+            return []
+        return next(csv.reader([text]), [])
+
+
+class MergeCheck:
+    """
+    Checks every row of a merge file before a bulk send starts
+    
+    Each batch goes through MergeValidator, then its recipient column
+    through RecipientValidator, so unreadable, invalid and duplicate rows
+    are all known, and reported, before the first message goes out.
+    A check reads its file once: run() for the totals in `report` and
+    `recipients`, or batches() to stream the checked rows for sending.
+    """
+    
+    RECIPIENT_FIELD = "recipient_email"
+    
+    def __init__(self, path: str, template, batch_size: Optional[int] = None):
+        self.path = path
+        self.template = template
+        self.batch_size = batch_size or MergeReader.BATCH_ROWS
+        self.report = MergeReport(template.fields, 0)
+        self.recipients = ValidationReport()
+    
+    @property
+    def ready(self) -> int:
+        """Rows that passed every check"""
+        return self.report.row_count - self.report.failed_rows
+    
+    def run(self) -> "MergeCheck":
+        for _ in self.batches():
+            pass
+        return self
+    
+    def batches(self):
         """
-        Send email using Gmail SMTP
+        Yield (MergeTable, MergeReport) per batch, adding each to the totals
         
-        Returns:
-            tuple: (success: bool, message: str)
+        Valid recipient addresses are replaced in the table by their
+        normalized form, as they will be sent.
         """
-        try:
-            # Create message
-            msg = MIMEMultipart()
-            msg['From'] = from_email
-            msg['To'] = to_email
-            msg['Subject'] = subject
-            
-            # Add body
-            msg.attach(MIMEText(body, 'plain'))
-            
-            # Connect to Gmail SMTP server
-            server = smtplib.SMTP('smtp.gmail.com', 587)
-            server.starttls()
-            
-            # Login
-            server.login(from_email, app_password)
-            
-            # Send email
-            server.send_message(msg)
-            server.quit()
-            
-            return True, "Email sent successfully!"
-            
-        except smtplib.SMTPAuthenticationError:
-            return False, "Authentication failed. Please check your email and app password."
-        except smtplib.SMTPException as e:
-            return False, f"SMTP error: {str(e)}"
-        except Exception as e:
-            return False, f"Error sending email: {str(e)}"
+        names = [field.name for field in self.report.fields]
+        index = names.index(self.RECIPIENT_FIELD) if self.RECIPIENT_FIELD in names else None
+        with MergeReader.for_template(self.path, self.template) as reader:
+            for table, _ in reader.batches(self.batch_size):
+                report = MergeValidator.validate(self.template, table)
+                column = table.column(self.RECIPIENT_FIELD)
+                if index is not None and column is not None:
+                    self._check_recipients(report, index, column)
+                self.report.append(report)
+                yield table, report
+    
+    def _check_recipients(self, report: MergeReport, index: int, column: List[str]):
+        recipients = self.recipients
+        first = recipients.total
+        valid = len(recipients.valid)
+        rejected = len(recipients.rejected)
+        duplicates = len(recipients.duplicates)
+        RecipientValidator.validate_many(column, recipients)
+        
+        # Rows already failing this field (an empty required address) keep that one problem
+        bit = 1 << index
+        errors = report.row_errors
+        by_reason = {}
+        for row, _, reason in recipients.rejected[rejected:]:
+            if not errors[row - first] & bit:
+                by_reason.setdefault(reason, []).append(row - first)
+        for reason, rows in by_reason.items():
+            report.mark(index, reason, rows)
+        report.mark(index, MergeReport.DUPLICATE,
+                    [row - first for row, _, _ in recipients.duplicates[duplicates:]])
+        
+        for row, address in zip(recipients.valid_rows[valid:], recipients.valid[valid:]):
+            column[row - first] = address
 
 
 class EmailTemplate:
     """Represents an email template with placeholders"""
     
-    def __init__(self, name: str, template: str, fields: List[Dict]):
+    __slots__ = ("name", "template", "fields", "html", "revision", "_source",
+                 "_html_source", "_html_body", "_render_text", "_render_html",
+                 "__weakref__")
+    
+    def __init__(self, name: str, template: str, fields: Sequence,
+                 html: Optional[str] = None):
         self.name = name
+        self.fields = tuple(TemplateField.coerce(field) for field in fields)
+        self._source = template
+        self._html_source = html
+        self.revision = 0
+        self.flatten()
+    
+    def flatten(self):
+        """Resolve partials and layouts; called again when a partial changes"""
+        template, html, used = self._flattened()
         self.template = template
-        self.fields = fields
+        self.html = html
+        self._html_body = split_header_block(html)[1].strip() if html else None
+        
+        # Compiled on first render so large libraries load quickly
+        self._render_text = None
+        self._render_html = None
+        self.revision += 1
+        if used or self.revision > 1:
+            TemplatePartials.track(self, used)
+    
+    def _flattened(self) -> tuple:
+        template, used = TemplatePartials.flatten(self._source or "")
+        html = None
+        if self._html_source:
+            html, html_used = TemplatePartials.flatten(self._html_source)
+            used = used | html_used
+        
+        # Derive the plain-text part from the HTML once, not per message
+        if html and not template:
+            template = html_to_text(html)
+        return template, html, used
+    
+    def check(self):
+        """Raise ValueError if the current partials would not flatten and compile"""
+        template, html, _ = self._flattened()
+        compile_template(template)
+        if html:
+            compile_template(split_header_block(html)[1].strip(), escape_html)
+    
+    def sources(self) -> List[str]:
+        """The sources compiled for rendering, as TemplateCache keys them"""
+        return [self.template] if self._html_body is None else [self.template, self._html_body]
+    
+    @property
+    def has_html(self) -> bool:
+        """Whether the template carries an HTML variant"""
+        return self._html_body is not None
     
     def generate(self, values: Dict[str, str]) -> str:
         """Generate email by replacing placeholders with values"""
-        email = self.template
-        for key, value in values.items():
-            placeholder = f"{{{key}}}"
-            email = email.replace(placeholder, value)
-        return email
+        render = self._render_text
+        if render is None:
+            render = self._render_text = compile_template(self.template)
+        return render(values)
+    
+    def compile(self):
+        """Compile the renderers now rather than on first use"""
+        if self._render_text is None:
+            self._render_text = compile_template(self.template)
+        if self._html_body is not None and self._render_html is None:
+            self._render_html = compile_template(self._html_body, escape_html)
+    
+    def message_for(self, values: Dict[str, str]) -> Dict:
+        """Render a message dict (to_email, subject, body, html_body) for sending"""
+        header, body = split_header_block(self.generate(values))
+        message = {
+            "to_email": values.get("recipient_email", ""),
+            "subject": "",
+            "body": body.strip(),
+            "html_body": self.generate_html(values),
+        }
+        for line in header.split("\n"):
+            if line.startswith("To: "):
+                message["to_email"] = line[4:].strip()
+            elif line.startswith("Subject: "):
+                message["subject"] = line[9:].strip()
+        if not message["subject"]:
+            message["subject"] = "Email from Email Generator Bot"
+        return message
+    
+    def generate_html(self, values: Dict[str, str]) -> Optional[str]:
+        """Generate the HTML body, or None when the template is plain text only"""
+        if self._html_body is None:
+            return None
+        render = self._render_html
+        if render is None:
+            render = self._render_html = compile_template(self._html_body, escape_html)
+        return render(values)
 
 
 class EmailTemplateLibrary:
     """Manages all email templates"""
     
+    # Shared greeting, closing and signature; templates fill in the blocks
+    LETTER_LAYOUT = """To: {recipient_email}
+Subject: {#block subject}{/block}
+
+Dear {recipient_name},
+
+{#block body}
+{/block}
+
+{#block closing}Best regards,{/block}
+{#block signature}{sender_name}{/block}"""
+    
+    PARTIALS = {
+        "letter": LETTER_LAYOUT,
+        "titled_signature": "{sender_name}\n{sender_title}",
+    }
+    
+    SENDER_NAME_FIELD = {"name": "sender_name", "label": "Your Name", "type": "text", "placeholder": "e.g., John Smith"}
+    
+    @staticmethod
+    def register_partials():
+        """Make the built-in layout and partials available to templates"""
+        for name, source in EmailTemplateLibrary.PARTIALS.items():
+            TemplatePartials.register(name, source)
+    
+    @staticmethod
+    def template_from_dict(data: Dict) -> EmailTemplate:
+        """Build a template from its JSON definition"""
+        if not data.get("template") and not data.get("html"):
+            raise ValueError("a template needs 'template' or 'html' text")
+        return EmailTemplate(
+            name=str(data["name"]),
+            template=data.get("template") or "",
+            fields=data.get("fields") or [],
+            html=data.get("html")
+        )
+    
+    @staticmethod
+    def apply_changes(templates: Dict[str, EmailTemplate], changes: Sequence[tuple],
+                      builtins: Dict[str, EmailTemplate]) -> set:
+        """
+        Apply TemplateWatcher changes to a template dict
+        
+        Changed templates and partials are compiled (a partial together
+        with every template using it) before being swapped in, so a broken
+        file leaves the previous version in place. A deleted
+        file falls back to the built-in template or partial of that name.
+        
+        Returns:
+            set: ids of templates that were added, replaced, re-flattened
+            or removed
+        """
+        changed = set()
+        revisions = {}
+        for kind, name, data in changes:
+            if kind == "partial":
+                if not revisions:
+                    revisions = {template_id: (template, template.revision)
+                                 for template_id, template in templates.items()}
+                source = data if data is not None else EmailTemplateLibrary.PARTIALS.get(name)
+                if source is None:
+                    continue  # templates keep the text they were flattened with
+                try:
+                    TemplatePartials.register(name, source)
+                except ValueError as e:
+                    # register() has kept the previous source
+                    print(f"Error loading partial {name}: {e}")
+                continue
+            
+            if data is None:
+                if name in builtins:
+                    templates[name] = builtins[name]
+                else:
+                    templates.pop(name, None)
+                changed.add(name)
+                continue
+            try:
+                template = EmailTemplateLibrary.template_from_dict(data)
+                template.compile()
+            except (KeyError, TypeError, ValueError) as e:
+                print(f"Error loading template {name}: {e}")
+                continue
+            templates[name] = template
+            changed.add(name)
+        
+        for template_id, (template, revision) in revisions.items():
+            if template.revision != revision and templates.get(template_id) is template:
+                changed.add(template_id)
+        return changed
+    
     @staticmethod
     def get_templates() -> Dict[str, EmailTemplate]:
         """Returns all available email templates"""
+        EmailTemplateLibrary.register_partials()
+        sender_name_field = EmailTemplateLibrary.SENDER_NAME_FIELD
+        
         return {
             "job_application": EmailTemplate(
                 name="Job Application",
-                template="""To: {recipient_email}
-Subject: Application for {job_role} Position
-
-Dear {recipient_name},
-
+                template="""{#extends letter}
+{#block subject}Application for {job_role} Position{/block}
+{#block body}
 I am writing to express my strong interest in the {job_role} position at {company_name}. With my background in {field_of_expertise} and {years_experience} years of relevant experience, I believe I would be a valuable addition to your team.
 
+{#if additional_message}
 {additional_message}
 
+{/if}
 I have attached my resume for your review, which provides detailed information about my qualifications and achievements. I am particularly drawn to {company_name} because of {reason_for_interest}.
 
 I am available for an interview at your convenience and would welcome the opportunity to discuss how my skills and experience align with your needs. Thank you for considering my application.
 
 I look forward to hearing from you.
-
-Best regards,
-{sender_name}""",
+{/block}""",
                 fields=[
                     {"name": "recipient_email", "label": "To: (Recipient Email)", "type": "text", "placeholder": "e.g., hr@techcorp.com"},
                     {"name": "recipient_name", "label": "Recipient Name", "type": "text", "placeholder": "e.g., Hiring Manager"},
@@ -157,32 +4058,30 @@ Best regards,
                     {"name": "field_of_expertise", "label": "Field of Expertise", "type": "text", "placeholder": "e.g., software development"},
                     {"name": "years_experience", "label": "Years of Experience", "type": "text", "placeholder": "e.g., 3"},
                     {"name": "reason_for_interest", "label": "Reason for Interest", "type": "text", "placeholder": "e.g., your innovative approach to AI"},
-                    {"name": "additional_message", "label": "Additional Message (Optional)", "type": "textarea", "placeholder": "Any additional information you'd like to include"},
-                    {"name": "sender_name", "label": "Your Name", "type": "text", "placeholder": "e.g., John Smith"}
+                    {"name": "additional_message", "label": "Additional Message (Optional)", "type": "textarea", "placeholder": "Any additional information you'd like to include", "required": False},
+                    sender_name_field
                 ]
             ),
             
             "leave_request": EmailTemplate(
                 name="Leave Request",
-                template="""To: {recipient_email}
-Subject: Leave Request - {leave_type}
-
-Dear {recipient_name},
-
+                template="""{#extends letter}
+{#block subject}Leave Request - {leave_type}{/block}
+{#block body}
 I am writing to formally request {leave_type} leave from {start_date} to {end_date} ({total_days} days).
 
 Reason for leave:
 {reason}
 
-I have ensured that all my current responsibilities are up to date, and I have made arrangements for {coverage_person} to handle any urgent matters during my absence. {handover_notes}
+I have ensured that all my current responsibilities are up to date, and I have made arrangements for {coverage_person} to handle any urgent matters during my absence.{#if handover_notes} {handover_notes}{/if}
 
 I will be available via {contact_method} in case of any emergencies.
 
 Thank you for considering my request. I look forward to your approval.
-
-Best regards,
+{/block}
+{#block signature}
 {sender_name}
-{sender_position}""",
+{sender_position}{/block}""",
                 fields=[
                     {"name": "recipient_email", "label": "To: (Recipient Email)", "type": "text", "placeholder": "e.g., manager@company.com"},
                     {"name": "recipient_name", "label": "Recipient Name", "type": "text", "placeholder": "e.g., Manager Name"},
@@ -192,56 +4091,55 @@ Best regards,
                     {"name": "total_days", "label": "Total Days", "type": "text", "placeholder": "e.g., 5"},
                     {"name": "reason", "label": "Reason for Leave", "type": "textarea", "placeholder": "Briefly explain your reason"},
                     {"name": "coverage_person", "label": "Coverage Person", "type": "text", "placeholder": "e.g., Jane Doe"},
-                    {"name": "handover_notes", "label": "Handover Notes (Optional)", "type": "textarea", "placeholder": "Any additional handover information"},
+                    {"name": "handover_notes", "label": "Handover Notes (Optional)", "type": "textarea", "placeholder": "Any additional handover information", "required": False},
                     {"name": "contact_method", "label": "Emergency Contact Method", "type": "text", "placeholder": "e.g., phone or email"},
-                    {"name": "sender_name", "label": "Your Name", "type": "text", "placeholder": "e.g., John Smith"},
+                    sender_name_field,
                     {"name": "sender_position", "label": "Your Position", "type": "text", "placeholder": "e.g., Software Engineer"}
                 ]
             ),
             
             "apology": EmailTemplate(
                 name="Professional Apology",
-                template="""To: {recipient_email}
-Subject: Sincere Apology - {apology_subject}
-
-Dear {recipient_name},
-
+                template="""{#extends letter}
+{#block subject}Sincere Apology - {apology_subject}{/block}
+{#block body}
 I am writing to sincerely apologize for {incident_description}. I understand that this has caused {impact_description}, and I take full responsibility for my actions.
 
+{#if explanation}
 {explanation}
 
+{/if}
 To prevent this from happening again, I have taken the following steps:
-{corrective_actions}
+{#each corrective_actions}
+- {.}
+{/each}
 
 I value our {relationship_type} relationship and am committed to ensuring this does not affect our future {relationship_context}. If there is anything more I can do to rectify this situation, please let me know.
 
 Once again, I apologize for any inconvenience or disappointment this may have caused.
-
-Sincerely,
-{sender_name}
-{sender_title}""",
+{/block}
+{#block closing}Sincerely,{/block}
+{#block signature}{>titled_signature}{/block}""",
                 fields=[
                     {"name": "recipient_email", "label": "To: (Recipient Email)", "type": "text", "placeholder": "e.g., client@company.com"},
                     {"name": "recipient_name", "label": "Recipient Name", "type": "text", "placeholder": "e.g., Mr. Johnson"},
                     {"name": "apology_subject", "label": "Subject of Apology", "type": "text", "placeholder": "e.g., Missed Deadline"},
                     {"name": "incident_description", "label": "What Happened", "type": "textarea", "placeholder": "Describe the incident briefly"},
                     {"name": "impact_description", "label": "Impact/Consequence", "type": "text", "placeholder": "e.g., delays in the project timeline"},
-                    {"name": "explanation", "label": "Brief Explanation (Optional)", "type": "textarea", "placeholder": "Context if appropriate (not an excuse)"},
+                    {"name": "explanation", "label": "Brief Explanation (Optional)", "type": "textarea", "placeholder": "Context if appropriate (not an excuse)", "required": False},
                     {"name": "corrective_actions", "label": "Corrective Actions", "type": "textarea", "placeholder": "Steps you've taken to prevent recurrence"},
                     {"name": "relationship_type", "label": "Relationship Type", "type": "text", "placeholder": "e.g., professional, business"},
                     {"name": "relationship_context", "label": "Relationship Context", "type": "text", "placeholder": "e.g., collaboration, partnership"},
-                    {"name": "sender_name", "label": "Your Name", "type": "text", "placeholder": "e.g., John Smith"},
+                    sender_name_field,
                     {"name": "sender_title", "label": "Your Title/Position", "type": "text", "placeholder": "e.g., Project Manager"}
                 ]
             ),
             
             "internship_request": EmailTemplate(
                 name="Internship Request",
-                template="""To: {recipient_email}
-Subject: Internship Application - {internship_position}
-
-Dear {recipient_name},
-
+                template="""{#extends letter}
+{#block subject}Internship Application - {internship_position}{/block}
+{#block body}
 I am {sender_name}, currently pursuing {degree_program} at {university_name}, and I am writing to express my strong interest in securing an internship opportunity at {company_name} in the {department_name} department.
 
 I am particularly interested in the {internship_position} role because {reason_for_interest}. My academic background in {academic_focus} and coursework in {relevant_courses} has equipped me with foundational knowledge that I am eager to apply in a professional setting.
@@ -253,10 +4151,10 @@ I am available to intern for {duration} starting from {start_date}. I am confide
 I have attached my resume and {additional_documents} for your consideration. I would greatly appreciate the opportunity to discuss how I can contribute to {company_name}.
 
 Thank you for your time and consideration.
-
-Best regards,
+{/block}
+{#block signature}
 {sender_name}
-{university_name}""",
+{university_name}{/block}""",
                 fields=[
                     {"name": "recipient_email", "label": "To: (Recipient Email)", "type": "text", "placeholder": "e.g., internships@company.com"},
                     {"name": "recipient_name", "label": "Recipient Name", "type": "text", "placeholder": "e.g., Internship Coordinator"},
@@ -278,39 +4176,502 @@ Best regards,
             
             "formal_communication": EmailTemplate(
                 name="General Formal Communication",
-                template="""To: {recipient_email}
-Subject: {email_subject}
-
-Dear {recipient_name},
-
+                template="""{#extends letter}
+{#block subject}{email_subject}{/block}
+{#block body}
 {opening_paragraph}
 
 {main_content}
 
 {closing_paragraph}
 
+{#if call_to_action}
 {call_to_action}
 
-Thank you for your time and attention to this matter.
+{/if}
+Thank you for your time and attention to this matter.
+{/block}
+{#block signature}
+{>titled_signature}
+{sender_organization}{/block}""",
+                fields=[
+                    {"name": "recipient_email", "label": "To: (Recipient Email)", "type": "text", "placeholder": "e.g., contact@company.com"},
+                    {"name": "recipient_name", "label": "Recipient Name", "type": "text", "placeholder": "e.g., Dr. Johnson"},
+                    {"name": "email_subject", "label": "Email Subject", "type": "text", "placeholder": "Brief subject line"},
+                    {"name": "opening_paragraph", "label": "Opening Paragraph", "type": "textarea", "placeholder": "Introduce the purpose of your email"},
+                    {"name": "main_content", "label": "Main Content", "type": "textarea", "placeholder": "Detailed information or message body"},
+                    {"name": "closing_paragraph", "label": "Closing Paragraph", "type": "textarea", "placeholder": "Summarize or conclude your message"},
+                    {"name": "call_to_action", "label": "Call to Action (Optional)", "type": "textarea", "placeholder": "e.g., I look forward to your response by...", "required": False},
+                    sender_name_field,
+                    {"name": "sender_title", "label": "Your Title", "type": "text", "placeholder": "e.g., Senior Consultant"},
+                    {"name": "sender_organization", "label": "Your Organization", "type": "text", "placeholder": "e.g., ABC Consulting"}
+                ]
+            )
+        }
+
+
+class TemplateWatcher:
+    """
+    Watches the template directory for edits on a background thread
+    
+    <directory>/<id>.json holds a template definition (name, template or
+    html, fields) and <directory>/partials/<name>.txt a partial or layout.
+    Each poll is one os.scandir per directory and a stat per file,
+    compared with the previous (mtime, size), so an idle tree costs a few
+    syscalls a second. Only changed files are read. Changes are posted to
+    `changes` as lists of (kind, name, data) for the Tk thread to apply,
+    partials first; data is None when the file was deleted.
+    """
+    
+    DIRECTORY = "templates"
+    PARTIALS_DIR = "partials"
+    POLL_SECONDS = 1.0
+    
+    def __init__(self, directory: str = DIRECTORY, poll_seconds: float = POLL_SECONDS):
+        import queue
+        
+        self.directory = directory
+        self.poll_seconds = poll_seconds
+        self.changes = queue.SimpleQueue()
+        self._seen = {}
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def start(self):
+        """Poll in the background; the first scan should already have run"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="TemplateWatcher",
+                                        daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        self._stop.set()
+        self._thread = None
+    
+    def _run(self):
+        while not self._stop.wait(self.poll_seconds):
+            changes = self.poll()
+            if changes:
+                self.changes.put(changes)
+    
+    def scan(self) -> Dict[str, Dict[str, tuple]]:
+        """{kind: {path: (mtime, size)}} for every template and partial file"""
+        found = {}
+        for folder, kind, suffix in (
+                (self.directory, "template", ".json"),
+                (os.path.join(self.directory, self.PARTIALS_DIR), "partial", ".txt")):
+            files = found[kind] = {}
+            try:
+                with os.scandir(folder) as entries:
+                    for entry in entries:
+                        if entry.name.endswith(suffix) and entry.is_file():
+                            stat = entry.stat()
+                            files[entry.path] = (stat.st_mtime_ns, stat.st_size)
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                print(f"Error scanning templates in {folder}: {e}")
+        return found
+    
+    def poll(self) -> List[tuple]:
+        """Changes since the previous poll (everything, on the first)"""
+        current = self.scan()
+        if current == self._seen:
+            return []
+        changes = []
+        for kind in ("partial", "template"):
+            files = current[kind]
+            seen = self._seen.get(kind, {})
+            for path, info in files.items():
+                if seen.get(path) != info:
+                    data = self._read(path, kind)
+                    if data is not None:
+                        changes.append((kind, self._name(path), data))
+            for path in seen.keys() - files.keys():
+                changes.append((kind, self._name(path), None))
+        self._seen = current
+        return changes
+    
+    @staticmethod
+    def _name(path: str) -> str:
+        return os.path.splitext(os.path.basename(path))[0]
+    
+    @staticmethod
+    def _read(path: str, kind: str):
+        """File contents (parsed for templates), or None if unreadable"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                text = f.read()
+            if kind == "partial":
+                return text
+            data = json.loads(text)
+            if not isinstance(data, dict):
+                raise ValueError("expected a JSON object")
+            return data
+        except (OSError, ValueError) as e:
+            print(f"Error loading template file {path}: {e}")
+            return None
+
+
+class RenderCache:
+    """Bounded LRU cache of rendered emails with hit and latency stats"""
+    
+    MAX_ENTRIES = 4096
+    LATENCY_SAMPLES = 2048
+    
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        from collections import deque
+        
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.renders = 0
+        self.render_seconds = 0.0
+        self._latencies = deque(maxlen=self.LATENCY_SAMPLES)
+    
+    @staticmethod
+    def key(template_id: str, version, values: Dict[str, str], html: bool) -> tuple:
+        return (template_id, version, html, tuple(sorted(values.items())))
+    
+    def get(self, key: tuple):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+    
+    def put(self, key: tuple, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def record_latency(self, seconds: float, rendered: bool):
+        with self._lock:
+            self._latencies.append(seconds)
+            if rendered:
+                self.renders += 1
+                self.render_seconds += seconds
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            hits, misses = self.hits, self.misses
+            renders, render_seconds = self.renders, self.render_seconds
+            latencies = sorted(self._latencies)
+            entries = len(self._entries)
+        lookups = hits + misses
+        
+        def percentile(fraction):
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))] * 1000
+        
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "latency_ms": {
+                "p50": round(percentile(0.50), 4),
+                "p95": round(percentile(0.95), 4),
+                "p99": round(percentile(0.99), 4),
+                "mean_render": round(render_seconds / renders * 1000, 4) if renders else 0.0,
+            },
+        }
+
+
+class RenderService:
+    """
+    Serves the template library over HTTP as JSON
+    
+    GET  /templates          list templates and their fields
+    GET  /templates/<id>     one template
+    POST /render             {"template": id, "values": {...}, "html": false}
+    POST /render/batch       {"template": id, "items": [{...}, ...]}, or
+                             {"requests": [{"template": id, "values": {...}}, ...]}
+    GET  /stats              request counts, cache hit rate and latency
+    
+    Renders are cached in a RenderCache keyed on the template version and
+    the field values, so repeated merges cost one dictionary lookup.
+    """
+    
+    DEFAULT_HOST = "127.0.0.1"
+    DEFAULT_PORT = 8765
+    MAX_BATCH = 10000
+    MAX_BODY_BYTES = 16 * 1024 * 1024
+    
+    def __init__(self, templates: Optional[Dict[str, EmailTemplate]] = None,
+                 cache: Optional[RenderCache] = None):
+        self.cache = cache or RenderCache()
+        self.requests = 0
+        self.errors = 0
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self.set_templates(templates if templates is not None
+                           else EmailTemplateLibrary.get_templates())
+    
+    def set_templates(self, templates: Dict[str, EmailTemplate]):
+        """Swap in a new library; cache entries of changed templates stop matching"""
+        self.templates = dict(templates)
+        self.versions = {
+            template_id: TemplateCache.digest(template.template + "\0" + (template.html or ""))
+            for template_id, template in self.templates.items()
+        }
+    
+    def describe(self, template_id: str) -> Dict:
+        template = self.templates[template_id]
+        return {
+            "id": template_id,
+            "name": template.name,
+            "version": self.versions[template_id],
+            "has_html": template.has_html,
+            "fields": [field.to_dict() for field in template.fields],
+        }
+    
+    def render(self, template_id: str, values, html: bool = False) -> Dict:
+        """Render one email, from the cache when possible"""
+        started = time.perf_counter()
+        template = self.templates.get(template_id)
+        if template is None:
+            raise KeyError(f"Unknown template: {template_id}")
+        if not isinstance(values, dict):
+            raise ValueError("'values' must be an object")
+        values = {str(name): "" if value is None else str(value)
+                  for name, value in values.items()}
+        
+        key = RenderCache.key(template_id, (self.versions[template_id], template.revision),
+                              values, html)
+        entry = self.cache.get(key)
+        rendered = entry is None
+        if rendered:
+            entry = {"text": template.generate(values)}
+            if html:
+                entry["html"] = template.generate_html(values)
+            self.cache.put(key, entry)
+        
+        self.cache.record_latency(time.perf_counter() - started, rendered)
+        return dict(entry, template=template_id, cached=not rendered)
+    
+    def render_batch(self, payload: Dict) -> List[Dict]:
+        """Render many emails; one malformed item does not fail the rest"""
+        if "requests" in payload:
+            requests = payload["requests"]
+        else:
+            requests = [{"template": payload.get("template"), "values": values,
+                         "html": payload.get("html", False)}
+                        for values in payload.get("items", ())]
+        if not isinstance(requests, list):
+            raise ValueError("'requests' must be a list")
+        if len(requests) > self.MAX_BATCH:
+            raise ValueError(f"At most {self.MAX_BATCH} renders per batch")
+        
+        results = []
+        for request in requests:
+            try:
+                results.append(self.render(request.get("template"), request.get("values", {}),
+                                           bool(request.get("html", False))))
+            except KeyError as e:
+                results.append({"error": e.args[0]})
+            except (ValueError, AttributeError) as e:
+                results.append({"error": str(e)})
+        return results
+    
+    def stats(self) -> Dict:
+        return {
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "requests": self.requests,
+            "errors": self.errors,
+            "templates": len(self.templates),
+            "cache": self.cache.stats(),
+        }
+    
+    def handle(self, method: str, path: str, body: bytes) -> Tuple[int, object]:
+        """Route one request; returns (HTTP status, JSON-serializable payload)"""
+        with self._lock:
+            self.requests += 1
+        path = path.split("?", 1)[0].rstrip("/") or "/"
+        
+        try:
+            if method == "GET" and path == "/templates":
+                return 200, {"templates": [self.describe(template_id)
+                                           for template_id in self.templates]}
+            if method == "GET" and path.startswith("/templates/"):
+                template_id = path[len("/templates/"):]
+                if template_id not in self.templates:
+                    return self._error(404, f"Unknown template: {template_id}")
+                return 200, self.describe(template_id)
+            if method == "GET" and path == "/stats":
+                return 200, self.stats()
+            if method == "POST" and path in ("/render", "/render/batch"):
+                try:
+                    payload = json.loads(body or b"{}")
+                except ValueError as e:
+                    return self._error(400, f"Invalid JSON: {e}")
+                if not isinstance(payload, dict):
+                    return self._error(400, "Request body must be a JSON object")
+                if path == "/render":
+                    return 200, self.render(payload.get("template"), payload.get("values", {}),
+                                            bool(payload.get("html", False)))
+                return 200, {"results": self.render_batch(payload)}
+            return self._error(404, f"No route for {method} {path}")
+        except KeyError as e:
+            return self._error(404, e.args[0])
+        except ValueError as e:
+            return self._error(400, str(e))
+    
+    def _error(self, status: int, message: str) -> Tuple[int, Dict]:
+        with self._lock:
+            self.errors += 1
+        return status, {"error": message}
+    
+    def make_server(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+        """Build a threaded HTTP server bound to this service"""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        
+        service = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            # Keep-alive lets clients reuse one connection for many renders;
+            # without TCP_NODELAY the header and body writes of each
+            # response stall on delayed ACKs
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+            
+            def do_GET(self):
+                self.respond(*service.handle("GET", self.path, b""))
+            
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                if length > RenderService.MAX_BODY_BYTES:
+                    self.respond(413, {"error": "Request body too large"})
+                    self.close_connection = True
+                    return
+                self.respond(*service.handle("POST", self.path, self.rfile.read(length)))
+            
+            def respond(self, status: int, payload):
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            
+            def log_message(self, format, *args):
+                # Per-request logging to stderr would dominate render time
+                pass
+        
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        return server
+    
+    @classmethod
+    def main(cls, argv: Sequence[str]):
+        """Entry point for `email_generator_bot.py serve`"""
+        import argparse
+        
+        parser = argparse.ArgumentParser(prog="email_generator_bot.py serve",
+                                         description="Serve email templates over HTTP")
+        parser.add_argument("--host", default=cls.DEFAULT_HOST)
+        parser.add_argument("--port", type=int, default=cls.DEFAULT_PORT)
+        parser.add_argument("--cache-size", type=int, default=RenderCache.MAX_ENTRIES)
+        args = parser.parse_args(argv)
+        
+        service = cls(cache=RenderCache(args.cache_size))
+        server = service.make_server(args.host, args.port)
+        print(f"Serving {len(service.templates)} templates on "
+              f"http://{args.host}:{server.server_address[1]}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
 
-Best regards,
-{sender_name}
-{sender_title}
-{sender_organization}""",
-                fields=[
-                    {"name": "recipient_email", "label": "To: (Recipient Email)", "type": "text", "placeholder": "e.g., contact@company.com"},
-                    {"name": "recipient_name", "label": "Recipient Name", "type": "text", "placeholder": "e.g., Dr. Johnson"},
-                    {"name": "email_subject", "label": "Email Subject", "type": "text", "placeholder": "Brief subject line"},
-                    {"name": "opening_paragraph", "label": "Opening Paragraph", "type": "textarea", "placeholder": "Introduce the purpose of your email"},
-                    {"name": "main_content", "label": "Main Content", "type": "textarea", "placeholder": "Detailed information or message body"},
-                    {"name": "closing_paragraph", "label": "Closing Paragraph", "type": "textarea", "placeholder": "Summarize or conclude your message"},
-                    {"name": "call_to_action", "label": "Call to Action (Optional)", "type": "textarea", "placeholder": "e.g., I look forward to your response by..."},
-                    {"name": "sender_name", "label": "Your Name", "type": "text", "placeholder": "e.g., John Smith"},
-                    {"name": "sender_title", "label": "Your Title", "type": "text", "placeholder": "e.g., Senior Consultant"},
-                    {"name": "sender_organization", "label": "Your Organization", "type": "text", "placeholder": "e.g., ABC Consulting"}
-                ]
-            )
-        }
+class SessionSnapshot:
+    """Saves where the user left off so the next launch can resume there"""
+    
+    SNAPSHOT_FILE = "session.snapshot"
+    MAGIC = b"EGBS"
+    VERSION = 1
+    SCREENS = ("category", "form", "preview")
+    
+    @staticmethod
+    def save(state: Dict, path: str = SNAPSHOT_FILE) -> bool:
+        """Write a compressed, checksummed snapshot atomically"""
+        import tempfile
+        try:
+            payload = zlib.compress(
+                json.dumps(state, separators=(",", ":")).encode("utf-8"))
+            digest = hashlib.sha256(payload).digest()
+            directory = os.path.dirname(os.path.abspath(path))
+            fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(SessionSnapshot.MAGIC)
+                    f.write(bytes([SessionSnapshot.VERSION]))
+                    f.write(digest)
+                    f.write(payload)
+                os.replace(temp_path, path)
+            except BaseException:
+                os.remove(temp_path)
+                raise
+            return True
+        except Exception as e:
+            print(f"Error saving session: {e}")
+            return False
+    
+    @staticmethod
+    def load(path: str = SNAPSHOT_FILE) -> Optional[Dict]:
+        """Load and verify a snapshot; returns None to request a cold start"""
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Error loading session: {e}")
+            return None
+        
+        header_size = len(SessionSnapshot.MAGIC) + 1 + 32
+        try:
+            if (len(data) < header_size
+                    or not data.startswith(SessionSnapshot.MAGIC)
+                    or data[len(SessionSnapshot.MAGIC)] != SessionSnapshot.VERSION):
+                raise ValueError("unrecognized snapshot format")
+            digest = data[len(SessionSnapshot.MAGIC) + 1:header_size]
+            payload = data[header_size:]
+            if hashlib.sha256(payload).digest() != digest:
+                raise ValueError("checksum mismatch")
+            state = json.loads(zlib.decompress(payload).decode("utf-8"))
+            if not isinstance(state, dict) or state.get("screen") not in SessionSnapshot.SCREENS:
+                raise ValueError("invalid snapshot contents")
+            return state
+        except Exception as e:
+            print(f"Ignoring session snapshot: {e}")
+            SessionSnapshot.discard(path)
+            return None
+    
+    @staticmethod
+    def discard(path: str = SNAPSHOT_FILE):
+        """Remove the snapshot file"""
+        try:
+            os.remove(path)
+        except OSError:
+            pass
 
 
 class AnimatedWelcomeScreen:
@@ -387,6 +4748,30 @@ class AnimatedWelcomeScreen:
 class CategorySelectionScreen:
     """Screen for selecting email category"""
     
+    # Category information
+    CATEGORY_INFO = {
+        "job_application": {
+            "icon": "💼",
+            "description": "Apply for job positions"
+        },
+        "leave_request": {
+            "icon": "📅",
+            "description": "Request time off from work"
+        },
+        "apology": {
+            "icon": "🙏",
+            "description": "Send professional apologies"
+        },
+        "internship_request": {
+            "icon": "🎓",
+            "description": "Request internship opportunities"
+        },
+        "formal_communication": {
+            "icon": "✉️",
+            "description": "General formal emails"
+        }
+    }
+    
     def __init__(self, parent, templates: Dict[str, EmailTemplate], on_select):
         self.parent = parent
         self.templates = templates
@@ -414,40 +4799,24 @@ class CategorySelectionScreen:
         subtitle.pack(pady=(0, 40))
         
         # Category buttons container
-        button_container = tk.Frame(self.frame, bg="#0f1419")
-        button_container.pack(expand=True)
-        
-        # Category information
-        category_info = {
-            "job_application": {
-                "icon": "💼",
-                "description": "Apply for job positions"
-            },
-            "leave_request": {
-                "icon": "📅",
-                "description": "Request time off from work"
-            },
-            "apology": {
-                "icon": "🙏",
-                "description": "Send professional apologies"
-            },
-            "internship_request": {
-                "icon": "🎓",
-                "description": "Request internship opportunities"
-            },
-            "formal_communication": {
-                "icon": "✉️",
-                "description": "General formal emails"
-            }
-        }
+        self.button_container = tk.Frame(self.frame, bg="#0f1419")
+        self.button_container.pack(expand=True)
+        self.name_labels = {}
+        self.build_cards()
+    
+    def build_cards(self):
+        """Create one card per template, replacing any existing cards"""
+        for child in self.button_container.winfo_children():
+            child.destroy()
+        self.name_labels = {}
         
         # Create category buttons
         row = 0
         col = 0
-        for template_id, template in templates.items():
-            info = category_info.get(template_id, {"icon": "📧", "description": ""})
+        for template_id, template in self.templates.items():
+            info = self.CATEGORY_INFO.get(template_id, {"icon": "📧", "description": ""})
             
-            btn_frame = tk.Frame(button_container, bg="#16213e", relief="flat", bd=0)
+            btn_frame = tk.Frame(self.button_container, bg="#16213e", relief="flat", bd=0)
             btn_frame.grid(row=row, column=col, padx=15, pady=15, sticky="nsew")
             
             # Make button clickable
@@ -477,6 +4846,7 @@ class CategorySelectionScreen:
             )
             name_label.pack(pady=(0, 5))
             name_label.bind("<Button-1>", lambda e, tid=template_id: self.on_select(tid))
+            self.name_labels[template_id] = name_label
             
             # Description
             desc_label = tk.Label(
@@ -495,7 +4865,17 @@ class CategorySelectionScreen:
             if col > 2:
                 col = 0
                 row += 1
-        
+    
+    def refresh(self, changed: Iterable[str]):
+        """Update cards after templates were reloaded"""
+        if list(self.name_labels) != list(self.templates):
+            self.build_cards()
+            return
+        for template_id in changed:
+            label = self.name_labels.get(template_id)
+            if label is not None:
+                label.config(text=self.templates[template_id].name)
+    
     def show(self):
         """Display the category selection screen"""
         self.frame.pack(fill="both", expand=True)
@@ -508,13 +4888,21 @@ class CategorySelectionScreen:
 class FormScreen:
     """Dynamic form screen for collecting user input"""
     
-    def __init__(self, parent, template: EmailTemplate, on_generate, on_back):
+    AUTOSAVE_DELAY_MS = 500
+    
+    def __init__(self, parent, template: EmailTemplate, on_generate, on_back,
+                 template_id: str = "", draft_store: Optional[DraftStore] = None):
         self.parent = parent
         self.template = template
+        self.template_id = template_id
         self.on_generate = on_generate
         self.on_back = on_back
+        self.draft_store = draft_store
         self.frame = tk.Frame(parent, bg="#0f1419")
         self.field_widgets = {}
+        self._autosave_job = None
+        # Values whose draft was discarded; not saved again unless edited
+        self._discarded_values = None
         
         # Header with back button
         header_frame = tk.Frame(self.frame, bg="#0f1419")
@@ -570,7 +4958,7 @@ class FormScreen:
             # Label
             label = tk.Label(
                 field_frame,
-                text=field["label"],
+                text=field.label,
                 font=("Segoe UI", 11, "bold"),
                 fg="#ffffff",
                 bg="#0f1419",
@@ -579,16 +4967,16 @@ class FormScreen:
             label.pack(anchor="w", pady=(0, 5))
             
             # Input widget based on type
-            if field["type"] == "select":
+            if field.type == "select":
                 widget = ttk.Combobox(
                     field_frame,
-                    values=field["options"],
+                    values=field.options,
                     font=("Segoe UI", 10),
                     state="readonly"
                 )
-                widget.set(field["options"][0])
+                widget.set(field.options[0])
                 widget.pack(fill="x")
-            elif field["type"] == "textarea":
+            elif field.type == "textarea":
                 widget = scrolledtext.ScrolledText(
                     field_frame,
                     height=4,
@@ -600,8 +4988,8 @@ class FormScreen:
                     padx=10,
                     pady=10
                 )
-                widget.insert("1.0", field.get("placeholder", ""))
-                widget.bind("<FocusIn>", lambda e, w=widget, p=field.get("placeholder", ""): 
+                widget.insert("1.0", field.placeholder)
+                widget.bind("<FocusIn>", lambda e, w=widget, p=field.placeholder: 
                            self.clear_placeholder(w, p))
                 widget.pack(fill="x")
             else:  # text
@@ -613,17 +5001,23 @@ class FormScreen:
                     insertbackground="#00d9ff",
                     relief="flat"
                 )
-                widget.insert(0, field.get("placeholder", ""))
-                widget.bind("<FocusIn>", lambda e, w=widget, p=field.get("placeholder", ""): 
+                widget.insert(0, field.placeholder)
+                widget.bind("<FocusIn>", lambda e, w=widget, p=field.placeholder: 
                            self.clear_placeholder(w, p))
                 widget.config({"highlightthickness": 1, "highlightbackground": "#16213e"})
                 widget.pack(fill="x", ipady=8, padx=2)
             
-            self.field_widgets[field["name"]] = {
+            self.field_widgets[field.name] = {
                 "widget": widget,
-                "type": field["type"],
-                "placeholder": field.get("placeholder", "")
+                "type": field.type,
+                "placeholder": field.placeholder
             }
+            
+            # Autosave drafts as the user edits
+            if field.type == "select":
+                widget.bind("<<ComboboxSelected>>", self.schedule_autosave, add="+")
+            else:
+                widget.bind("<KeyRelease>", self.schedule_autosave, add="+")
         
         canvas.pack(side="left", fill="both", expand=True)
         scrollbar.pack(side="right", fill="y")
@@ -646,8 +5040,95 @@ class FormScreen:
             cursor="hand2",
             command=self.handle_generate
         )
-        generate_btn.pack()
+        generate_btn.pack(side="left", padx=10)
+        
+        clear_btn = tk.Button(
+            btn_frame,
+            text="✕ Clear Form",
+            font=("Segoe UI", 11),
+            bg="#16213e",
+            fg="#a8a8a8",
+            activebackground="#1e2a47",
+            activeforeground="#ff6b6b",
+            relief="flat",
+            padx=20,
+            pady=12,
+            cursor="hand2",
+            command=self.confirm_reset
+        )
+        clear_btn.pack(side="left", padx=10)
         
+        # Restore a previously saved draft
+        if self.draft_store and self.template_id:
+            draft = self.draft_store.load(self.template_id)
+            if draft:
+                self.set_values(draft)
+        
+    def set_values(self, values: Dict[str, str]):
+        """Fill form fields from saved values, leaving empty ones untouched"""
+        for field_name, value in values.items():
+            field_info = self.field_widgets.get(field_name)
+            if not field_info or not value:
+                continue
+            widget = field_info["widget"]
+            if field_info["type"] == "textarea":
+                widget.delete("1.0", "end")
+                widget.insert("1.0", value)
+            elif field_info["type"] == "select":
+                if value in widget.cget("values"):
+                    widget.set(value)
+            else:
+                widget.delete(0, "end")
+                widget.insert(0, value)
+    
+    def schedule_autosave(self, event=None):
+        """Debounce edits so a burst of keystrokes produces one save"""
+        if not self.draft_store:
+            return
+        if self._autosave_job is not None:
+            self.parent.after_cancel(self._autosave_job)
+        self._autosave_job = self.parent.after(self.AUTOSAVE_DELAY_MS, self.save_draft)
+    
+    def save_draft(self):
+        """Hand the current values to the background draft writer"""
+        if self._autosave_job is not None:
+            self.parent.after_cancel(self._autosave_job)
+            self._autosave_job = None
+        if self.draft_store and self.template_id:
+            values = self.collect_values()
+            if values != self._discarded_values:
+                self._discarded_values = None
+                self.draft_store.save(self.template_id, values)
+    
+    def discard_draft(self):
+        """Delete the saved draft, e.g. once its email has been sent"""
+        if self._autosave_job is not None:
+            self.parent.after_cancel(self._autosave_job)
+            self._autosave_job = None
+        if self.draft_store and self.template_id:
+            self.draft_store.delete(self.template_id)
+            self._discarded_values = self.collect_values()
+    
+    def confirm_reset(self):
+        """Ask before clearing every field"""
+        if messagebox.askyesno("Clear Form", "Clear every field and discard the saved draft?"):
+            self.reset()
+    
+    def reset(self):
+        """Put every field back to its default and discard the draft"""
+        for field_info in self.field_widgets.values():
+            widget = field_info["widget"]
+            placeholder = field_info["placeholder"]
+            if field_info["type"] == "textarea":
+                widget.delete("1.0", "end")
+                widget.insert("1.0", placeholder)
+            elif field_info["type"] == "select":
+                widget.current(0)
+            else:
+                widget.delete(0, "end")
+                widget.insert(0, placeholder)
+        self.discard_draft()
+    
     def clear_placeholder(self, widget, placeholder):
         """Clear placeholder text on focus"""
         if isinstance(widget, scrolledtext.ScrolledText):
@@ -686,8 +5167,11 @@ class FormScreen:
         """Handle generate button click"""
         values = self.collect_values()
         
-        # Validate required fields (simple check)
-        empty_fields = [name for name, value in values.items() if not value]
+        # Validate required fields; optional ones may be left empty
+        empty_fields = [
+            field.name for field in self.template.fields
+            if field.required and not values.get(field.name)
+        ]
         if empty_fields:
             messagebox.showwarning(
                 "Missing Information",
@@ -695,6 +5179,17 @@ class FormScreen:
             )
             return
         
+        # Same option and length rules as bulk merges
+        problems = [
+            f"{field.label}: {problem}"
+            + (f" (at most {field.max_length} characters)" if problem == MergeReport.TOO_LONG else "")
+            for field, problem in MergeValidator.check_values(self.template, values)
+            if problem != MergeReport.MISSING
+        ]
+        if problems:
+            messagebox.showwarning("Invalid Information", "\n".join(problems))
+            return
+        
         self.on_generate(values)
     
     def show(self):
@@ -709,14 +5204,37 @@ class FormScreen:
 class PreviewScreen:
     """Email preview and export screen"""
     
-    def __init__(self, parent, on_back, on_new, on_settings):
+    # Large previews are inserted a chunk per event-loop tick: the first
+    # screenful synchronously, the rest in the background, so Tk never
+    # lays out megabytes of text in one blocking call
+    INITIAL_LINES = 200
+    CHUNK_CHARS = 64 * 1024
+    # Regenerates that change more than this are re-streamed, not patched
+    MAX_PATCH_CHARS = 256 * 1024
+    MAX_MATCH_LINES = 20000
+    
+    def __init__(self, parent, on_back, on_new, on_settings,
+                 scheduler: Optional[SendScheduler] = None, on_jobs=None, on_sent=None):
         self.parent = parent
         self.on_back = on_back
         self.on_new = on_new
         self.on_settings = on_settings
+        self.scheduler = scheduler
+        self.on_jobs = on_jobs
+        self.on_sent = on_sent
+        self.warm_session = WarmSMTPSession()
+        self.visible = False
+        self._send_queue = None
         self.frame = tk.Frame(parent, bg="#0f1419")
         self.email_content = ""
         self.recipient_email = ""
+        self.html_content = None
+        self.attachments = []
+        self._pending_text = ""
+        self._pending_offset = 0
+        self._insert_job = None
+        # Text fully present in the widget, used to patch regenerates
+        self._displayed = None
         
         # Header
         header_frame = tk.Frame(self.frame, bg="#0f1419")
@@ -764,6 +5282,23 @@ class PreviewScreen:
         )
         settings_btn.pack(side="right", padx=20)
         
+        if self.on_jobs:
+            jobs_btn = tk.Button(
+                header_frame,
+                text="📦 Jobs",
+                font=("Segoe UI", 10),
+                bg="#16213e",
+                fg="#a8a8a8",
+                activebackground="#1e2a47",
+                activeforeground="#00d9ff",
+                relief="flat",
+                padx=15,
+                pady=6,
+                cursor="hand2",
+                command=self.on_jobs
+            )
+            jobs_btn.pack(side="right")
+        
         # Preview area
         preview_frame = tk.Frame(self.frame, bg="#0f1419")
         preview_frame.pack(fill="both", expand=True, padx=40, pady=20)
@@ -781,6 +5316,52 @@ class PreviewScreen:
         )
         self.preview_text.pack(fill="both", expand=True)
         
+        # Attachments row
+        attach_frame = tk.Frame(self.frame, bg="#0f1419")
+        attach_frame.pack(fill="x", padx=40)
+        
+        attach_btn = tk.Button(
+            attach_frame,
+            text="📎 Attach Files",
+            font=("Segoe UI", 10),
+            bg="#16213e",
+            fg="#00d9ff",
+            activebackground="#1e2a47",
+            activeforeground="#00d9ff",
+            relief="flat",
+            padx=15,
+            pady=6,
+            cursor="hand2",
+            command=self.choose_attachments
+        )
+        attach_btn.pack(side="left")
+        
+        clear_attach_btn = tk.Button(
+            attach_frame,
+            text="✕ Clear",
+            font=("Segoe UI", 10),
+            bg="#16213e",
+            fg="#a8a8a8",
+            activebackground="#1e2a47",
+            activeforeground="#ff6b6b",
+            relief="flat",
+            padx=10,
+            pady=6,
+            cursor="hand2",
+            command=self.clear_attachments
+        )
+        clear_attach_btn.pack(side="left", padx=(10, 0))
+        
+        self.attachments_label = tk.Label(
+            attach_frame,
+            text="No attachments",
+            font=("Segoe UI", 10),
+            fg="#a8a8a8",
+            bg="#0f1419",
+            anchor="w"
+        )
+        self.attachments_label.pack(side="left", fill="x", expand=True, padx=15)
+        
         # Action buttons
         btn_frame = tk.Frame(self.frame, bg="#0f1419")
         btn_frame.pack(pady=20)
@@ -802,6 +5383,23 @@ class PreviewScreen:
         )
         self.send_btn.pack(side="left", padx=10)
         
+        if self.scheduler:
+            send_later_btn = tk.Button(
+                btn_frame,
+                text="⏰ Send Later",
+                font=("Segoe UI", 12),
+                bg="#16213e",
+                fg="#00d9ff",
+                activebackground="#1e2a47",
+                activeforeground="#00d9ff",
+                relief="flat",
+                padx=30,
+                pady=12,
+                cursor="hand2",
+                command=self.send_later
+            )
+            send_later_btn.pack(side="left", padx=10)
+        
         copy_btn = tk.Button(
             btn_frame,
             text="📋 Copy to Clipboard",
@@ -834,17 +5432,229 @@ class PreviewScreen:
         )
         new_btn.pack(side="left", padx=10)
         
-    def set_content(self, content: str, recipient_email: str = ""):
+    def set_content(self, content: str, recipient_email: str = "",
+                    html_content: Optional[str] = None):
         """Set the email content to display"""
         self.email_content = content
         self.recipient_email = recipient_email
+        self.html_content = html_content
+        
+        # A regenerate usually changes a few lines; patch just those so
+        # the scroll position and the rest of the layout survive
+        if self._insert_job is None and self._displayed is not None:
+            if self.patch_preview(self._displayed, content):
+                self._displayed = content
+                return
+        
+        self.cancel_insertion()
+        
+        end = self.chunk_end(content, 0, self.INITIAL_LINES)
         self.preview_text.config(state="normal")
         self.preview_text.delete("1.0", "end")
-        self.preview_text.insert("1.0", content)
+        self.preview_text.insert("1.0", content[:end])
         self.preview_text.config(state="disabled")
+        
+        if end < len(content):
+            self._pending_text = content
+            self._pending_offset = end
+            self._insert_job = self.parent.after(1, self.insert_next_chunk)
+        else:
+            self._displayed = content
     
-    def send_email(self):
-        """Send email via Gmail SMTP"""
+    @staticmethod
+    def split_lines(text: str) -> List[str]:
+        """Split into Text widget lines, keeping each line's newline"""
+        lines = text.split("\n")
+        last = lines.pop()
+        lines = [line + "\n" for line in lines]
+        if last:
+            lines.append(last)
+        return lines
+    
+    @staticmethod
+    def common_prefix_length(a: str, b: str, block: int = 4096) -> int:
+        """Length of the common prefix, compared a block at a time"""
+        limit = min(len(a), len(b))
+        i = 0
+        while i + block <= limit and a[i:i + block] == b[i:i + block]:
+            i += block
+        while i < limit and a[i] == b[i]:
+            i += 1
+        return i
+    
+    @staticmethod
+    def common_suffix_length(a: str, b: str, limit: int, block: int = 4096) -> int:
+        """Length of the common suffix, at most `limit` characters"""
+        n = 0
+        while (n + block <= limit
+               and a[len(a) - n - block:len(a) - n] == b[len(b) - n - block:len(b) - n]):
+            n += block
+        while n < limit and a[len(a) - n - 1] == b[len(b) - n - 1]:
+            n += 1
+        return n
+    
+    @classmethod
+    def line_diff(cls, old: str, new: str) -> List[tuple]:
+        """
+        Line ranges that differ between two renders
+        
+        Returns:
+            list: (first old line, end old line, replacement text, replacement
+            line count) per change, 0-based and in order; None when the
+            changed region is too large to match quickly
+        """
+        # Trim the unchanged head and tail on whole lines; a regenerate
+        # usually touches a few lines in the middle
+        head = cls.common_prefix_length(old, new)
+        head = old.rfind("\n", 0, head) + 1
+        tail = cls.common_suffix_length(old, new, min(len(old), len(new)) - head)
+        old_end = len(old) - tail
+        new_end = len(new) - tail
+        if tail and not (old[old_end - 1:old_end] in ("", "\n")
+                         and new[new_end - 1:new_end] in ("", "\n")):
+            newline = old.find("\n", old_end)
+            skip = len(old) - old_end if newline < 0 else newline + 1 - old_end
+            old_end += skip
+            new_end += skip
+        
+        base = old.count("\n", 0, head)
+        old_lines = cls.split_lines(old[head:old_end])
+        new_lines = cls.split_lines(new[head:new_end])
+        if not old_lines and not new_lines:
+            return []
+        if not old_lines or not new_lines:
+            return [(base, base + len(old_lines), "".join(new_lines), len(new_lines))]
+        
+        if len(old_lines) == len(new_lines):
+            # Same shape (the common case for an edited field): a single
+            # pass over line pairs, grouping adjacent changed lines
+            changes = []
+            run_start = None
+            for index, (old_line, new_line) in enumerate(zip(old_lines, new_lines)):
+                if old_line != new_line:
+                    if run_start is None:
+                        run_start = index
+                elif run_start is not None:
+                    changes.append((base + run_start, base + index,
+                                    "".join(new_lines[run_start:index]), index - run_start))
+                    run_start = None
+            if run_start is not None:
+                end = len(new_lines)
+                changes.append((base + run_start, base + end,
+                                "".join(new_lines[run_start:end]), end - run_start))
+            return changes
+        
+        if len(old_lines) + len(new_lines) > cls.MAX_MATCH_LINES:
+            return None
+        
+        import difflib
+        
+        matcher = difflib.SequenceMatcher(None, old_lines, new_lines)
+        return [(base + i1, base + i2, "".join(new_lines[j1:j2]), j2 - j1)
+                for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != "equal"]
+    
+    def patch_preview(self, old: str, new: str) -> bool:
+        """Apply only the changed lines to the widget; False if a full reload is better"""
+        changes = self.line_diff(old, new)
+        if changes is None:
+            return False
+        if sum(len(replacement) for _, _, replacement, _ in changes) > self.MAX_PATCH_CHARS:
+            return False
+        if not changes:
+            return True
+        
+        text = self.preview_text
+        top = int(text.index("@0,0").split(".")[0]) - 1
+        shift = sum(count - (end - start) for start, end, _, count in changes if end <= top)
+        
+        # Back to front, so earlier line numbers stay valid
+        text.config(state="normal")
+        for start, end, replacement, _ in reversed(changes):
+            if end > start:
+                text.delete(f"{start + 1}.0", f"{end + 1}.0")
+            if replacement:
+                text.insert(f"{start + 1}.0", replacement)
+        text.config(state="disabled")
+        
+        # Keep the same line at the top of the view
+        text.yview(f"{top + shift + 1}.0")
+        return True
+    
+    @classmethod
+    def chunk_end(cls, text: str, start: int, max_lines: Optional[int] = None) -> int:
+        """End offset of the chunk starting at `start`, on a line boundary if possible"""
+        end = min(len(text), start + cls.CHUNK_CHARS)
+        if max_lines is not None:
+            index = start - 1
+            for _ in range(max_lines):
+                index = text.find("\n", index + 1, end)
+                if index < 0:
+                    break
+            else:
+                return index + 1
+        if end < len(text):
+            # Whole lines keep Tk from re-wrapping a line split across chunks
+            newline = text.rfind("\n", start, end)
+            if newline >= start:
+                end = newline + 1
+        return end
+    
+    def insert_next_chunk(self):
+        """Append the next chunk of a large preview"""
+        self._insert_job = None
+        text = self._pending_text
+        start = self._pending_offset
+        end = self.chunk_end(text, start)
+        
+        self.preview_text.config(state="normal")
+        self.preview_text.insert("end-1c", text[start:end])
+        self.preview_text.config(state="disabled")
+        
+        if end < len(text):
+            self._pending_offset = end
+            self._insert_job = self.parent.after(1, self.insert_next_chunk)
+        else:
+            self._displayed = text
+            self._pending_text = ""
+            self._pending_offset = 0
+    
+    def cancel_insertion(self):
+        """Stop streaming a previous preview into the widget"""
+        if self._insert_job is not None:
+            self.parent.after_cancel(self._insert_job)
+            self._insert_job = None
+        self._displayed = None
+        self._pending_text = ""
+        self._pending_offset = 0
+    
+    def choose_attachments(self):
+        """Let the user pick files to attach to the email"""
+        paths = filedialog.askopenfilenames(title="Select files to attach")
+        if paths:
+            self.attachments = list(paths)
+            self.update_attachments_label()
+    
+    def clear_attachments(self):
+        """Remove all selected attachments"""
+        self.attachments = []
+        self.update_attachments_label()
+    
+    def update_attachments_label(self):
+        """Show the names of the selected attachments"""
+        if self.attachments:
+            names = ", ".join(os.path.basename(path) for path in self.attachments)
+            self.attachments_label.config(text=f"Attached: {names}", fg="#ffffff")
+        else:
+            self.attachments_label.config(text="No attachments", fg="#a8a8a8")
+    
+    def prepare_send(self) -> Optional[tuple]:
+        """
+        Check credentials and recipients before sending
+        
+        Returns:
+            tuple: (credentials, to_email, subject, body), or None if the
+            user has been told what is missing
+        """
         # Check if credentials are saved
         credentials = GmailConfig.load_credentials()
         if not credentials:
@@ -854,7 +5664,18 @@ class PreviewScreen:
             )
             if response:
                 self.on_settings()
-            return
+            return None
+        
+        status = AuthStatusCache.lookup(credentials["email"], credentials["password"])
+        if status and not status[0]:
+            response = messagebox.askyesno(
+                "Authentication Failed",
+                "Gmail rejected the saved email and app password.\n\n"
+                "Would you like to update them now?"
+            )
+            if response:
+                self.on_settings()
+            return None
         
         # Extract subject and body from email content
         lines = self.email_content.split('\n')
@@ -877,33 +5698,150 @@ class PreviewScreen:
                 "Missing Recipient",
                 "No recipient email address found in the email."
             )
-            return
+            return None
+        
+        report = RecipientValidator.validate_many(
+            RecipientValidator.split_recipients(to_email))
+        if report.rejected or not report.valid:
+            messagebox.showerror(
+                "Invalid Recipient",
+                "Please fix the recipient address:\n\n" + "\n".join(report.rejection_lines())
+            )
+            return None
+        to_email = ", ".join(report.valid)
         
         if not subject:
             subject = "Email from Email Generator Bot"
         
+        return credentials, to_email, subject, body
+    
+    def send_email(self):
+        """Send email via Gmail SMTP in the background"""
+        if self._send_queue is not None:
+            return  # a send is already in progress
+        prepared = self.prepare_send()
+        if not prepared:
+            return
+        credentials, to_email, subject, body = prepared
+        
+        import queue
+        
         # Show sending indicator
         self.send_btn.config(text="📧 Sending...", state="disabled")
-        self.parent.update()
-        
-        # Send email
-        success, message = EmailSender.send_email(
-            credentials["email"],
-            credentials["password"],
-            to_email,
-            subject,
-            body
+        self._send_queue = queue.SimpleQueue()
+        worker = threading.Thread(
+            target=self.run_send,
+            args=(credentials, to_email, subject, body, list(self.attachments),
+                  self.html_content, self._send_queue),
+            name="PreviewSend",
+            daemon=True
         )
+        worker.start()
+        self.parent.after(100, self.poll_send)
+    
+    def run_send(self, credentials: Dict, to_email: str, subject: str, body: str,
+                 attachments: List[str], html_content: Optional[str], results):
+        """Worker thread: send over the pre-warmed session when it is ready"""
+        try:
+            # take() can wait for a handshake in progress
+            server = self.warm_session.take(credentials["email"], credentials["password"])
+            result = EmailSender.send_email(
+                credentials["email"],
+                credentials["password"],
+                to_email,
+                subject,
+                body,
+                attachments,
+                html_content,
+                server
+            )
+            if server is not None and result.category == "transient" and result.code is None:
+                # The warm session went stale; retry on a fresh connection
+                server = None
+                result = EmailSender.send_email(
+                    credentials["email"],
+                    credentials["password"],
+                    to_email,
+                    subject,
+                    body,
+                    attachments,
+                    html_content
+                )
+            self.warm_session.release(server, credentials["email"], credentials["password"])
+            # The screen may have been left while sending
+            if not self.visible:
+                self.warm_session.close()
+        except Exception as e:
+            print(f"Error sending email: {e}")
+            result = SendResult.from_exception(e)
+        results.put((to_email, result))
+    
+    def poll_send(self):
+        """Report the worker's result on the Tk thread"""
+        import queue
+        
+        try:
+            to_email, result = self._send_queue.get_nowait()
+        except queue.Empty:
+            self.parent.after(100, self.poll_send)
+            return
+        self._send_queue = None
+        success, message = result
         
         # Re-enable button
         self.send_btn.config(text="📧 Send Email", state="normal")
         
         # Show result
         if success:
+            if self.on_sent:
+                self.on_sent()
             messagebox.showinfo("Success", f"Email sent successfully to {to_email}!")
         else:
             messagebox.showerror("Error", f"Failed to send email:\n\n{message}")
     
+    def send_later(self):
+        """Schedule the email for a chosen date and time"""
+        prepared = self.prepare_send()
+        if not prepared:
+            return
+        _, to_email, subject, body = prepared
+        
+        default = datetime.fromtimestamp(time.time() + 3600).strftime("%Y-%m-%d %H:%M")
+        answer = simpledialog.askstring(
+            "Send Later",
+            "Send at (YYYY-MM-DD HH:MM):",
+            initialvalue=default,
+            parent=self.parent
+        )
+        if not answer:
+            return
+        
+        try:
+            send_at = datetime.strptime(answer.strip(), "%Y-%m-%d %H:%M")
+        except ValueError:
+            messagebox.showerror(
+                "Invalid Time",
+                "Please enter the time as YYYY-MM-DD HH:MM (e.g., 2025-01-15 09:30)."
+            )
+            return
+        if send_at.timestamp() <= time.time():
+            messagebox.showwarning("Invalid Time", "Please choose a time in the future.")
+            return
+        
+        self.scheduler.schedule(
+            send_at.timestamp(),
+            to_email,
+            subject,
+            body,
+            self.html_content,
+            self.attachments
+        )
+        messagebox.showinfo(
+            "Scheduled",
+            f"Email to {to_email} scheduled for {send_at.strftime('%Y-%m-%d %H:%M')}.\n\n"
+            "Keep Email Generator Bot running (it can be minimized) so it can be sent."
+        )
+    
     def copy_to_clipboard(self):
         """Copy email content to clipboard"""
         self.parent.clipboard_clear()
@@ -915,11 +5853,21 @@ class PreviewScreen:
     
     def show(self):
         """Display the preview screen"""
+        self.visible = True
         self.frame.pack(fill="both", expand=True)
+        self.prewarm()
+    
+    def prewarm(self):
+        """Open an SMTP session in the background while the user reviews"""
+        credentials = GmailConfig.load_credentials()
+        if credentials:
+            self.warm_session.warm(credentials["email"], credentials["password"])
         
     def hide(self):
-        """Hide the preview screen"""
+        """Hide the preview screen and drop its warm SMTP session"""
+        self.visible = False
         self.frame.pack_forget()
+        self.warm_session.close()
 
 
 class GmailSettingsScreen:
@@ -1073,6 +6021,16 @@ class GmailSettingsScreen:
         )
         show_password_check.pack(anchor="w", pady=(0, 20))
         
+        # Timeouts
+        timeout_frame = tk.Frame(form_frame, bg="#0f1419")
+        timeout_frame.pack(fill="x", pady=(0, 10))
+        
+        connect_timeout, read_timeout = GmailConfig.load_timeouts()
+        self.connect_timeout_entry = self.create_timeout_entry(
+            timeout_frame, "Connect timeout (s)", connect_timeout)
+        self.read_timeout_entry = self.create_timeout_entry(
+            timeout_frame, "Read timeout (s)", read_timeout)
+        
         # Action buttons
         btn_frame = tk.Frame(content_frame, bg="#0f1419")
         btn_frame.pack(pady=20)
@@ -1093,7 +6051,7 @@ class GmailSettingsScreen:
         )
         save_btn.pack(side="left", padx=10)
         
-        test_btn = tk.Button(
+        self.test_btn = tk.Button(
             btn_frame,
             text="🧪 Test Connection",
             font=("Segoe UI", 12),
@@ -1107,7 +6065,22 @@ class GmailSettingsScreen:
             cursor="hand2",
             command=self.test_connection
         )
-        test_btn.pack(side="left", padx=10)
+        self.test_btn.pack(side="left", padx=10)
+        
+        self.cancel_test_btn = tk.Button(
+            btn_frame,
+            text="✕ Cancel Test",
+            font=("Segoe UI", 12),
+            bg="#16213e",
+            fg="#ff6b6b",
+            activebackground="#1e2a47",
+            activeforeground="#ff6b6b",
+            relief="flat",
+            padx=30,
+            pady=12,
+            cursor="hand2",
+            command=self.cancel_test
+        )
         
         delete_btn = tk.Button(
             btn_frame,
@@ -1123,7 +6096,58 @@ class GmailSettingsScreen:
             cursor="hand2",
             command=self.delete_credentials
         )
-        delete_btn.pack(side="left", padx=10)
+        delete_btn.pack(side="left", padx=10)
+        
+        # Connection test progress
+        self.test_status = tk.Label(
+            content_frame,
+            text="",
+            font=("Segoe UI", 10, "italic"),
+            fg="#a8a8a8",
+            bg="#0f1419"
+        )
+        self.test_status.pack(pady=(0, 10))
+        
+        self._test_job = None
+    
+    def create_timeout_entry(self, parent, label_text: str, value: float) -> tk.Entry:
+        """Create a labelled numeric entry for a timeout setting"""
+        label = tk.Label(
+            parent,
+            text=label_text,
+            font=("Segoe UI", 10),
+            fg="#a8a8a8",
+            bg="#0f1419"
+        )
+        label.pack(side="left", padx=(0, 8))
+        
+        entry = tk.Entry(
+            parent,
+            width=6,
+            font=("Segoe UI", 10),
+            bg="#1a1a2e",
+            fg="#ffffff",
+            insertbackground="#00d9ff",
+            relief="flat"
+        )
+        entry.insert(0, f"{value:g}")
+        entry.pack(side="left", ipady=4, padx=(0, 25))
+        return entry
+    
+    def read_timeouts(self) -> Optional[Tuple[float, float]]:
+        """Parse the timeout entries, warning the user about bad values"""
+        try:
+            connect_timeout = float(self.connect_timeout_entry.get().strip())
+            read_timeout = float(self.read_timeout_entry.get().strip())
+            if connect_timeout <= 0 or read_timeout <= 0:
+                raise ValueError
+        except ValueError:
+            messagebox.showwarning(
+                "Invalid Timeout",
+                "Timeouts must be positive numbers of seconds."
+            )
+            return None
+        return connect_timeout, read_timeout
     
     def toggle_password(self):
         """Toggle password visibility"""
@@ -1151,7 +6175,11 @@ class GmailSettingsScreen:
             )
             return
         
-        if GmailConfig.save_credentials(email, password):
+        timeouts = self.read_timeouts()
+        if not timeouts:
+            return
+        
+        if GmailConfig.save_credentials(email, password, *timeouts):
             messagebox.showinfo(
                 "Success",
                 "Gmail credentials saved successfully!\n\nYou can now send emails directly from the bot."
@@ -1163,7 +6191,7 @@ class GmailSettingsScreen:
             )
     
     def test_connection(self):
-        """Test Gmail SMTP connection"""
+        """Test Gmail SMTP connection in the background"""
         email = self.email_entry.get().strip()
         password = self.password_entry.get().strip()
         
@@ -1174,19 +6202,88 @@ class GmailSettingsScreen:
             )
             return
         
-        # Try to send a test (will fail at send but will validate auth)
+        timeouts = self.read_timeouts()
+        if not timeouts:
+            return
+        
+        # Credentials verified recently need no new handshake
+        status = AuthStatusCache.lookup(email, password)
+        if status and status[0]:
+            minutes = int((time.time() - status[1]) // 60)
+            self.test_status.config(text=f"Verified {minutes} min ago", fg="#00d9ff")
+            self.show_test_success()
+            return
+        
+        import queue
+        
+        self._test_queue = queue.SimpleQueue()
+        self._test_cancel = threading.Event()
+        self._test_server = []
+        
+        worker = threading.Thread(
+            target=self.run_connection_test,
+            args=(email, password, timeouts, self._test_queue, self._test_cancel,
+                  self._test_server),
+            name="ConnectionTest",
+            daemon=True
+        )
+        worker.start()
+        
+        self.test_btn.config(text="🧪 Testing...", state="disabled")
+        self.cancel_test_btn.pack(side="left", padx=10)
+        self.test_status.config(text="Starting...", fg="#a8a8a8")
+        self._test_job = self.parent.after(100, self.poll_connection_test)
+    
+    @staticmethod
+    def run_connection_test(email: str, password: str, timeouts: tuple,
+                            results, cancel: threading.Event, server_slot: list):
+        """Worker thread: connect, STARTTLS and log in, reporting each stage"""
+        def progress(stage, server):
+            server_slot[:] = [server]
+            results.put(("progress", stage))
+        
         try:
-            import smtplib
-            server = smtplib.SMTP('smtp.gmail.com', 587)
-            server.starttls()
-            server.login(email, password)
-            server.quit()
-            
-            messagebox.showinfo(
-                "Success",
-                "Connection successful! ✅\n\nYour Gmail credentials are working correctly."
-            )
-        except smtplib.SMTPAuthenticationError:
+            server = EmailSender.connect(email, password, timeouts[0], timeouts[1], progress)
+            try:
+                server.quit()
+            except Exception:
+                pass
+            results.put(("done", SendResult.sent()))
+        except Exception as e:
+            if not cancel.is_set():
+                results.put(("done", SendResult.from_exception(e)))
+    
+    def poll_connection_test(self):
+        """Drain progress from the worker on the Tk thread"""
+        import queue
+        
+        self._test_job = None
+        if self._test_cancel.is_set():
+            return
+        
+        while True:
+            try:
+                kind, payload = self._test_queue.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "progress":
+                self.test_status.config(text=payload, fg="#a8a8a8")
+            else:
+                self.finish_connection_test(payload)
+                return
+        
+        self._test_job = self.parent.after(100, self.poll_connection_test)
+    
+    def finish_connection_test(self, result: SendResult):
+        """Restore the buttons and report the outcome"""
+        self.test_btn.config(text="🧪 Test Connection", state="normal")
+        self.cancel_test_btn.pack_forget()
+        
+        if result.success:
+            self.test_status.config(text="Connection verified", fg="#00d9ff")
+            self.show_test_success()
+        elif result.category == "auth":
+            self.test_status.config(text="Authentication failed", fg="#ff6b6b")
             messagebox.showerror(
                 "Authentication Failed",
                 "Invalid email or app password.\n\nPlease check:\n"
@@ -1194,12 +6291,35 @@ class GmailSettingsScreen:
                 "• Using App Password (not regular password)\n"
                 "• 2-Step Verification is enabled"
             )
-        except Exception as e:
+        else:
+            self.test_status.config(text="Connection failed", fg="#ff6b6b")
             messagebox.showerror(
                 "Connection Error",
-                f"Failed to connect to Gmail:\n\n{str(e)}"
+                f"Failed to connect to Gmail:\n\n{result.message}"
             )
     
+    def show_test_success(self):
+        messagebox.showinfo(
+            "Success",
+            "Connection successful! ✅\n\nYour Gmail credentials are working correctly."
+        )
+    
+    def cancel_test(self):
+        """Abandon a running connection test"""
+        self._test_cancel.set()
+        if self._test_job is not None:
+            self.parent.after_cancel(self._test_job)
+            self._test_job = None
+        # Closing the socket interrupts a blocked handshake step
+        for server in self._test_server:
+            try:
+                server.close()
+            except Exception:
+                pass
+        self.test_btn.config(text="🧪 Test Connection", state="normal")
+        self.cancel_test_btn.pack_forget()
+        self.test_status.config(text="Test cancelled", fg="#a8a8a8")
+    
     def delete_credentials(self):
         """Delete saved credentials"""
         response = messagebox.askyesno(
@@ -1230,9 +6350,386 @@ class GmailSettingsScreen:
         self.frame.pack_forget()
 
 
+class JobsScreen:
+    """Bulk send jobs with live progress, pause, resume and cancel"""
+    
+    # Worker updates are drained on this fixed cadence, never per message
+    POLL_MS = 100
+    
+    def __init__(self, parent, on_back, get_template):
+        import queue
+        
+        self.parent = parent
+        self.on_back = on_back
+        self.get_template = get_template
+        self.updates = queue.SimpleQueue()
+        self.jobs = {}
+        self.rows = {}
+        self.settled = set()  # ids of jobs whose final update has been shown
+        self._poll_job = None
+        self.frame = tk.Frame(parent, bg="#0f1419")
+        
+        # Header
+        header_frame = tk.Frame(self.frame, bg="#0f1419")
+        header_frame.pack(fill="x", pady=(20, 10))
+        
+        back_btn = tk.Button(
+            header_frame,
+            text="← Back",
+            font=("Segoe UI", 11),
+            bg="#16213e",
+            fg="#00d9ff",
+            activebackground="#1e2a47",
+            activeforeground="#00d9ff",
+            relief="flat",
+            padx=20,
+            pady=8,
+            cursor="hand2",
+            command=self.on_back
+        )
+        back_btn.pack(side="left", padx=20)
+        
+        title = tk.Label(
+            header_frame,
+            text="Jobs",
+            font=("Segoe UI", 24, "bold"),
+            fg="#00d9ff",
+            bg="#0f1419"
+        )
+        title.pack(side="left", padx=20)
+        
+        self.new_btn = tk.Button(
+            header_frame,
+            text="📦 Send to List...",
+            font=("Segoe UI", 10),
+            bg="#16213e",
+            fg="#00d9ff",
+            activebackground="#1e2a47",
+            activeforeground="#00d9ff",
+            relief="flat",
+            padx=15,
+            pady=6,
+            cursor="hand2",
+            command=self.new_job
+        )
+        self.new_btn.pack(side="right", padx=20)
+        
+        # Job list
+        self.list_frame = tk.Frame(self.frame, bg="#0f1419")
+        self.list_frame.pack(fill="both", expand=True, padx=40, pady=20)
+        
+        self.empty_label = tk.Label(
+            self.list_frame,
+            text="No jobs yet. Use \"Send to List\" to send the current template\n"
+                 "to every row of a CSV or JSONL file.",
+            font=("Segoe UI", 11),
+            fg="#a8a8a8",
+            bg="#0f1419"
+        )
+        self.empty_label.pack(pady=40)
+    
+    def new_job(self):
+        """Start a job sending the current template to a merge file"""
+        template = self.get_template()
+        if template is None:
+            messagebox.showwarning(
+                "No Template",
+                "Choose a template first, then start a job from its preview."
+            )
+            return
+        if not GmailConfig.load_credentials():
+            messagebox.showerror(
+                "Gmail Setup Required",
+                "Gmail credentials not configured.\n\nPlease set up Gmail first."
+            )
+            return
+        
+        path = filedialog.askopenfilename(
+            title="Choose recipient list",
+            filetypes=[("Recipient lists", "*.csv *.jsonl *.ndjson"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+        self.check_file(MergeCheck(path, template))
+    
+    def check_file(self, check: MergeCheck):
+        """Check the whole file on a worker thread before asking to send"""
+        import queue
+        
+        results = queue.SimpleQueue()
+        
+        def run():
+            try:
+                check.run()
+                results.put(None)
+            except Exception as e:
+                results.put(e)
+        
+        self.new_btn.config(text="📦 Checking...", state="disabled")
+        threading.Thread(target=run, name="MergeCheck", daemon=True).start()
+        self.parent.after(self.POLL_MS, self.poll_check, check, results)
+    
+    def poll_check(self, check: MergeCheck, results):
+        """Wait for the check on the Tk thread, then confirm the job"""
+        import queue
+        
+        try:
+            error = results.get_nowait()
+        except queue.Empty:
+            self.parent.after(self.POLL_MS, self.poll_check, check, results)
+            return
+        self.new_btn.config(text="📦 Send to List...", state="normal")
+        if error is not None:
+            print(f"Error checking merge file: {error}")
+            messagebox.showerror(
+                "Send to List",
+                f"Could not read {os.path.basename(check.path)}:\n\n{error}"
+            )
+            return
+        self.confirm_job(check)
+    
+    def confirm_job(self, check: MergeCheck):
+        """Show what the check found; start the job only if the user agrees"""
+        report = check.report
+        name = os.path.basename(check.path)
+        if not report.ok:
+            lines = report.report_lines()
+            if len(lines) > 10:
+                lines = lines[:10] + [f"... and {len(lines) - 10} more"]
+            save = messagebox.askyesnocancel(
+                "Send to List",
+                f"{name}: {report.summary()}.\n\n" + "\n".join(lines) +
+                "\n\nRows with problems will be skipped. Save a report of them first?"
+            )
+            if save is None:
+                return
+            if save:
+                self.save_report(check)
+        
+        if not check.ready:
+            messagebox.showwarning("Send to List", f"No rows of {name} can be sent.")
+            return
+        skipped = report.failed_rows
+        if not messagebox.askyesno(
+                "Send to List",
+                f"Send \"{check.template.name}\" to {check.ready} rows of\n{name}?" +
+                (f"\n\n{skipped} rows will be skipped." if skipped else "")):
+            return
+        
+        self.add_job(BulkJob.from_merge_file(check.path, check.template, self.updates,
+                                             check=check))
+    
+    def save_report(self, check: MergeCheck):
+        """Write the rows that failed the check to a CSV the user picks"""
+        stem = os.path.splitext(os.path.basename(check.path))[0]
+        path = filedialog.asksaveasfilename(
+            title="Save skipped rows",
+            defaultextension=".csv",
+            initialfile=f"{stem}-skipped.csv",
+            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+        try:
+            check.report.write_report(path)
+        except OSError as e:
+            print(f"Error saving report: {e}")
+            messagebox.showerror("Error", f"Could not save the report:\n\n{e}")
+    
+    def add_job(self, job: BulkJob):
+        """Show a job's row and start it"""
+        self.jobs[job.id] = job
+        self.empty_label.pack_forget()
+        self.rows[job.id] = self.create_job_row(job)
+        job.start()
+        if self._poll_job is None:
+            self._poll_job = self.parent.after(self.POLL_MS, self.poll_updates)
+    
+    def create_job_row(self, job: BulkJob) -> Dict:
+        """Widgets for one job; labels are only reconfigured when their text changes"""
+        row = tk.Frame(self.list_frame, bg="#1a1a2e")
+        row.pack(fill="x", pady=(0, 12))
+        
+        top = tk.Frame(row, bg="#1a1a2e")
+        top.pack(fill="x", padx=15, pady=(12, 4))
+        
+        name_label = tk.Label(
+            top,
+            text=job.name,
+            font=("Segoe UI", 11, "bold"),
+            fg="#ffffff",
+            bg="#1a1a2e",
+            anchor="w"
+        )
+        name_label.pack(side="left", fill="x", expand=True)
+        
+        cancel_btn = tk.Button(
+            top,
+            text="✕ Cancel",
+            font=("Segoe UI", 9),
+            bg="#16213e",
+            fg="#a8a8a8",
+            activebackground="#1e2a47",
+            activeforeground="#ff6b6b",
+            relief="flat",
+            padx=10,
+            pady=4,
+            cursor="hand2",
+            command=lambda: self.cancel_job(job.id)
+        )
+        cancel_btn.pack(side="right")
+        
+        pause_btn = tk.Button(
+            top,
+            text="⏸ Pause",
+            font=("Segoe UI", 9),
+            bg="#16213e",
+            fg="#00d9ff",
+            activebackground="#1e2a47",
+            activeforeground="#00d9ff",
+            relief="flat",
+            padx=10,
+            pady=4,
+            cursor="hand2",
+            command=lambda: self.toggle_pause(job.id)
+        )
+        pause_btn.pack(side="right", padx=(0, 8))
+        
+        progress = ttk.Progressbar(row, mode="determinate", maximum=1)
+        progress.pack(fill="x", padx=15, pady=4)
+        
+        status_label = tk.Label(
+            row,
+            text="Starting...",
+            font=("Segoe UI", 10),
+            fg="#a8a8a8",
+            bg="#1a1a2e",
+            anchor="w"
+        )
+        status_label.pack(fill="x", padx=15)
+        
+        stats_label = tk.Label(
+            row,
+            text="",
+            font=("Segoe UI", 10),
+            fg="#a8a8a8",
+            bg="#1a1a2e",
+            anchor="w"
+        )
+        stats_label.pack(fill="x", padx=15, pady=(0, 12))
+        
+        return {"pause": pause_btn, "cancel": cancel_btn, "progress": progress,
+                "status": status_label, "stats": stats_label, "shown": {}}
+    
+    def poll_updates(self):
+        """Drain worker updates, keeping only the latest per job"""
+        import queue
+        
+        self._poll_job = None
+        latest = {}
+        while True:
+            try:
+                update = self.updates.get_nowait()
+            except queue.Empty:
+                break
+            latest[update.job_id] = update
+        
+        for update in latest.values():
+            self.apply_update(update)
+        
+        if len(self.settled) < len(self.jobs):
+            self._poll_job = self.parent.after(self.POLL_MS, self.poll_updates)
+    
+    def apply_update(self, update: JobProgress):
+        row = self.rows.get(update.job_id)
+        if row is None:
+            return
+        job = self.jobs[update.job_id]
+        
+        total = max(update.total or 0, update.done)
+        if update.state == "running":
+            status = f"Batch {update.batch}: {update.batch_done:,} of {update.batch_size:,}"
+        elif update.state == "failed":
+            status = f"Failed: {job.error}"
+        else:
+            status = update.state.capitalize()
+        status += f"  ·  {update.done:,} of {total:,}" if total else ""
+        
+        stats = f"{update.sent:,} sent  ·  {update.rate:,.1f} msg/s"
+        eta = update.eta
+        if eta is not None:
+            stats += f"  ·  ETA {self.format_duration(eta)}"
+        if update.failed:
+            breakdown = ", ".join(f"{category} {count:,}" for category, count
+                                  in sorted(update.failures.items()))
+            stats += f"  ·  {update.failed:,} failed ({breakdown})"
+        
+        self.set_option(row, "status", "text", status)
+        self.set_option(row, "stats", "text", stats)
+        self.set_option(row, "progress", "maximum", total or 1)
+        self.set_option(row, "progress", "value", update.done)
+        if update.final:
+            self.settled.add(update.job_id)
+            self.set_option(row, "pause", "state", "disabled")
+            self.set_option(row, "cancel", "state", "disabled")
+        else:
+            self.set_option(row, "pause", "text", "▶ Resume" if job.paused else "⏸ Pause")
+    
+    @staticmethod
+    def set_option(row: Dict, widget: str, option: str, value):
+        """Configure a widget only when the value differs from what is shown"""
+        shown = row["shown"]
+        if shown.get((widget, option)) != value:
+            shown[(widget, option)] = value
+            row[widget].config(**{option: value})
+    
+    @staticmethod
+    def format_duration(seconds: float) -> str:
+        seconds = int(seconds)
+        if seconds >= 3600:
+            return f"{seconds // 3600}h {seconds % 3600 // 60}m"
+        if seconds >= 60:
+            return f"{seconds // 60}m {seconds % 60}s"
+        return f"{seconds}s"
+    
+    def toggle_pause(self, job_id: int):
+        job = self.jobs[job_id]
+        if job.finished:
+            return
+        if job.paused:
+            job.resume()
+        else:
+            job.pause()
+        self.set_option(self.rows[job_id], "pause", "text",
+                        "▶ Resume" if job.paused else "⏸ Pause")
+    
+    def cancel_job(self, job_id: int):
+        self.jobs[job_id].cancel()
+    
+    def running_jobs(self) -> int:
+        """Number of jobs that have not finished yet"""
+        return sum(1 for job in self.jobs.values() if not job.finished)
+    
+    def cancel_all(self):
+        """Stop every running job (on exit)"""
+        for job in self.jobs.values():
+            job.cancel()
+    
+    def show(self):
+        """Display the jobs screen"""
+        self.frame.pack(fill="both", expand=True)
+    
+    def hide(self):
+        """Hide the jobs screen"""
+        self.frame.pack_forget()
+
+
 class EmailGeneratorBot:
     """Main application class"""
     
+    # How often the Tk thread picks up templates the watcher reloaded
+    TEMPLATE_CHECK_MS = 500
+    
     def __init__(self):
         self.root = tk.Tk()
         self.root.title("Email Generator Bot")
@@ -1242,112 +6739,347 @@ class EmailGeneratorBot:
         # Always on top
         self.root.attributes("-topmost", True)
         
-        # Load templates
-        self.templates = EmailTemplateLibrary.get_templates()
+        # A valid snapshot lets us skip the splash and resume directly
+        snapshot = SessionSnapshot.load()
+        if snapshot:
+            try:
+                TemplateCache.load(snapshot.get("template_cache", {}))
+            except Exception as e:
+                print(f"Ignoring cached templates: {e}")
+        
+        # Load templates; files in templates/ override the built-in ones
+        self.builtin_templates = EmailTemplateLibrary.get_templates()
+        self.templates = dict(self.builtin_templates)
+        self.template_watcher = TemplateWatcher()
+        EmailTemplateLibrary.apply_changes(self.templates, self.template_watcher.poll(),
+                                           self.builtin_templates)
+        self.template_watcher.start()
         self.current_template = None
         self.current_template_id = None
+        self.current_screen = "category"
+        self._restored_form_values = {}
+        self.draft_store = DraftStore()
+        self.scheduler = SendScheduler()
+        self.scheduler.start()
         
-        # Initialize screens
-        self.welcome_screen = AnimatedWelcomeScreen(
-            self.root,
-            self.show_category_selection
-        )
-        
-        self.category_screen = CategorySelectionScreen(
-            self.root,
-            self.templates,
-            self.show_form
-        )
-        
+        # Screens are built on first use
+        self.welcome_screen = None
         self.form_screen = None
-        self.preview_screen = PreviewScreen(
-            self.root,
-            self.back_to_form,
-            self.show_category_selection,
-            self.show_settings
-        )
+        self._category_screen = None
+        self._preview_screen = None
+        self._settings_screen = None
+        self._jobs_screen = None
         
-        self.settings_screen = GmailSettingsScreen(
-            self.root,
-            self.back_to_preview
-        )
-        
-        # Show welcome screen
-        self.welcome_screen.show()
+        if not (snapshot and self.restore_session(snapshot)):
+            # Show welcome screen
+            self.welcome_screen = AnimatedWelcomeScreen(
+                self.root,
+                self.show_category_selection
+            )
+            self.welcome_screen.show()
         
         # Window close handler
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+        self.root.after(self.TEMPLATE_CHECK_MS, self.apply_template_changes)
+    
+    @property
+    def category_screen(self) -> CategorySelectionScreen:
+        if self._category_screen is None:
+            self._category_screen = CategorySelectionScreen(
+                self.root,
+                self.templates,
+                self.show_form
+            )
+        return self._category_screen
+    
+    @property
+    def preview_screen(self) -> PreviewScreen:
+        if self._preview_screen is None:
+            self._preview_screen = PreviewScreen(
+                self.root,
+                self.back_to_form,
+                self.show_category_selection,
+                self.show_settings,
+                self.scheduler,
+                self.show_jobs,
+                self.discard_draft
+            )
+        return self._preview_screen
+    
+    @property
+    def settings_screen(self) -> GmailSettingsScreen:
+        if self._settings_screen is None:
+            self._settings_screen = GmailSettingsScreen(
+                self.root,
+                self.back_to_preview
+            )
+        return self._settings_screen
+    
+    @property
+    def jobs_screen(self) -> JobsScreen:
+        if self._jobs_screen is None:
+            self._jobs_screen = JobsScreen(
+                self.root,
+                self.back_to_preview,
+                lambda: self.current_template
+            )
+        return self._jobs_screen
+    
+    def restore_session(self, snapshot: Dict) -> bool:
+        """Resume from a snapshot; returns False to fall back to a cold start"""
+        screen = snapshot.get("screen")
+        template_id = snapshot.get("template_id")
+        form_values = snapshot.get("form_values") or {}
+        preview = snapshot.get("preview") or {}
+        
+        if screen in ("form", "preview") and template_id not in self.templates:
+            return False
+        if not isinstance(form_values, dict) or not isinstance(preview, dict):
+            return False
+        
+        try:
+            if screen == "category":
+                self.show_category_selection()
+            elif screen == "form":
+                self.show_form(template_id)
+                self.form_screen.set_values(form_values)
+            else:
+                self.current_template_id = template_id
+                self.current_template = self.templates[template_id]
+                self._restored_form_values = form_values
+                self.preview_screen.attachments = [
+                    path for path in preview.get("attachments", [])
+                    if os.path.isfile(path)
+                ]
+                self.preview_screen.update_attachments_label()
+                self.show_preview(
+                    str(preview.get("content", "")),
+                    str(preview.get("recipient_email", "")),
+                    preview.get("html_content")
+                )
+        except Exception as e:
+            print(f"Could not restore session: {e}")
+            for screen_obj in (self.form_screen, self._category_screen,
+                               self._preview_screen):
+                if screen_obj:
+                    screen_obj.hide()
+            return False
+        return True
+    
+    def snapshot_state(self) -> Dict:
+        """Collect the state needed to resume on the next launch"""
+        screen = self.current_screen
+        if screen in ("settings", "jobs"):
+            screen = "preview"
+        if screen not in SessionSnapshot.SCREENS:
+            screen = "category"
+        
+        state = {
+            "screen": screen,
+            "template_id": self.current_template_id,
+            "form_values": {},
+            "preview": {},
+            "template_cache": TemplateCache.export(
+                source for template in self.templates.values() for source in template.sources()),
+        }
+        if self.form_screen:
+            state["form_values"] = self.form_screen.collect_values()
+        elif self._restored_form_values:
+            state["form_values"] = self._restored_form_values
+        if self._preview_screen and screen == "preview":
+            state["preview"] = {
+                "content": self._preview_screen.email_content,
+                "recipient_email": self._preview_screen.recipient_email,
+                "html_content": self._preview_screen.html_content,
+                "attachments": self._preview_screen.attachments,
+            }
+        return state
     
     def show_category_selection(self):
         """Show category selection screen"""
-        if hasattr(self, 'welcome_screen'):
+        if self.welcome_screen:
             self.welcome_screen.hide()
         if self.form_screen:
+            self.form_screen.save_draft()
             self.form_screen.hide()
-        self.preview_screen.hide()
+        if self._preview_screen:
+            self._preview_screen.hide()
         self.category_screen.show()
+        self.current_screen = "category"
     
     def show_form(self, template_id: str):
         """Show form for selected template"""
         self.current_template_id = template_id
         self.current_template = self.templates[template_id]
         
-        self.category_screen.hide()
+        if self._category_screen:
+            self._category_screen.hide()
         
-        # Create new form screen
+        self.build_form()
+        self.form_screen.show()
+        self.current_screen = "form"
+    
+    def build_form(self):
+        """Create a fresh form screen for the current template"""
         if self.form_screen:
+            self.form_screen.save_draft()
             self.form_screen.hide()
+            self.form_screen.frame.destroy()
         
         self.form_screen = FormScreen(
             self.root,
             self.current_template,
             self.generate_email,
-            self.show_category_selection
+            self.show_category_selection,
+            self.current_template_id,
+            self.draft_store
         )
-        self.form_screen.show()
+    
+    def discard_draft(self):
+        """Delete the current template's draft once its email is sent"""
+        if self.form_screen:
+            self.form_screen.discard_draft()
+        elif self.current_template_id:
+            self.draft_store.delete(self.current_template_id)
     
     def generate_email(self, values: Dict[str, str]):
         """Generate email from template and values"""
         email_content = self.current_template.generate(values)
+        html_content = self.current_template.generate_html(values)
         recipient_email = values.get("recipient_email", "")
-        self.show_preview(email_content, recipient_email)
+        self.show_preview(email_content, recipient_email, html_content)
     
-    def show_preview(self, content: str, recipient_email: str = ""):
+    def show_preview(self, content: str, recipient_email: str = "",
+                     html_content: Optional[str] = None):
         """Show preview screen with generated email"""
         if self.form_screen:
             self.form_screen.hide()
-        self.settings_screen.hide()
-        self.preview_screen.set_content(content, recipient_email)
+        if self._settings_screen:
+            self._settings_screen.hide()
+        self.preview_screen.set_content(content, recipient_email, html_content)
         self.preview_screen.show()
+        self.current_screen = "preview"
     
     def show_settings(self):
         """Show settings screen from preview"""
         self.preview_screen.hide()
         self.settings_screen.show()
+        self.current_screen = "settings"
+    
+    def show_jobs(self):
+        """Show the bulk jobs screen from preview"""
+        self.preview_screen.hide()
+        self.jobs_screen.show()
+        self.current_screen = "jobs"
     
     def back_to_preview(self):
-        """Return to preview screen from settings"""
-        self.settings_screen.hide()
+        """Return to preview screen from settings or jobs"""
+        if self._settings_screen:
+            self._settings_screen.hide()
+        if self._jobs_screen:
+            self._jobs_screen.hide()
         self.preview_screen.show()
+        self.current_screen = "preview"
     
     def back_to_form(self):
         """Return to form screen from preview"""
         self.preview_screen.hide()
-        self.settings_screen.hide()
+        if self._settings_screen:
+            self._settings_screen.hide()
+        if not self.form_screen and self.current_template:
+            # Resumed straight into the preview; build the form on demand
+            self.build_form()
+            self.form_screen.set_values(self._restored_form_values)
         if self.form_screen:
             self.form_screen.show()
+            self.current_screen = "form"
+    
+    def apply_template_changes(self):
+        """Swap in edited templates and refresh the screens showing them"""
+        import queue
+        
+        changed = set()
+        while True:
+            try:
+                changes = self.template_watcher.changes.get_nowait()
+            except queue.Empty:
+                break
+            changed |= EmailTemplateLibrary.apply_changes(self.templates, changes,
+                                                          self.builtin_templates)
+        if changed:
+            self.refresh_templates(changed)
+        self.root.after(self.TEMPLATE_CHECK_MS, self.apply_template_changes)
+    
+    def refresh_templates(self, changed: set):
+        """Rebuild the cards and the open form for reloaded templates"""
+        if self._category_screen:
+            self._category_screen.refresh(changed)
+        
+        template_id = self.current_template_id
+        if template_id not in changed or template_id not in self.templates:
+            return  # a deleted template stays usable until the user moves on
+        self.current_template = self.templates[template_id]
+        if not self.form_screen:
+            return
+        values = self.form_screen.collect_values()
+        if self.current_screen == "form":
+            self.build_form()
+            self.form_screen.set_values(values)
+            self.form_screen.show()
+        else:
+            # Rebuilt from these values when the user goes back to the form
+            self.form_screen.save_draft()
+            self.form_screen.frame.destroy()
+            self.form_screen = None
+            self._restored_form_values = values
     
     def on_closing(self):
         """Handle window close event"""
+        running = self._jobs_screen.running_jobs() if self._jobs_screen else 0
+        if running and not messagebox.askyesno(
+                "Jobs Running",
+                f"{running} send job(s) still running. Cancel them and exit?"):
+            return
+        if self.form_screen:
+            self.form_screen.save_draft()
+        SessionSnapshot.save(self.snapshot_state())
+        self.draft_store.close()
+        self.scheduler.stop()
+        self.template_watcher.stop()
+        if self._jobs_screen:
+            self._jobs_screen.cancel_all()
+        AdaptiveSender.close_shared()
+        if self._preview_screen:
+            self._preview_screen.warm_session.close()
         self.root.destroy()
     
     def run(self):
         """Start the application"""
+        probe_path = os.environ.get(STARTUP_PROBE_ENV)
+        if probe_path:
+            self.root.after_idle(self.report_first_window, probe_path)
         self.root.mainloop()
+    
+    def report_first_window(self, probe_path: str):
+        """Record when the first window is on screen, then exit (startup benchmark)"""
+        self.root.update_idletasks()
+        try:
+            with open(probe_path, 'w') as f:
+                f.write(repr(time.time()))
+        except Exception as e:
+            print(f"Error writing startup probe: {e}")
+        self.draft_store.close()
+        self.scheduler.stop()
+        self.template_watcher.stop()
+        self.root.destroy()
 
 
 def main():
     """Application entry point"""
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        RenderService.main(sys.argv[2:])
+        return
+    
     app = EmailGeneratorBot()
     app.run()
 
@@ -50,6 +50,39 @@ def build_executable():
         print(f"\n✗ Build failed: {e}")
         return False
 
+def build_fast_start_executable():
+    """Build the one-folder, trimmed executable from EmailBot-faststart.spec"""
+    print("\nBuilding fast-start Email Generator Bot...")
+    
+    if not os.path.exists("EmailBot-faststart.spec"):
+        print("✗ Error: EmailBot-faststart.spec not found in current directory")
+        return False
+    
+    # Precompile the app so the source run also starts from cached bytecode
+    subprocess.call([sys.executable, "-m", "compileall", "-q", "email_generator_bot.py"])
+    
+    cmd = ["pyinstaller", "--clean", "--noconfirm", "EmailBot-faststart.spec"]
+    
+    try:
+        subprocess.check_call(cmd)
+        print("\n✓ Build successful!")
+        print(f"App folder: {os.path.join(os.getcwd(), 'dist', 'EmailBot-faststart')}")
+        print("Compare launch times with: python benchmarks/bench_startup.py")
+        return True
+    except Exception as e:
+        print(f"\n✗ Build failed: {e}")
+        return False
+
+def ensure_pyinstaller():
+    """Make sure PyInstaller is available, offering to install it"""
+    if check_pyinstaller():
+        return True
+    print("\nPyInstaller not found.")
+    install = input("Install PyInstaller? (y/n): ").strip().lower()
+    if install == 'y':
+        return install_pyinstaller()
+    return False
+
 def create_batch_file():
     """Create a batch file for easy launching"""
     batch_content = """@echo off
@@ -84,9 +117,10 @@ def main():
     print("2. Create batch file for easy launching")
     print("3. Both")
     print("4. Exit")
+    print("5. Build fast-start app folder (requires PyInstaller, launches faster)")
     print()
     
-    choice = input("Enter your choice (1-4): ").strip()
+    choice = input("Enter your choice (1-5): ").strip()
     
     if choice == "1":
         # Build executable
@@ -127,6 +161,14 @@ def main():
         print("Exiting setup...")
         return
     
+    elif choice == "5":
+        # Fast-start build
+        if not ensure_pyinstaller():
+            print("Cannot build executable without PyInstaller")
+            return
+        
+        build_fast_start_executable()
+    
     else:
         print("Invalid choice. Please run the script again.")
         return
@@ -140,6 +182,8 @@ def main():
         print("- Or use: dist/EmailGeneratorBot.exe")
     if choice in ["2", "3"]:
         print("- Or double-click: run_email_bot.bat")
+    if choice == "5":
+        print("- Or use: dist/EmailBot-faststart/EmailBot-faststart.exe")
 
 if __name__ == "__main__":
     main()
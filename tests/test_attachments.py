@@ -0,0 +1,78 @@
+"""Tests for AttachmentCache"""
+
+import base64
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from email_generator_bot import AttachmentCache
+
+
+class AttachmentCacheTests(unittest.TestCase):
+    
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+    
+    def write(self, name: str, data: bytes) -> str:
+        path = os.path.join(self.directory, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+    
+    def test_chunked_encoding_matches_base64(self):
+        with mock.patch.object(AttachmentCache, "CHUNK_SIZE", 57 * 2):
+            for size in (0, 1, 56, 57, 114, 115, 1000):
+                with self.subTest(size=size):
+                    data = os.urandom(size)
+                    path = self.write(f"file{size}.bin", data)
+                    self.assertEqual(AttachmentCache.encode_file(path),
+                                     base64.encodebytes(data).decode("ascii"))
+    
+    def test_part_headers(self):
+        cache = AttachmentCache()
+        part = cache.get_part(self.write("notes.txt", b"hello"))
+        self.assertEqual(part.get_content_type(), "text/plain")
+        self.assertEqual(part.get_filename(), "notes.txt")
+        self.assertEqual(part.get_payload(decode=True), b"hello")
+        # Compressed files are sent as opaque bytes, not as their inner type
+        part = cache.get_part(self.write("notes.txt.gz", b"\x1f\x8b"))
+        self.assertEqual(part.get_content_type(), "application/octet-stream")
+    
+    def test_hits_share_one_part_until_the_file_changes(self):
+        cache = AttachmentCache()
+        path = self.write("report.pdf", b"first")
+        part = cache.get_part(path)
+        self.assertIs(cache.get_part(path), part)
+        
+        self.write("report.pdf", b"second version")
+        changed = cache.get_part(path)
+        self.assertIsNot(changed, part)
+        self.assertEqual(changed.get_payload(decode=True), b"second version")
+    
+    def test_least_recently_used_parts_are_evicted(self):
+        # Each 57-byte file encodes to 77 characters
+        cache = AttachmentCache(max_bytes=77 * 2)
+        paths = [self.write(f"f{i}.bin", bytes([i]) * 57) for i in range(3)]
+        first = cache.get_part(paths[0])
+        cache.get_part(paths[1])
+        cache.get_part(paths[0])        # now the most recently used
+        cache.get_part(paths[2])
+        self.assertLessEqual(cache._size, cache.max_bytes)
+        self.assertIs(cache.get_part(paths[0]), first)
+        self.assertEqual(len(cache._parts), 2)
+    
+    def test_oversized_part_is_still_kept(self):
+        cache = AttachmentCache(max_bytes=10)
+        path = self.write("big.bin", b"x" * 100)
+        part = cache.get_part(path)
+        self.assertIs(cache.get_part(path), part)
+        cache.clear()
+        self.assertEqual(cache._size, 0)
+        self.assertIsNot(cache.get_part(path), part)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+"""Tests for EmailSender.send_broadcast"""
+
+import smtplib
+import unittest
+
+from email_generator_bot import EmailSender
+
+
+def message(to_email: str, body: str = "Same for everyone") -> dict:
+    return {"to_email": to_email, "subject": "News", "body": body}
+
+
+class BroadcastSMTP:
+    """
+    Records transactions; refuses listed addresses and, past `limit`
+    recipients in one transaction, the rest with 452 as real servers do
+    """
+    
+    def __init__(self, refuse: dict = None, limit: int = 0, drop_after: int = 0):
+        self.sock = object()
+        self.refuse = refuse or {}
+        self.limit = limit
+        self.drop_after = drop_after
+        self.transactions = []   # recipient lists given to sendmail
+        self.single = []         # To of messages sent with send_message
+    
+    def sendmail(self, from_email, recipients, data):
+        if self.drop_after and len(self.transactions) == self.drop_after:
+            self.sock = None
+            raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+        self.transactions.append(list(recipients))
+        refused = {}
+        for position, address in enumerate(recipients):
+            if address in self.refuse:
+                refused[address] = self.refuse[address]
+            elif self.limit and position >= self.limit:
+                refused[address] = (452, b"4.5.3 Too many recipients")
+        if len(refused) == len(recipients):
+            raise smtplib.SMTPRecipientsRefused(refused)
+        return refused
+    
+    def send_message(self, msg):
+        self.single.append(msg["To"])
+    
+    def quit(self):
+        self.sock = None
+
+
+class SendBroadcastTests(unittest.TestCase):
+    
+    def send(self, messages, server, **kwargs) -> list:
+        return EmailSender.send_broadcast("me@example.com", "secret", messages,
+                                          server=server, **kwargs)
+    
+    def test_identical_messages_share_one_transaction(self):
+        server = BroadcastSMTP()
+        messages = [message("a@example.com"), message("b@example.com", "Just for B"),
+                    message("c@example.com"), message("not an address")]
+        results = self.send(messages, server)
+        
+        self.assertEqual([result.category for result in results],
+                         ["sent", "sent", "sent", "invalid"])
+        self.assertEqual(server.transactions, [["a@example.com", "c@example.com"]])
+        self.assertEqual(server.single, ["b@example.com"])
+    
+    def test_groups_are_split_at_max_recipients(self):
+        server = BroadcastSMTP()
+        messages = [message(f"user{i}@example.com") for i in range(5)]
+        self.send(messages, server, max_recipients=2)
+        self.assertEqual([len(rcpts) for rcpts in server.transactions], [2, 2, 1])
+    
+    def test_refused_recipient_fails_only_its_message(self):
+        server = BroadcastSMTP(refuse={"b@example.com": (550, b"5.1.1 No such user")})
+        messages = [message(f"{name}@example.com") for name in "abc"]
+        results = self.send(messages, server)
+        
+        self.assertEqual([result.category for result in results],
+                         ["sent", "permanent", "sent"])
+        self.assertEqual(results[1].code, 550)
+        self.assertEqual(len(server.transactions), 1)
+    
+    def test_too_many_recipients_shrinks_the_chunk(self):
+        server = BroadcastSMTP(limit=2)
+        messages = [message(f"user{i}@example.com") for i in range(5)]
+        results = self.send(messages, server)
+        
+        self.assertTrue(all(result.success for result in results))
+        self.assertEqual([len(rcpts) for rcpts in server.transactions], [5, 2, 1])
+        delivered = [address for rcpts in server.transactions for address in rcpts[:2]]
+        self.assertEqual(sorted(delivered), [f"user{i}@example.com" for i in range(5)])
+    
+    def test_dropped_session_marks_the_rest_transient(self):
+        server = BroadcastSMTP(drop_after=1)
+        messages = [message(f"user{i}@example.com") for i in range(4)]
+        results = self.send(messages, server, max_recipients=2)
+        
+        self.assertEqual([result.category for result in results],
+                         ["sent", "sent", "transient", "transient"])
+
+
+if __name__ == "__main__":
+    unittest.main()
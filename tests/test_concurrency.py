@@ -0,0 +1,116 @@
+"""Tests for the AIMD ConcurrencyController"""
+
+import threading
+import time
+import unittest
+
+from email_generator_bot import ConcurrencyController, SendResult
+
+RATE_LIMITED = SendResult(False, "Too many connections", 421, "4.7.0", "rate_limited")
+TRANSIENT = SendResult(False, "Connection dropped", None, "", "transient")
+
+
+class ConcurrencyControllerTests(unittest.TestCase):
+    
+    def send(self, controller, latency: float = 0.01, result=None):
+        ticket = controller.acquire()
+        controller.release(ticket, latency, result or SendResult.sent())
+    
+    def healthy_round(self, controller, latency: float = 0.01):
+        for _ in range(max(controller.limit, controller.MIN_ROUND)):
+            self.send(controller, latency)
+    
+    def test_healthy_rounds_add_one_up_to_maximum(self):
+        controller = ConcurrencyController(initial=1, maximum=4)
+        limits = []
+        for _ in range(5):
+            self.healthy_round(controller)
+            limits.append(controller.limit)
+        self.assertEqual(limits, [2, 3, 4, 4, 4])
+    
+    def test_throttling_halves_the_limit_once_per_round(self):
+        controller = ConcurrencyController(initial=8, maximum=16)
+        tickets = [controller.acquire() for _ in range(3)]
+        
+        controller.release(tickets[0], 0.01, RATE_LIMITED)
+        self.assertEqual(controller.limit, 4)
+        # Sends that started before the cut do not cut again
+        controller.release(tickets[1], 0.01, RATE_LIMITED)
+        controller.release(tickets[2], 0.01, RATE_LIMITED)
+        self.assertEqual(controller.limit, 4)
+        self.assertEqual(controller.throttled, 3)
+        self.assertEqual(controller.ceiling, 8)
+        
+        self.send(controller, result=RATE_LIMITED)
+        self.assertEqual(controller.limit, 2)
+    
+    def test_transient_errors_cut_the_limit(self):
+        controller = ConcurrencyController(initial=8, maximum=16)
+        for _ in range(7):
+            self.send(controller)
+        self.send(controller, result=TRANSIENT)
+        self.assertEqual(controller.limit, 6)
+    
+    def test_latency_rise_steps_down(self):
+        controller = ConcurrencyController(initial=4, maximum=16)
+        self.healthy_round(controller, latency=0.01)
+        self.assertEqual(controller.limit, 5)
+        self.healthy_round(controller, latency=0.05)
+        self.assertEqual(controller.limit, 4)
+    
+    def test_limit_holds_below_ceiling_then_probes(self):
+        controller = ConcurrencyController(initial=8, maximum=16)
+        self.send(controller, result=RATE_LIMITED)
+        while controller.limit < 7:
+            self.healthy_round(controller)
+        
+        for _ in range(controller.PROBE_ROUNDS - 1):
+            self.healthy_round(controller)
+        self.assertEqual(controller.limit, 7)
+        self.healthy_round(controller)
+        self.assertEqual(controller.limit, 8)
+        
+        # Throttled again at the ceiling: the next probe waits twice as long
+        self.send(controller, result=RATE_LIMITED)
+        self.assertEqual(controller.limit, 4)
+        self.assertEqual(controller._probe_rounds, 2 * controller.PROBE_ROUNDS)
+    
+    def test_probing_past_the_ceiling_clears_it(self):
+        controller = ConcurrencyController(initial=4, maximum=16)
+        self.send(controller, result=RATE_LIMITED)
+        self.assertEqual((controller.limit, controller.ceiling), (2, 4))
+        for _ in range(2 * controller.PROBE_ROUNDS + 1):
+            self.healthy_round(controller)
+        self.assertEqual(controller.limit, 5)
+        self.assertIsNone(controller.ceiling)
+    
+    def test_limit_stays_within_bounds(self):
+        controller = ConcurrencyController(initial=2, minimum=2, maximum=3)
+        for _ in range(3):
+            self.send(controller, result=RATE_LIMITED)
+        self.assertEqual(controller.limit, 2)
+        self.assertEqual(ConcurrencyController(initial=10, maximum=3).limit, 3)
+    
+    def test_acquire_blocks_at_the_limit(self):
+        controller = ConcurrencyController(initial=1)
+        ticket = controller.acquire()
+        acquired = threading.Event()
+        
+        def second():
+            controller.release(controller.acquire())
+            acquired.set()
+        
+        thread = threading.Thread(target=second, daemon=True)
+        thread.start()
+        time.sleep(0.05)
+        self.assertFalse(acquired.is_set())
+        self.assertEqual(controller.stats()["in_flight"], 1)
+        
+        controller.release(ticket)
+        self.assertTrue(acquired.wait(5))
+        thread.join(5)
+        self.assertEqual(controller.stats()["in_flight"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
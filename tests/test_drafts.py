@@ -0,0 +1,40 @@
+"""Tests for DraftStore"""
+
+import os
+import tempfile
+import unittest
+
+from email_generator_bot import DraftStore
+
+
+class DraftStoreTests(unittest.TestCase):
+    
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.store = DraftStore(os.path.join(directory.name, "drafts"))
+        self.addCleanup(self.store.close)
+    
+    def test_saved_draft_loads_back(self):
+        self.store.save("job_application", {"company_name": "Acme"})
+        self.assertEqual(self.store.load("job_application"), {"company_name": "Acme"})
+        self.assertTrue(self.store.flush())
+        self.assertTrue(os.path.exists(self.store.path_for("job_application")))
+    
+    def test_delete_removes_written_draft(self):
+        self.store.save("job_application", {"company_name": "Acme"})
+        self.store.flush()
+        self.store.delete("job_application")
+        self.assertIsNone(self.store.load("job_application"))
+        self.assertFalse(os.path.exists(self.store.path_for("job_application")))
+    
+    def test_delete_drops_queued_draft(self):
+        self.store.save("job_application", {"company_name": "Acme"})
+        self.store.delete("job_application")
+        self.store.flush()
+        self.assertIsNone(self.store.load("job_application"))
+        self.assertFalse(os.path.exists(self.store.path_for("job_application")))
+
+
+if __name__ == "__main__":
+    unittest.main()
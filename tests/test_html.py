@@ -0,0 +1,98 @@
+"""Tests for HTML templates, their derived text part and multipart messages"""
+
+import os
+import tempfile
+import unittest
+
+from email_generator_bot import EmailSender, EmailTemplate, escape_html, html_to_text
+
+HTML_SOURCE = (
+    "To: {recipient_email}\n"
+    "Subject: Hello {name}\n"
+    "<html><head><title>ignored</title><style>p.note { margin: 0 }</style></head><body>\n"
+    "<h1>Hi {name}</h1>\n"
+    "<p>Thanks for\n   your   order.<br>See <a href=\"https://example.com\">the site</a>.</p>\n"
+    "<ul><li>One</li><li>Two</li></ul>\n"
+    "<script>alert(1)</script>\n"
+    "</body></html>"
+)
+
+
+class EscapeHtmlTests(unittest.TestCase):
+    
+    def test_special_characters_and_newlines(self):
+        self.assertEqual(escape_html("<a href='x'>\"Tom\" & Jerry</a>"),
+                         "&lt;a href=&#x27;x&#x27;&gt;&quot;Tom&quot; &amp; Jerry&lt;/a&gt;")
+        self.assertEqual(escape_html("line one\nline two"), "line one<br>\nline two")
+    
+    def test_plain_values_are_returned_unchanged(self):
+        value = "Nothing to escape here"
+        self.assertIs(escape_html(value), value)
+
+
+class HtmlToTextTests(unittest.TestCase):
+    
+    def test_blocks_lists_and_links(self):
+        self.assertEqual(
+            html_to_text(HTML_SOURCE),
+            "To: {recipient_email}\n"
+            "Subject: Hello {name}\n"
+            "\n"
+            "Hi {name}\n"
+            "\n"
+            "Thanks for your order.\n"
+            "See the site (https://example.com).\n"
+            "\n"
+            "- One\n"
+            "- Two"
+        )
+    
+    def test_entities_are_decoded(self):
+        self.assertEqual(html_to_text("<p>Fish &amp; chips &lt;3</p>"), "Fish & chips <3")
+
+
+class MultipartTests(unittest.TestCase):
+    
+    def setUp(self):
+        self.template = EmailTemplate("Order", "", [], html=HTML_SOURCE)
+    
+    def test_text_part_is_derived_from_html(self):
+        self.assertEqual(self.template.template, html_to_text(HTML_SOURCE))
+        self.assertTrue(self.template.has_html)
+    
+    def test_message_for_escapes_values_in_html_only(self):
+        message = self.template.message_for({"recipient_email": "a@example.com",
+                                             "name": "Ann & <Bob>"})
+        self.assertEqual(message["to_email"], "a@example.com")
+        self.assertEqual(message["subject"], "Hello Ann & <Bob>")
+        self.assertIn("Hi Ann & <Bob>", message["body"])
+        self.assertIn("<h1>Hi Ann &amp; &lt;Bob&gt;</h1>", message["html_body"])
+        self.assertNotIn("Subject:", message["html_body"])
+    
+    def test_alternative_parts_put_plain_text_first(self):
+        msg = EmailSender.build_message("me@example.com", "you@example.com", "Hi",
+                                        "Plain body", html_body="<p>HTML body</p>")
+        self.assertEqual(msg.get_content_type(), "multipart/alternative")
+        self.assertEqual([part.get_content_type() for part in msg.get_payload()],
+                         ["text/plain", "text/html"])
+    
+    def test_attachments_wrap_the_alternative_in_mixed(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "notes.txt")
+            with open(path, "w") as f:
+                f.write("notes")
+            msg = EmailSender.build_message("me@example.com", "you@example.com", "Hi",
+                                            "Plain body", [path], "<p>HTML body</p>")
+        self.assertEqual(msg.get_content_type(), "multipart/mixed")
+        alternative, attachment = msg.get_payload()
+        self.assertEqual(alternative.get_content_type(), "multipart/alternative")
+        self.assertEqual(attachment.get_filename(), "notes.txt")
+    
+    def test_plain_templates_send_a_single_text_part(self):
+        msg = EmailSender.build_message("me@example.com", "you@example.com", "Hi", "Body")
+        self.assertEqual([part.get_content_type() for part in msg.get_payload()],
+                         ["text/plain"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+"""Tests for BulkJob's worker loop"""
+
+import os
+import queue
+import tempfile
+import threading
+import time
+import unittest
+
+from email_generator_bot import (BulkJob, EmailTemplate, MergeCheck, SendResult,
+                                 SendThrottle, TemplateField)
+
+
+def drain(updates) -> list:
+    items = []
+    while True:
+        try:
+            items.append(updates.get_nowait())
+        except queue.Empty:
+            return items
+
+
+class BulkJobTests(unittest.TestCase):
+    
+    def setUp(self):
+        self.updates = queue.SimpleQueue()
+        self.sent = []
+    
+    def make_job(self, results, throttle=None, batches=None) -> BulkJob:
+        results = iter(results)
+        
+        def send_one(message):
+            self.sent.append(message["to_email"])
+            return next(results, SendResult.sent())
+        
+        if batches is None:
+            batches = [[{"to_email": f"user{i}@example.com"} for i in range(5)]]
+        return BulkJob("test", batches, self.updates, total=5, send_one=send_one,
+                       throttle=throttle)
+    
+    def run_job(self, job: BulkJob):
+        job.start()
+        job._thread.join(5)
+        self.assertFalse(job._thread.is_alive())
+    
+    def test_sends_every_message_and_counts_failures(self):
+        batches = [[{"to_email": "a@example.com"}, {"error": "Row 2: subject"}],
+                   [{"to_email": "b@example.com"}]]
+        job = self.make_job([SendResult.sent(), SendResult(False, "no", 550)], batches=batches)
+        self.run_job(job)
+        
+        final = drain(self.updates)[-1]
+        self.assertEqual(job.state, "finished")
+        self.assertTrue(final.final)
+        self.assertEqual((final.sent, final.failed), (1, 2))
+        self.assertEqual(final.failures, {"invalid": 1, "permanent": 1})
+        self.assertEqual(final.batch, 2)
+    
+    def test_final_update_is_queued_before_finished(self):
+        seen = []
+        updates = self.updates
+        
+        class Recorder:
+            def put(self, update):
+                seen.append((update.state, job.finished))
+                updates.put(update)
+        
+        job = self.make_job([])
+        job.updates = Recorder()
+        self.run_job(job)
+        
+        self.assertEqual(seen[-1], ("finished", False))
+        self.assertTrue(job.finished)
+    
+    def test_cancel_during_throttle_wait_stops_before_sending(self):
+        throttle = SendThrottle(initial_pause=0.5)
+        job = self.make_job([SendResult(False, "slow down", 421, "", "rate_limited")],
+                            throttle=throttle)
+        job.start()
+        time.sleep(0.1)
+        job.cancel()
+        job._thread.join(5)
+        
+        self.assertEqual(job.state, "cancelled")
+        self.assertEqual(self.sent, ["user0@example.com"])
+        self.assertEqual(drain(self.updates)[-1].state, "cancelled")
+    
+    def test_pause_during_throttle_wait_holds_the_next_send(self):
+        throttle = SendThrottle(initial_pause=0.3)
+        job = self.make_job([SendResult(False, "slow down", 421, "", "rate_limited")],
+                            throttle=throttle)
+        job.start()
+        time.sleep(0.1)
+        job.pause()
+        time.sleep(0.4)  # the throttle pause ends while the job is paused
+        
+        self.assertEqual(self.sent, ["user0@example.com"])
+        self.assertIn("paused", [update.state for update in drain(self.updates)])
+        
+        job.resume()
+        job._thread.join(5)
+        self.assertEqual(job.state, "finished")
+        self.assertEqual(len(self.sent), 5)
+
+    
+    def test_merge_file_job_sends_only_checked_rows(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "people.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write('{"recipient_email": "a@Example.com"}\n'
+                    'not json\n'
+                    '{"recipient_email": "A@example.com"}\n'
+                    '{"recipient_email": "b@example.com"}\n')
+        template = EmailTemplate("Hi", "To: {recipient_email}\nSubject: Hi\n\nHello",
+                                 [TemplateField("recipient_email", "To")])
+        check = MergeCheck(path, template).run()
+        self.assertEqual(check.report.report_lines(),
+                         ["recipient_email: 1 rows duplicate address (e.g. rows 3)",
+                          "1 rows unreadable (e.g. Line 2: not valid JSON)"])
+        
+        job = BulkJob.from_merge_file(path, template, self.updates, batch_size=2,
+                                      check=check, send_one=self.record_send)
+        self.run_job(job)
+        self.assertEqual(self.sent, ["a@example.com", "b@example.com"])
+        self.assertEqual(job.total, 2)
+        self.assertEqual(drain(self.updates)[-1].failed, 0)
+    
+    def record_send(self, message) -> SendResult:
+        self.sent.append(message["to_email"])
+        return SendResult.sent()
+
+
+if __name__ == "__main__":
+    unittest.main()
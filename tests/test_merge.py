@@ -0,0 +1,124 @@
+"""Tests for MergeReader"""
+
+import json
+import os
+import tempfile
+import unittest
+
+from email_generator_bot import MergeReader
+
+CSV_SOURCE = (
+    'name,email,note\r\n'
+    'Ann,ann@example.com,plain\r\n'
+    'Bob,bob@example.com,"quoted, with comma"\r\n'
+    'Cy,cy@example.com,"spans\ntwo lines"\r\n'
+    'Di,di@example.com\r\n'
+    '\r\n'
+    'Ed,ed@example.com,"say ""hi"""\r\n'
+    'Flo,flo@example.com,last'
+)
+CSV_ROWS = [
+    ["Ann", "ann@example.com", "plain"],
+    ["Bob", "bob@example.com", "quoted, with comma"],
+    ["Cy", "cy@example.com", "spans\ntwo lines"],
+    ["Di", "di@example.com", ""],
+    ["Ed", "ed@example.com", 'say "hi"'],
+    ["Flo", "flo@example.com", "last"],
+]
+
+
+class MergeReaderTests(unittest.TestCase):
+    
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+    
+    def write(self, name: str, text: str) -> str:
+        path = os.path.join(self.directory, name)
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+        return path
+    
+    def read_all(self, reader: MergeReader, size: int = 100, start: int = 0) -> list:
+        rows = []
+        for table, _ in reader.batches(size, start):
+            rows.extend([table.columns[name][row] for name in reader.columns]
+                        for row in range(table.row_count))
+        return rows
+    
+    def test_csv_records_match_csv_module(self):
+        path = self.write("people.csv", CSV_SOURCE)
+        with MergeReader(path) as reader:
+            self.assertEqual(reader.header, ["name", "email", "note"])
+            self.assertEqual(self.read_all(reader), CSV_ROWS)
+    
+    def test_records_survive_any_slice_size(self):
+        path = self.write("people.csv", CSV_SOURCE)
+        for slice_bytes in (1, 7, 16, 64):
+            with self.subTest(slice_bytes=slice_bytes), MergeReader(path) as reader:
+                reader.SLICE_BYTES = slice_bytes
+                self.assertEqual(self.read_all(reader), CSV_ROWS)
+    
+    def test_only_requested_columns_are_read(self):
+        path = self.write("people.csv", CSV_SOURCE)
+        with MergeReader(path, ["note", "name", "missing"]) as reader:
+            self.assertEqual(reader.columns, ["note", "name"])
+            self.assertEqual(self.read_all(reader)[2], ["spans\ntwo lines", "Cy"])
+    
+    def test_batch_offsets_resume_after_the_batch(self):
+        path = self.write("people.csv", CSV_SOURCE)
+        with MergeReader(path) as reader:
+            offsets = [offset for _, offset in reader.batches(2)]
+            self.assertEqual(offsets[-1], reader.size)
+            for done, offset in zip((2, 4, 6), offsets):
+                with self.subTest(offset=offset):
+                    self.assertEqual(self.read_all(reader, start=offset), CSV_ROWS[done:])
+            self.assertEqual(self.read_all(reader, start=0), CSV_ROWS)
+    
+    def test_estimate_records(self):
+        path = self.write("people.csv", CSV_SOURCE)
+        with MergeReader(path) as reader:
+            # Counts lines, so the blank line and the quoted newline add one each
+            self.assertEqual(reader.estimate_records(), len(CSV_ROWS) + 2)
+    
+    def test_jsonl_records(self):
+        lines = [{"name": "Ann", "items": ["a", "b"], "age": 30},
+                 {"name": "Bob"},
+                 {"name": "Cy", "items": None}]
+        path = self.write("people.jsonl", "\n".join(json.dumps(line) for line in lines) + "\n\n")
+        with MergeReader(path, ["name", "items", "age"]) as reader:
+            self.assertEqual(reader.format, "jsonl")
+            self.assertEqual(self.read_all(reader),
+                             [["Ann", "a\nb", "30"], ["Bob", "", ""], ["Cy", "", ""]])
+            _, offset = next(reader.batches(1))
+            self.assertEqual(self.read_all(reader, start=offset)[0][0], "Bob")
+    
+    def test_bad_jsonl_lines_become_unreadable_rows(self):
+        source = ('{"name": "Ann"}\n'
+                  '\n'
+                  '{"name": \n'
+                  '["not", "an", "object"]\n'
+                  '{"name": "Bob"}\n')
+        path = self.write("people.jsonl", source)
+        with MergeReader(path, ["name"]) as reader:
+            tables = [table for table, _ in reader.batches(2)]
+            self.assertEqual(self.read_all(reader), [["Ann"], [""], [""], ["Bob"]])
+            self.assertEqual([table.unreadable for table in tables],
+                             [{1: "Line 3: not valid JSON"}, {0: "Line 4: not a JSON object"}])
+            # Line numbers stay exact when resuming part way through
+            _, offset = next(reader.batches(1))
+            table, _ = next(reader.batches(3, offset))
+            self.assertEqual(table.unreadable, {0: "Line 3: not valid JSON",
+                                                1: "Line 4: not a JSON object"})
+    
+    def test_empty_file(self):
+        path = self.write("empty.csv", "")
+        with MergeReader(path) as reader:
+            self.assertEqual(reader.header, [])
+            self.assertEqual(list(reader.batches()), [])
+            self.assertEqual(reader.estimate_records(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+"""Tests for the preview's line diff"""
+
+import random
+import unittest
+
+from email_generator_bot import PreviewScreen
+
+
+def apply(old: str, changes: list) -> str:
+    lines = PreviewScreen.split_lines(old)
+    for start, end, replacement, count in reversed(changes):
+        replacement_lines = PreviewScreen.split_lines(replacement)
+        assert len(replacement_lines) == count
+        lines[start:end] = replacement_lines
+    return "".join(lines)
+
+
+class LineDiffTests(unittest.TestCase):
+    
+    OLD = "Subject: Hello\n\nDear Ann,\n\nThanks for the call.\n\nBest,\nBob\n"
+    
+    def test_identical_text_has_no_changes(self):
+        self.assertEqual(PreviewScreen.line_diff(self.OLD, self.OLD), [])
+    
+    def test_edited_line_is_the_only_change(self):
+        new = self.OLD.replace("Dear Ann", "Dear Annabel")
+        self.assertEqual(PreviewScreen.line_diff(self.OLD, new),
+                         [(2, 3, "Dear Annabel,\n", 1)])
+    
+    def test_inserted_and_removed_lines(self):
+        inserted = self.OLD.replace("Best,\n", "P.S. See you soon.\n\nBest,\n")
+        self.assertEqual(apply(self.OLD, PreviewScreen.line_diff(self.OLD, inserted)), inserted)
+        removed = self.OLD.replace("Thanks for the call.\n\n", "")
+        self.assertEqual(apply(self.OLD, PreviewScreen.line_diff(self.OLD, removed)), removed)
+    
+    def test_random_edits_round_trip(self):
+        rng = random.Random(42)
+        words = ["alpha", "beta", "gamma", "", "delta"]
+        for _ in range(300):
+            old = "\n".join(rng.choice(words) for _ in range(rng.randint(0, 12)))
+            lines = old.split("\n")
+            for _ in range(rng.randint(0, 3)):
+                position = rng.randint(0, len(lines))
+                action = rng.choice(("insert", "delete", "replace"))
+                if action == "insert":
+                    lines.insert(position, rng.choice(words))
+                elif lines and position < len(lines):
+                    if action == "delete":
+                        del lines[position]
+                    else:
+                        lines[position] += "!"
+            new = "\n".join(lines) + rng.choice(("", "\n"))
+            with self.subTest(old=old, new=new):
+                self.assertEqual(apply(old, PreviewScreen.line_diff(old, new)), new)
+    
+    def test_large_reshaped_region_gives_up(self):
+        class SmallLimit(PreviewScreen):
+            MAX_MATCH_LINES = 10
+        
+        old = "".join(f"line {i}\n" for i in range(20))
+        new = "".join(f"line {i}\n" for i in range(0, 20, 2))
+        self.assertIsNone(SmallLimit.line_diff(old, new))
+        self.assertIsNotNone(PreviewScreen.line_diff(old, new))
+
+
+if __name__ == "__main__":
+    unittest.main()
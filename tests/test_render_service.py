@@ -0,0 +1,122 @@
+"""Tests for RenderService and its RenderCache"""
+
+import http.client
+import json
+import threading
+import unittest
+
+from email_generator_bot import EmailTemplate, RenderCache, RenderService, TemplateField
+
+
+def library(greeting: str = "Hello") -> dict:
+    return {
+        "welcome": EmailTemplate(
+            "Welcome", f"To: {{recipient_email}}\nSubject: Hi\n\n{greeting} {{name}}",
+            [TemplateField("name", "Name")], html=f"<p>{greeting} {{name}}</p>"),
+    }
+
+
+class RenderCacheTests(unittest.TestCase):
+    
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = RenderCache(max_entries=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        self.assertEqual(cache.get("a"), 1)     # "b" is now the oldest
+        cache.put("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual((cache.get("a"), cache.get("c")), (1, 3))
+        stats = cache.stats()
+        self.assertEqual((stats["entries"], stats["hits"], stats["misses"]), (2, 3, 1))
+    
+    def test_key_ignores_value_order(self):
+        self.assertEqual(RenderCache.key("t", 1, {"a": "1", "b": "2"}, False),
+                         RenderCache.key("t", 1, {"b": "2", "a": "1"}, False))
+
+
+class RenderServiceTests(unittest.TestCase):
+    
+    def setUp(self):
+        self.service = RenderService(library(), RenderCache(max_entries=2))
+    
+    def test_repeat_renders_come_from_the_cache(self):
+        first = self.service.render("welcome", {"name": "Ann"}, html=True)
+        self.assertFalse(first["cached"])
+        self.assertEqual(first["html"], "<p>Hello Ann</p>")
+        again = self.service.render("welcome", {"name": "Ann"}, html=True)
+        self.assertTrue(again["cached"])
+        self.assertEqual(again["text"], first["text"])
+    
+    def test_changed_templates_miss_the_cache(self):
+        self.service.render("welcome", {"name": "Ann"})
+        self.service.set_templates(library("Welcome aboard"))
+        result = self.service.render("welcome", {"name": "Ann"})
+        self.assertFalse(result["cached"])
+        self.assertTrue(result["text"].endswith("Welcome aboard Ann"))
+    
+    def test_batch_reports_bad_items_without_failing(self):
+        results = self.service.render_batch({"requests": [
+            {"template": "welcome", "values": {"name": "Ann"}},
+            {"template": "missing", "values": {}},
+            {"template": "welcome", "values": ["not", "an", "object"]},
+        ]})
+        self.assertTrue(results[0]["text"].endswith("Hello Ann"))
+        self.assertEqual(results[1], {"error": "Unknown template: missing"})
+        self.assertEqual(results[2], {"error": "'values' must be an object"})
+    
+    def test_routes_and_status_codes(self):
+        handle = self.service.handle
+        self.assertEqual(handle("GET", "/templates", b"")[1]["templates"][0]["id"], "welcome")
+        self.assertEqual(handle("GET", "/templates/welcome/", b"")[0], 200)
+        self.assertEqual(handle("GET", "/templates/missing", b"")[0], 404)
+        self.assertEqual(handle("POST", "/render", b"{not json")[0], 400)
+        self.assertEqual(handle("POST", "/render", b"[]")[0], 400)
+        self.assertEqual(handle("POST", "/render", b'{"template": "missing"}')[0], 404)
+        self.assertEqual(handle("DELETE", "/render", b"")[0], 404)
+        self.assertEqual(self.service.stats()["errors"], 5)
+
+
+class RenderServiceHTTPTests(unittest.TestCase):
+    
+    def setUp(self):
+        self.service = RenderService(library())
+        server = self.service.make_server(port=0)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.connection = http.client.HTTPConnection(*server.server_address, timeout=5)
+        self.addCleanup(self.connection.close)
+    
+    def request(self, method: str, path: str, payload=None) -> tuple:
+        body = None if payload is None else json.dumps(payload)
+        self.connection.request(method, path, body)
+        response = self.connection.getresponse()
+        return response.status, json.loads(response.read())
+    
+    def test_render_over_one_kept_alive_connection(self):
+        status, result = self.request("POST", "/render",
+                                      {"template": "welcome", "values": {"name": "Zoë"}})
+        self.assertEqual(status, 200)
+        self.assertTrue(result["text"].endswith("Hello Zoë"))
+        sock = self.connection.sock
+        
+        status, result = self.request("POST", "/render/batch",
+                                      {"template": "welcome",
+                                       "items": [{"name": "Zoë"}, {"name": "Bo"}]})
+        self.assertEqual(status, 200)
+        self.assertEqual([item["cached"] for item in result["results"]], [True, False])
+        
+        status, stats = self.request("GET", "/stats")
+        self.assertEqual(stats["requests"], 3)
+        self.assertEqual(stats["cache"]["hits"], 1)
+        self.assertIs(self.connection.sock, sock)
+    
+    def test_unknown_route(self):
+        status, result = self.request("GET", "/nowhere")
+        self.assertEqual(status, 404)
+        self.assertIn("No route", result["error"])
+
+
+if __name__ == "__main__":
+    unittest.main()
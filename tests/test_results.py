@@ -0,0 +1,98 @@
+"""Tests for SendResult classification and RetryPolicy"""
+
+import smtplib
+import socket
+import unittest
+from unittest import mock
+
+from email_generator_bot import RetryPolicy, SendResult
+
+
+class SendResultTests(unittest.TestCase):
+    
+    def test_reply_categories(self):
+        cases = [
+            (550, "5.4.5 Daily user sending quota exceeded", "quota"),
+            (550, "Mailbox quota exceeded for this account", "quota"),
+            (421, "4.7.0 Try again later, closing connection", "rate_limited"),
+            (454, "4.7.0 Too many login attempts", "rate_limited"),
+            (450, "4.2.1 The user you are trying to contact is receiving mail too quickly"
+                  " - too many messages", "rate_limited"),
+            (535, "5.7.8 Username and Password not accepted", "auth"),
+            (450, "4.2.1 Mailbox busy", "transient"),
+            (451, "4.3.0 Local error in processing", "transient"),
+            (550, "5.1.1 The email account that you tried to reach does not exist",
+             "permanent"),
+            (None, "", "transient"),
+        ]
+        for code, text, category in cases:
+            with self.subTest(code=code, text=text):
+                result = SendResult.from_reply(code, text, "message")
+                self.assertEqual(result.category, category)
+                self.assertFalse(result.success)
+    
+    def test_enhanced_code_is_extracted(self):
+        result = SendResult.from_reply(550, "5.1.1 <x@example.com> no such user", "message")
+        self.assertEqual((result.code, result.enhanced_code), (550, "5.1.1"))
+    
+    def test_exceptions(self):
+        refused = smtplib.SMTPRecipientsRefused(
+            {"x@example.com": (550, b"5.1.1 No such user")})
+        cases = [
+            (refused, "permanent", 550),
+            (smtplib.SMTPDataError(421, b"4.7.0 Try again later"), "rate_limited", 421),
+            (smtplib.SMTPAuthenticationError(535, b"5.7.8 Bad credentials"), "auth", 535),
+            (smtplib.SMTPServerDisconnected("Connection unexpectedly closed"), "transient",
+             None),
+            (socket.timeout("timed out"), "transient", None),
+            (ValueError("something else"), "permanent", None),
+        ]
+        for error, category, code in cases:
+            with self.subTest(error=error):
+                result = SendResult.from_exception(error)
+                self.assertEqual((result.category, result.code), (category, code))
+    
+    def test_unpacks_like_the_old_tuple(self):
+        success, message = SendResult.sent()
+        self.assertTrue(success)
+        self.assertEqual(message, "Email sent successfully!")
+        self.assertEqual(SendResult(False, "no").category, "permanent")
+    
+    def test_retryable_categories(self):
+        self.assertTrue(SendResult.from_reply(450, "4.2.1 Mailbox busy", "").retryable)
+        self.assertTrue(SendResult.from_reply(421, "4.7.0 Try later", "").retryable)
+        for category in ("sent", "quota", "auth", "permanent", "invalid"):
+            with self.subTest(category=category):
+                self.assertFalse(SendResult(False, "", category=category).retryable)
+
+
+class RetryPolicyTests(unittest.TestCase):
+    
+    def setUp(self):
+        self.policy = RetryPolicy(max_attempts=4, base_delay=2.0, max_delay=10.0,
+                                  rate_limit_delay=60.0)
+        self.transient = SendResult.from_reply(450, "4.2.1 Mailbox busy", "")
+    
+    def test_backoff_is_capped_full_jitter(self):
+        with mock.patch("random.uniform", side_effect=lambda low, high: high):
+            delays = [self.policy.next_delay(attempt, self.transient) for attempt in (1, 2, 3)]
+        self.assertEqual(delays, [4.0, 8.0, 10.0])
+        for attempt in (1, 2, 3):
+            with self.subTest(attempt=attempt):
+                delay = self.policy.next_delay(attempt, self.transient)
+                self.assertTrue(0 <= delay <= 10.0)
+    
+    def test_rate_limits_wait_at_least_the_rate_limit_delay(self):
+        result = SendResult.from_reply(421, "4.7.0 Try again later", "")
+        self.assertGreaterEqual(self.policy.next_delay(1, result), 60.0)
+    
+    def test_gives_up(self):
+        self.assertIsNone(self.policy.next_delay(4, self.transient))
+        for category in ("permanent", "auth", "quota", "invalid"):
+            with self.subTest(category=category):
+                result = SendResult(False, "", category=category)
+                self.assertIsNone(self.policy.next_delay(1, result))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+"""Tests for SendScheduler and its journal"""
+
+import json
+import os
+import queue
+import tempfile
+import time
+import unittest
+
+from email_generator_bot import RetryPolicy, SendResult, SendScheduler
+
+TRANSIENT = SendResult(False, "Connection dropped", None, "", "transient")
+
+
+class SendSchedulerTests(unittest.TestCase):
+    
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "scheduled.jsonl")
+        self.finished = queue.SimpleQueue()
+    
+    def scheduler(self, send_batch=None, **kwargs) -> SendScheduler:
+        scheduler = SendScheduler(self.path, send_batch=send_batch,
+                                  on_result=lambda message, result:
+                                  self.finished.put((message["to_email"], result.category)),
+                                  **kwargs)
+        self.addCleanup(scheduler.stop)
+        return scheduler
+    
+    def journal_ops(self) -> list:
+        with open(self.path, encoding="utf-8") as f:
+            return [json.loads(line)["op"] for line in f]
+    
+    def test_journal_replays_adds_and_cancels(self):
+        scheduler = self.scheduler()
+        later = time.time() + 3600
+        keep = scheduler.schedule(later + 60, "b@example.com", "Second", "Body")
+        first = scheduler.schedule(later, "a@example.com", "First", "Body")
+        cancelled = scheduler.schedule(later, "c@example.com", "Gone", "Body")
+        self.assertTrue(scheduler.cancel(cancelled))
+        self.assertFalse(scheduler.cancel(cancelled))
+        scheduler.stop()
+        
+        replayed = self.scheduler().pending()
+        self.assertEqual([message["id"] for message in replayed], [first, keep])
+        self.assertEqual(self.journal_ops(), ["add", "add", "add", "cancel"])
+    
+    def test_torn_final_line_is_ignored(self):
+        scheduler = self.scheduler()
+        message_id = scheduler.schedule(time.time() + 3600, "a@example.com", "Hi", "Body")
+        scheduler.stop()
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write('{"op": "add", "mess')
+        
+        self.assertEqual([message["id"] for message in self.scheduler().pending()],
+                         [message_id])
+    
+    def test_due_messages_are_sent_and_journaled(self):
+        batches = []
+        
+        def send_batch(batch):
+            batches.append([message["to_email"] for message in batch])
+            return [SendResult.sent()] * len(batch)
+        
+        scheduler = self.scheduler(send_batch)
+        now = time.time()
+        scheduler.schedule(now - 1, "a@example.com", "Hi", "Body")
+        scheduler.schedule(now - 1, "b@example.com", "Hi", "Body")
+        scheduler.start()
+        
+        self.assertEqual({self.finished.get(timeout=5), self.finished.get(timeout=5)},
+                         {("a@example.com", "sent"), ("b@example.com", "sent")})
+        self.assertEqual(batches, [["a@example.com", "b@example.com"]])
+        scheduler.stop()
+        self.assertEqual(self.journal_ops(), ["add", "add", "sent", "sent"])
+        self.assertEqual(self.scheduler().pending(), [])
+    
+    def test_transient_failure_is_retried(self):
+        outcomes = [TRANSIENT, SendResult.sent()]
+        scheduler = self.scheduler(lambda batch: [outcomes.pop(0)],
+                                   retry_policy=RetryPolicy(base_delay=0.01))
+        scheduler.schedule(time.time() - 1, "a@example.com", "Hi", "Body")
+        scheduler.start()
+        
+        self.assertEqual(self.finished.get(timeout=5), ("a@example.com", "sent"))
+        scheduler.stop()
+        self.assertEqual(self.journal_ops(), ["add", "add", "sent"])
+    
+    def test_replay_compacts_a_mostly_finished_journal(self):
+        with open(self.path, "w", encoding="utf-8") as f:
+            for index in range(200):
+                message = {"id": str(index), "due": time.time() + 3600,
+                           "to_email": "a@example.com", "subject": "Hi", "body": "Body"}
+                f.write(json.dumps({"op": "add", "message": message}) + "\n")
+                if index:
+                    f.write(json.dumps({"op": "sent", "id": str(index)}) + "\n")
+        
+        self.assertEqual([message["id"] for message in self.scheduler().pending()], ["0"])
+        self.assertEqual(self.journal_ops(), ["add"])
+
+
+if __name__ == "__main__":
+    unittest.main()
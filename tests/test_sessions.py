@@ -0,0 +1,101 @@
+"""Tests for WarmSMTPSession"""
+
+import threading
+import time
+import unittest
+
+from email_generator_bot import WarmSMTPSession
+
+
+class FakeServer:
+    
+    def __init__(self, quit_delay: float = 0.0):
+        self.quit_delay = quit_delay
+        self.closed = threading.Event()
+        self.in_noop = threading.Event()
+        self.release_noop = threading.Event()
+        self.release_noop.set()
+    
+    def noop(self):
+        self.in_noop.set()
+        self.release_noop.wait(5)
+        self.in_noop.clear()
+        return 250, b"OK"
+    
+    def quit(self):
+        time.sleep(self.quit_delay)
+        self.closed.set()
+
+
+class WarmSMTPSessionTests(unittest.TestCase):
+    
+    def setUp(self):
+        self.servers = []
+        
+        def connect(email, password):
+            server = FakeServer(quit_delay=0.5)
+            self.servers.append(server)
+            return server
+        
+        self.session = WarmSMTPSession(connect=connect)
+        self.addCleanup(self.session.close)
+    
+    def test_take_hands_over_the_warm_server(self):
+        self.session.warm("me@example.com", "secret-1")
+        server = self.session.take("me@example.com", "secret-1", timeout=5)
+        self.assertIs(server, self.servers[0])
+        self.assertIsNone(self.session.take("me@example.com", "secret-1", timeout=0))
+    
+    def test_take_ignores_other_credentials(self):
+        self.session.warm("me@example.com", "secret-2")
+        self.assertIsNone(self.session.take("me@example.com", "other", timeout=0))
+    
+    def test_close_does_not_wait_for_quit(self):
+        self.session.warm("me@example.com", "secret-3")
+        self.session._ready.wait(5)
+        
+        started = time.perf_counter()
+        self.session.close()
+        self.assertLess(time.perf_counter() - started, 0.25)
+        self.assertTrue(self.servers[0].closed.wait(5))
+
+    
+    def stalled_noop(self) -> FakeServer:
+        """Release a warm server to the keepalive and stall its next NOOP"""
+        self.session.KEEPALIVE_SECONDS = 0.01
+        server = FakeServer()
+        server.sock = object()
+        server.release_noop.clear()
+        self.addCleanup(server.release_noop.set)
+        self.session.release(server, "me@example.com", "secret-4")
+        self.assertTrue(server.in_noop.wait(5))
+        return server
+    
+    def test_stalled_noop_does_not_block_close(self):
+        server = self.stalled_noop()
+        started = time.perf_counter()
+        self.session.close()
+        self.session.warm("me@example.com", "secret-5")
+        self.assertLess(time.perf_counter() - started, 0.25)
+        
+        # QUIT waits for the NOOP rather than interleaving with it
+        self.assertFalse(server.closed.wait(0.1))
+        server.release_noop.set()
+        self.assertTrue(server.closed.wait(5))
+    
+    def test_take_waits_for_a_noop_in_flight(self):
+        server = self.stalled_noop()
+        taken = []
+        thread = threading.Thread(
+            target=lambda: taken.append(self.session.take("me@example.com", "secret-4")))
+        thread.start()
+        time.sleep(0.1)
+        self.assertEqual(taken, [])
+        
+        server.release_noop.set()
+        thread.join(5)
+        self.assertEqual(taken, [server])
+
+
+if __name__ == "__main__":
+    unittest.main()
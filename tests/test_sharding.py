@@ -0,0 +1,62 @@
+"""Tests for SenderAccount health and the shared ShardedSender"""
+
+import time
+import unittest
+from unittest import mock
+
+from email_generator_bot import AdaptiveSender, SenderAccount, SendResult, ShardedSender
+
+
+def reply(code: int, text: str = "") -> SendResult:
+    return SendResult.from_reply(code, text, f"{code} {text}")
+
+
+class SenderAccountTests(unittest.TestCase):
+    
+    def setUp(self):
+        self.account = SenderAccount("me@example.com", "secret")
+    
+    def test_per_recipient_4xx_does_not_cool_down(self):
+        self.account.record([reply(450, "4.2.1 Mailbox busy"), SendResult.sent()])
+        self.assertEqual(self.account.disabled_until, 0.0)
+        self.assertEqual(self.account.failures, 0)
+        self.assertEqual(self.account.sent_today, 1)
+    
+    def test_session_level_failures_cool_down(self):
+        dropped = SendResult(False, "Connection lost", None, "", "transient")
+        for result in (reply(421, "Service not available"), reply(454, "TLS not available"),
+                       dropped):
+            with self.subTest(result=result):
+                account = SenderAccount("me@example.com", "secret")
+                account.record([result, SendResult.sent()])
+                self.assertGreater(account.disabled_until, time.time())
+                self.assertEqual(account.failures, 1)
+    
+    def test_auth_failure_cools_down(self):
+        self.account.record([reply(535, "5.7.8 Bad credentials")])
+        self.assertGreater(self.account.disabled_until, time.time())
+
+
+class SharedSenderTests(unittest.TestCase):
+    
+    def setUp(self):
+        patcher = mock.patch.object(AdaptiveSender, "shared")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(setattr, ShardedSender, "_shared", None)
+        ShardedSender._shared = None
+    
+    def test_edited_weight_and_limit_reach_kept_accounts(self):
+        config = {"email": "me@example.com", "password": "secret"}
+        sender = ShardedSender.shared([dict(config, weight=1, daily_limit=100)])
+        account = sender.accounts[0]
+        account.sent_today = 40
+        
+        again = ShardedSender.shared([dict(config, weight=3, daily_limit=50)])
+        self.assertIs(again.accounts[0], account)
+        self.assertEqual((account.weight, account.daily_limit), (3.0, 50))
+        self.assertEqual(account.sent_today, 40)
+
+
+if __name__ == "__main__":
+    unittest.main()
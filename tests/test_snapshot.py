@@ -0,0 +1,77 @@
+"""Tests for SessionSnapshot"""
+
+import os
+import tempfile
+import unittest
+
+from email_generator_bot import EmailTemplate, SessionSnapshot, TemplateCache
+
+STATE = {
+    "screen": "preview",
+    "template_id": "leave_request",
+    "form_values": {"name": "Ann", "reason": "Line one\nLine two"},
+    "preview": {"recipient_email": "hr@example.com"},
+}
+
+
+class SessionSnapshotTests(unittest.TestCase):
+    
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "session.snapshot")
+    
+    def corrupt(self, offset: int):
+        """Flip every bit of one byte of the saved file"""
+        with open(self.path, "r+b") as f:
+            f.seek(offset)
+            value = f.read(1)[0]
+            f.seek(offset)
+            f.write(bytes([value ^ 0xFF]))
+    
+    def test_round_trip(self):
+        self.assertTrue(SessionSnapshot.save(STATE, self.path))
+        self.assertEqual(SessionSnapshot.load(self.path), STATE)
+        # Written through a temp file, which does not stay behind
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["session.snapshot"])
+    
+    def test_template_trees_survive_the_round_trip(self):
+        template = EmailTemplate("Snapshot test", "Hi {snapshot_name}{#if x}!{/if}", [])
+        template.compile()
+        state = dict(STATE, template_cache=TemplateCache.export(template.sources()))
+        SessionSnapshot.save(state, self.path)
+        
+        trees = SessionSnapshot.load(self.path)["template_cache"]
+        key = TemplateCache.digest(template.template)
+        self.assertEqual(TemplateCache._nodes_from_json(trees[key]),
+                         TemplateCache.parse(template.template))
+    
+    def test_corrupt_payload_is_discarded(self):
+        SessionSnapshot.save(STATE, self.path)
+        self.corrupt(os.path.getsize(self.path) - 1)
+        self.assertIsNone(SessionSnapshot.load(self.path))
+        self.assertFalse(os.path.exists(self.path))
+    
+    def test_unknown_format_is_discarded(self):
+        # The magic bytes, then the version byte
+        for offset in (0, len(SessionSnapshot.MAGIC)):
+            with self.subTest(offset=offset):
+                SessionSnapshot.save(STATE, self.path)
+                self.corrupt(offset)
+                self.assertIsNone(SessionSnapshot.load(self.path))
+                self.assertFalse(os.path.exists(self.path))
+    
+    def test_unknown_screen_is_rejected(self):
+        SessionSnapshot.save(dict(STATE, screen="settings"), self.path)
+        self.assertIsNone(SessionSnapshot.load(self.path))
+    
+    def test_missing_file_is_a_cold_start(self):
+        self.assertIsNone(SessionSnapshot.load(self.path))
+    
+    def test_save_failure_returns_false(self):
+        path = os.path.join(self.path, "missing", "session.snapshot")
+        self.assertFalse(SessionSnapshot.save(STATE, path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,170 @@
+"""Tests for the template engine, partials and layouts"""
+
+import unittest
+from unittest import mock
+
+import email_generator_bot
+from email_generator_bot import (EmailTemplate, EmailTemplateLibrary, TemplateCache,
+                                 TemplatePartials, compile_template, escape_html,
+                                 parse_template)
+
+
+class TemplateBlockTests(unittest.TestCase):
+    
+    def render(self, source: str, values: dict) -> str:
+        return compile_template(source)(values)
+    
+    def test_missing_placeholders_are_left_in_place(self):
+        self.assertEqual(self.render("{missing} {x}", {"x": "1"}), "{missing} 1")
+    
+    def test_if_uses_else_for_blank_values(self):
+        source = "Hi {name}{#if title}, {title}{#else}!{/if}"
+        self.assertEqual(self.render(source, {"name": "Ann", "title": "Dr"}), "Hi Ann, Dr")
+        self.assertEqual(self.render(source, {"name": "Ann", "title": "  "}), "Hi Ann!")
+        self.assertEqual(self.render(source, {"name": "Ann"}), "Hi Ann!")
+    
+    def test_standalone_block_tags_leave_no_blank_lines(self):
+        self.assertEqual(self.render("a\n{#if x}\nyes\n{/if}\nb", {}), "a\nb")
+        self.assertEqual(self.render("a\n{#if x}\nyes\n{/if}\nb", {"x": "1"}), "a\nyes\nb")
+    
+    def test_each_splits_lines_and_strips_list_markers(self):
+        source = "{#each items}- {.}\n{/each}"
+        self.assertEqual(self.render(source, {"items": "1. one\n\n* two\n"}), "- one\n- two\n")
+        self.assertEqual(self.render(source, {"items": ["x", "y"]}), "- x\n- y\n")
+        self.assertEqual(self.render(source, {"items": ""}), "")
+    
+    def test_nested_blocks_see_the_loop_item(self):
+        source = "{#each items}{#if flag}[{.}]{#else}{.}{/if}{/each}"
+        self.assertEqual(self.render(source, {"items": "a\nb", "flag": "1"}), "[a][b]")
+        self.assertEqual(self.render("{#each a}{#each b}{.}{/each}{/each}",
+                                     {"a": "1\n2", "b": "z"}), "zz")
+    
+    def test_malformed_blocks_raise(self):
+        for source, message in [("{#if a}", "Unclosed"),
+                                ("{/if}", "Unexpected"),
+                                ("{#else}", "Unexpected"),
+                                ("{#each a}{#else}{/each}", "Unexpected"),
+                                ("{#if a}{/each}", "Unexpected")]:
+            with self.subTest(source=source):
+                with self.assertRaisesRegex(ValueError, message):
+                    parse_template(source)
+    
+    def test_identical_sources_share_a_renderer(self):
+        source = "{a}{#if b}{b}{/if}"
+        self.assertIs(compile_template(source), compile_template(source))
+
+    
+    def test_caches_are_bounded(self):
+        with mock.patch.object(TemplateCache, "MAX_TREES", 3), \
+                mock.patch.object(email_generator_bot, "MAX_RENDERERS", 3):
+            first = compile_template("{bounded} 0")
+            for i in range(1, 5):
+                compile_template(f"{{bounded}} {i}")
+            self.assertLessEqual(len(TemplateCache._trees), 3)
+            self.assertLessEqual(len(email_generator_bot._RENDERERS), 3)
+            self.assertNotIn(TemplateCache.digest("{bounded} 0"), TemplateCache._trees)
+            self.assertIsNot(compile_template("{bounded} 0"), first)
+    
+    def test_export_keeps_only_live_sources(self):
+        live = EmailTemplate("Live", "Hi {live_name}", [], html="<p>{live_name}</p>")
+        live.compile()
+        compile_template("{stale_name} from an old version")
+        exported = TemplateCache.export(live.sources())
+        self.assertEqual(set(exported), {TemplateCache.digest(source)
+                                         for source in live.sources()})
+        self.assertEqual(len(live.sources()), 2)
+
+class EscapeTests(unittest.TestCase):
+    
+    def test_values_are_escaped_once(self):
+        render = compile_template("<p>{name}</p>", escape_html)
+        self.assertEqual(render({"name": "<Ann & Bob>"}), "<p>&lt;Ann &amp; Bob&gt;</p>")
+    
+    def test_each_item_is_escaped_once_in_nested_blocks(self):
+        render = compile_template("{#each items}{.}{#if flag}[{.}]{/if};{/each}", escape_html)
+        self.assertEqual(render({"items": "a&b", "flag": "1"}), "a&amp;b[a&amp;b];")
+    
+    def test_plain_text_is_not_escaped(self):
+        render = compile_template("{#each items}{.}{#if flag}[{.}]{/if};{/each}")
+        self.assertEqual(render({"items": "a&b", "flag": "1"}), "a&b[a&b];")
+
+
+class PartialTestCase(unittest.TestCase):
+    """Registers partials under test names and removes them afterwards"""
+    
+    def register(self, name: str, source: str):
+        self.addCleanup(TemplatePartials._sources.pop, name, None)
+        return TemplatePartials.register(name, source)
+
+
+class PartialLayoutTests(PartialTestCase):
+    
+    def setUp(self):
+        self.register("test_layout", "Subject: {#block subject}Default{/block}\n\n"
+                                     "{#block body}Body{/block}\n--\n{>test_sig}")
+        self.register("test_sig", "{sender_name}")
+    
+    def test_extends_fills_blocks_and_keeps_defaults(self):
+        source, used = TemplatePartials.flatten(
+            "{#extends test_layout}\n{#block body}Hello {name}{/block}")
+        self.assertEqual(source, "Subject: Default\n\nHello {name}\n--\n{sender_name}")
+        self.assertEqual(used, {"test_layout", "test_sig"})
+    
+    def test_most_derived_block_wins(self):
+        self.register("test_middle", "{#extends test_layout}\n{#block subject}Middle{/block}"
+                                     "{#block body}Middle body{/block}")
+        source, used = TemplatePartials.flatten(
+            "{#extends test_middle}\n{#block body}Own body{/block}")
+        self.assertEqual(source, "Subject: Middle\n\nOwn body\n--\n{sender_name}")
+        self.assertIn("test_middle", used)
+    
+    def test_cycles_and_unknown_partials_raise(self):
+        self.register("test_a", "{>test_b}")
+        self.register("test_b", "{>test_a}")
+        with self.assertRaisesRegex(ValueError, "cycle"):
+            TemplatePartials.flatten("{>test_a}")
+        with self.assertRaisesRegex(ValueError, "Unknown partial"):
+            TemplatePartials.flatten("{>test_missing}")
+    
+    def test_template_renders_flattened_layout(self):
+        template = EmailTemplate("Test", "{#extends test_layout}\n{#block body}Hi {name}{/block}",
+                                 [])
+        self.assertEqual(template.generate({"name": "Ann", "sender_name": "Bob"}),
+                         "Subject: Default\n\nHi Ann\n--\nBob")
+
+
+class PartialReloadTests(PartialTestCase):
+    
+    def setUp(self):
+        self.register("test_signature", "{sender_name}\n{sender_title}")
+        self.template = EmailTemplate("Test", "Hello\n\n{>test_signature}", [])
+    
+    def test_register_reflattens_dependents(self):
+        self.assertEqual(self.register("test_signature", "-- {sender_name}"), 1)
+        self.assertEqual(self.template.generate({"sender_name": "Ann"}), "Hello\n\n-- Ann")
+    
+    def test_broken_partial_keeps_previous_source(self):
+        broken = "{sender_name}\n{#if sender_title}{sender_title}"
+        with self.assertRaisesRegex(ValueError, "Unclosed"):
+            TemplatePartials.register("test_signature", broken)
+        
+        self.assertEqual(TemplatePartials.get("test_signature"),
+                         "{sender_name}\n{sender_title}")
+        self.assertEqual(self.template.generate({"sender_name": "Ann", "sender_title": "CEO"}),
+                         "Hello\n\nAnn\nCEO")
+    
+    def test_apply_changes_skips_broken_partial(self):
+        templates = {"test": self.template}
+        revision = self.template.revision
+        broken = [("partial", "test_signature", "{#each items}{.}")]
+        
+        self.assertEqual(EmailTemplateLibrary.apply_changes(templates, broken, {}), set())
+        self.assertEqual(self.template.revision, revision)
+        
+        fixed = [("partial", "test_signature", "{sender_name}")]
+        self.assertEqual(EmailTemplateLibrary.apply_changes(templates, fixed, {}), {"test"})
+        self.assertEqual(self.template.generate({"sender_name": "Ann"}), "Hello\n\nAnn")
+
+
+if __name__ == "__main__":
+    unittest.main()
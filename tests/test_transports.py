@@ -0,0 +1,268 @@
+"""Tests for the local file transports and their batched fsync"""
+
+import mailbox
+import os
+import smtplib
+import tempfile
+import unittest
+from unittest import mock
+
+from email_generator_bot import (EmailSender, MaildirTransport, MboxTransport, SMTPTransport,
+                                 SpoolTransport)
+
+
+def message(to_email: str = "someone@example.com", body: str = "Hello") -> dict:
+    return {"to_email": to_email, "subject": "Test", "body": body}
+
+
+# ok, invalid, ok, ok (write fails), ok
+FAILING_BATCH = [message(), message("not an address"), message(), message(), message()]
+FAILING_WRITE = 3
+
+
+class FailingWrites:
+    """Mixin whose _write writes part of one message and then fails"""
+    
+    def __init__(self, *args, fail_at: int, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fail_at = fail_at
+        self.writes = 0
+    
+    def _write(self, data: bytes):
+        self.writes += 1
+        if self.writes == self.fail_at:
+            super()._write(data[:len(data) // 2])
+            raise OSError(28, "No space left on device")
+        super()._write(data)
+
+
+class FailingMbox(FailingWrites, MboxTransport):
+    pass
+
+
+class FailingMaildir(FailingWrites, MaildirTransport):
+    pass
+
+
+class LocalTransportTestCase(unittest.TestCase):
+    
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+    
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory.name, name)
+
+
+class MboxTransportTests(LocalTransportTestCase):
+    
+    def test_batch_is_readable_mbox(self):
+        transport = MboxTransport(self.path("out.mbox"), "me@example.com", fsync_every=2)
+        batch = [message(body="From the start\nFrom here"), message(body="Second")]
+        results = transport.send_batch(batch * 3)
+        transport.close()
+        
+        self.assertEqual([result.category for result in results], ["sent"] * 6)
+        box = mailbox.mbox(self.path("out.mbox"))
+        self.assertEqual(len(box), 6)
+        self.assertIn(">From here", box[0].as_string())
+    
+    def test_invalid_rows_do_not_stop_the_batch(self):
+        transport = MboxTransport(self.path("out.mbox"), "me@example.com")
+        results = transport.send_batch([message("bad"), message()])
+        transport.close()
+        
+        self.assertEqual([result.category for result in results], ["invalid", "sent"])
+        self.assertEqual(len(mailbox.mbox(self.path("out.mbox"))), 1)
+    
+    def test_write_failure_with_nothing_synced(self):
+        transport = FailingMbox(self.path("out.mbox"), "me@example.com", fail_at=FAILING_WRITE)
+        results = transport.send_batch(FAILING_BATCH)
+        transport.close()
+        
+        self.assertEqual([result.category for result in results],
+                         ["transient", "invalid", "transient", "transient", "transient"])
+        self.assertEqual(os.path.getsize(self.path("out.mbox")), 0)
+    
+    def test_write_failure_keeps_synced_messages(self):
+        transport = FailingMbox(self.path("out.mbox"), "me@example.com", fsync_every=2,
+                                fail_at=FAILING_WRITE)
+        results = transport.send_batch(FAILING_BATCH)
+        transport.close()
+        
+        self.assertEqual([result.category for result in results],
+                         ["sent", "invalid", "sent", "transient", "transient"])
+        self.assertEqual(len(mailbox.mbox(self.path("out.mbox"))), 2)
+    
+    def test_failure_keeps_existing_contents(self):
+        MboxTransport(self.path("out.mbox"), "me@example.com").send_batch([message()])
+        size = os.path.getsize(self.path("out.mbox"))
+        
+        transport = FailingMbox(self.path("out.mbox"), "me@example.com", fail_at=1)
+        results = transport.send_batch([message()])
+        self.assertEqual(results[0].category, "transient")
+        self.assertEqual(os.path.getsize(self.path("out.mbox")), size)
+        
+        # The transport reopens the file for the next batch
+        self.assertEqual(transport.send_batch([message()])[0].category, "sent")
+        transport.close()
+        self.assertEqual(len(mailbox.mbox(self.path("out.mbox"))), 2)
+
+
+class MaildirTransportTests(LocalTransportTestCase):
+    
+    def delivered(self, directory: str) -> list:
+        return os.listdir(os.path.join(directory, "new"))
+    
+    def test_batch_is_delivered_to_new(self):
+        transport = MaildirTransport(self.path("Maildir"), "me@example.com", fsync_every=2)
+        results = transport.send_batch([message()] * 5)
+        transport.close()
+        
+        self.assertEqual([result.category for result in results], ["sent"] * 5)
+        self.assertEqual(len(self.delivered(self.path("Maildir"))), 5)
+        self.assertEqual(os.listdir(self.path("Maildir/tmp")), [])
+        self.assertEqual(len(mailbox.Maildir(self.path("Maildir"))), 5)
+    
+    def test_write_failure_with_nothing_synced(self):
+        transport = FailingMaildir(self.path("Maildir"), "me@example.com",
+                                   fail_at=FAILING_WRITE)
+        results = transport.send_batch(FAILING_BATCH)
+        transport.close()
+        
+        self.assertEqual([result.category for result in results],
+                         ["transient", "invalid", "transient", "transient", "transient"])
+        self.assertEqual(self.delivered(self.path("Maildir")), [])
+        self.assertEqual(os.listdir(self.path("Maildir/tmp")), [])
+    
+    def test_write_failure_keeps_synced_messages(self):
+        transport = FailingMaildir(self.path("Maildir"), "me@example.com", fsync_every=2,
+                                   fail_at=FAILING_WRITE)
+        results = transport.send_batch(FAILING_BATCH)
+        transport.close()
+        
+        sent = sum(result.category == "sent" for result in results)
+        self.assertEqual([result.category for result in results],
+                         ["sent", "invalid", "sent", "transient", "transient"])
+        self.assertEqual(len(self.delivered(self.path("Maildir"))), sent)
+        self.assertEqual(os.listdir(self.path("Maildir/tmp")), [])
+
+
+class SpoolTransportTests(LocalTransportTestCase):
+    
+    def test_only_complete_files_are_visible(self):
+        transport = SpoolTransport(self.path("spool"), "me@example.com", fsync_every=3)
+        transport.send_batch([message()] * 4)
+        transport.close()
+        
+        names = os.listdir(self.path("spool"))
+        self.assertEqual(len(names), 4)
+        self.assertTrue(all(name.endswith(".eml") for name in names))
+
+
+class SerializationTests(LocalTransportTestCase):
+    
+    def serialize_both(self, subject: str, body: str) -> tuple:
+        """The fast path's bytes and the email package's, for the same message"""
+        transport = MboxTransport(self.path("out.mbox"), "me@example.com")
+        date, message_id = transport.stamp()
+        boundary = EmailSender.new_boundary()
+        with mock.patch.object(EmailSender, "new_boundary", return_value=boundary):
+            fast = transport.serialize_plain("me@example.com", "you@example.com",
+                                             subject, body, date, message_id)
+            msg, _ = EmailSender.prepare_message("me@example.com", "you@example.com",
+                                                 subject, body)
+        msg["Date"] = date
+        msg["Message-ID"] = message_id
+        return fast, transport.serialize(msg)
+    
+    def test_plain_layout_matches_build_message(self):
+        for body in ("Hello", "Line one\nLine two\n", "From here\n\nregards"):
+            with self.subTest(body=body):
+                fast, slow = self.serialize_both("Test", body)
+                self.assertEqual(fast, slow)
+    
+    def test_non_ascii_falls_back_to_the_email_package(self):
+        fast, slow = self.serialize_both("Grüße", "Café at noon")
+        self.assertIsNone(fast)
+        self.assertIn(b"Subject: =?utf-8?", slow)
+        self.assertIn(b"Message-ID: <", slow)
+    
+    def test_archived_messages_carry_date_and_message_id(self):
+        transport = MboxTransport(self.path("out.mbox"), "me@Example.COM")
+        transport.send_batch([message(), message(body="Grüße")])
+        transport.close()
+        
+        box = mailbox.mbox(self.path("out.mbox"))
+        ids = [item["Message-ID"] for item in box]
+        self.assertEqual(len(set(ids)), 2)
+        self.assertTrue(all(value.endswith("@example.com>") for value in ids))
+        self.assertTrue(all(item["Date"] for item in box))
+
+
+class FakeSMTP:
+    """Accepts messages until `fail_at`, then raises `error` (dropping the socket if asked)"""
+    
+    def __init__(self, fail_at: int = 0, error: Exception = None, disconnect: bool = False):
+        self.sock = object()
+        self.fail_at = fail_at
+        self.error = error
+        self.disconnect = disconnect
+        self.sent = []
+    
+    def send_message(self, msg):
+        if len(self.sent) + 1 == self.fail_at:
+            self.fail_at = 0
+            if self.disconnect:
+                self.sock = None
+            raise self.error
+        self.sent.append(msg["To"])
+    
+    def quit(self):
+        self.sock = None
+
+
+class SMTPTransportTests(unittest.TestCase):
+    
+    BATCH = [message("a@example.com"), message("not an address"), message("b@example.com"),
+             message("c@example.com")]
+    
+    def send(self, connect) -> list:
+        with mock.patch.object(EmailSender, "connect", connect):
+            results = SMTPTransport("me@example.com", "secret").send_batch(self.BATCH)
+        return [result.category for result in results]
+    
+    def test_all_sent(self):
+        server = FakeSMTP()
+        self.assertEqual(self.send(lambda *args, **kwargs: server),
+                         ["sent", "invalid", "sent", "sent"])
+        self.assertEqual(server.sent, ["a@example.com", "b@example.com", "c@example.com"])
+    
+    def test_login_failure_fails_every_valid_message(self):
+        def connect(*args, **kwargs):
+            raise smtplib.SMTPAuthenticationError(535, b"5.7.8 Username and Password not accepted")
+        
+        self.assertEqual(self.send(connect), ["auth", "invalid", "auth", "auth"])
+    
+    def test_refused_message_does_not_stop_the_batch(self):
+        error = smtplib.SMTPRecipientsRefused({"b@example.com": (550, b"5.1.1 No such user")})
+        server = FakeSMTP(fail_at=2, error=error)
+        self.assertEqual(self.send(lambda *args, **kwargs: server),
+                         ["sent", "invalid", "permanent", "sent"])
+    
+    def test_dropped_session_marks_the_rest_transient(self):
+        server = FakeSMTP(fail_at=2, error=smtplib.SMTPServerDisconnected("Connection lost"),
+                          disconnect=True)
+        self.assertEqual(self.send(lambda *args, **kwargs: server),
+                         ["sent", "invalid", "transient", "transient"])
+        self.assertEqual(server.sent, ["a@example.com"])
+    
+    def test_rate_limit_reply(self):
+        error = smtplib.SMTPDataError(421, b"4.7.0 Try again later")
+        server = FakeSMTP(fail_at=1, error=error)
+        self.assertEqual(self.send(lambda *args, **kwargs: server),
+                         ["rate_limited", "invalid", "sent", "sent"])
+
+
+if __name__ == "__main__":
+    unittest.main()
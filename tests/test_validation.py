@@ -0,0 +1,192 @@
+"""Tests for recipient and merge data validation"""
+
+import csv
+import os
+import tempfile
+import unittest
+
+from email_generator_bot import (EmailSender, EmailTemplate, MergeCheck, MergeReport,
+                                 MergeTable, MergeValidator, RecipientValidator,
+                                 TemplateField)
+
+
+class RecipientValidatorTests(unittest.TestCase):
+    
+    def test_normalize_keeps_local_part_and_folds_domain(self):
+        self.assertEqual(RecipientValidator.normalize("Ann <Ann@Example.COM>"),
+                         ("Ann@example.com", ""))
+    
+    def test_normalize_encodes_internationalized_domains(self):
+        self.assertEqual(RecipientValidator.normalize("a@bücher.de"),
+                         ("a@xn--bcher-kva.de", ""))
+        self.assertEqual(RecipientValidator.normalize("a@xn--bcher-kva.de."),
+                         ("a@xn--bcher-kva.de", ""))
+    
+    def test_normalize_rejects_with_reason(self):
+        cases = {
+            " ": "empty address",
+            "noat": "missing '@'",
+            "<a@b.com": "unbalanced angle brackets",
+            "bücher@x.com": "non-ASCII local part",
+            "a..b@x.com": "invalid characters in local part",
+            "a@b": "invalid domain",
+            "x@-bad.com": "invalid domain",
+            f"{'a' * 65}@x.com": "local part too long",
+        }
+        for address, reason in cases.items():
+            with self.subTest(address=address):
+                self.assertEqual(RecipientValidator.normalize(address), (None, reason))
+    
+    def test_validate_many_reports_rows(self):
+        report = RecipientValidator.validate_many(["a@x.com", "A@X.com", "bad", "b@y.org"])
+        self.assertEqual(report.valid, ["a@x.com", "b@y.org"])
+        self.assertEqual(report.valid_rows, [0, 3])
+        self.assertEqual(report.rejected, [(2, "bad", "missing '@'")])
+        self.assertEqual(report.duplicates, [(1, "A@x.com", 0)])
+        self.assertEqual(report.summary(), "2 valid, 1 rejected, 1 duplicates out of 4")
+        self.assertEqual(report.rejection_lines(), ["Row 3: 'bad' - missing '@'"])
+    
+    def test_validate_many_continues_a_report(self):
+        report = RecipientValidator.validate_many(["a@x.com", "bad"])
+        RecipientValidator.validate_many(["A@x.com", "b@y.org"], report)
+        self.assertEqual(report.valid_rows, [0, 3])
+        self.assertEqual(report.rejected, [(1, "bad", "missing '@'")])
+        self.assertEqual(report.duplicates, [(2, "A@x.com", 0)])
+    
+    def test_write_report(self):
+        report = RecipientValidator.validate_many(["a@x.com", "a@x.com", "bad"])
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "report.csv")
+            report.write_report(path)
+            with open(path, newline="", encoding="utf-8") as f:
+                rows = list(csv.reader(f))
+        self.assertEqual(rows, [["row", "value", "problem"],
+                                ["3", "bad", "missing '@'"],
+                                ["2", "a@x.com", "duplicate of row 1"]])
+    
+    def test_check_recipients(self):
+        self.assertEqual(EmailSender.check_recipients("a@x.com; B@Y.com"),
+                         ("a@x.com, B@y.com", ""))
+        to_email, error = EmailSender.check_recipients("a@x.com, bad")
+        self.assertIsNone(to_email)
+        self.assertIn("Row 2", error)
+
+
+
+class MergeValidatorTests(unittest.TestCase):
+    
+    FIELDS = (
+        TemplateField("name", "Name"),
+        TemplateField("tone", "Tone", "select", options=("Formal", "Casual")),
+        TemplateField("note", "Note", required=False, max_length=5),
+    )
+    
+    def test_clean_table_is_ok(self):
+        table = MergeTable.from_rows(["name", "tone", "note"],
+                                     [["Ann", "Formal", ""], ["Bob", "Casual", "hi"]])
+        report = MergeValidator.validate(self.FIELDS, table)
+        self.assertTrue(report.ok)
+        self.assertEqual(report.valid_rows(), [0, 1])
+        self.assertEqual(report.summary(), "2 of 2 rows ready, 0 with problems")
+    
+    def test_problems_are_flagged_per_row_and_field(self):
+        table = MergeTable.from_rows(["name", "tone", "note"],
+                                     [["Ann", "Loud", ""],
+                                      [" ", "Formal", "too long"],
+                                      ["Cy", "Casual", "ok"]])
+        report = MergeValidator.validate(self.FIELDS, table)
+        
+        self.assertEqual(report.errors_for(0), ["tone"])
+        self.assertEqual(report.errors_for(1), ["name", "note"])
+        self.assertEqual(report.errors_for(2), [])
+        self.assertEqual(report.failed_rows, 2)
+        self.assertEqual(report.problems, {("tone", MergeReport.NOT_AN_OPTION): 1,
+                                           ("name", MergeReport.MISSING): 1,
+                                           ("note", MergeReport.TOO_LONG): 1})
+    
+    def test_missing_required_column_fails_every_row(self):
+        table = MergeTable.from_rows(["tone"], [["Formal"], ["Casual"]])
+        report = MergeValidator.validate(self.FIELDS, table)
+        self.assertEqual(report.missing_columns, ["name"])
+        self.assertEqual(report.failed_rows, 2)
+        self.assertEqual(report.report_lines()[0], "Missing column: name")
+    
+    def test_unreadable_rows_are_reported_apart(self):
+        table = MergeTable({"name": ["Ann", ""], "tone": ["Formal", ""]}, 2,
+                           {1: "Line 2: not valid JSON"})
+        report = MergeValidator.validate(self.FIELDS, table)
+        self.assertEqual(report.problems, {})
+        self.assertFalse(report.ok)
+        self.assertEqual(report.failed_rows, 1)
+        self.assertEqual(report.valid_rows(), [0])
+        self.assertEqual(report.report_lines(),
+                         ["1 rows unreadable (e.g. Line 2: not valid JSON)"])
+    
+    def test_wide_templates_fall_back_to_python_ints(self):
+        fields = [TemplateField(f"f{i}", f"F{i}") for i in range(70)]
+        table = MergeTable({f"f{i}": ["x"] for i in range(69)}, 1)
+        report = MergeValidator.validate(fields, table)
+        self.assertEqual(report.errors_for(0), ["f69"])
+    
+    def test_check_values(self):
+        problems = MergeValidator.check_values(self.FIELDS, {"name": "Ann", "tone": "Loud",
+                                                             "note": "toolong"})
+        self.assertEqual([(field.name, problem) for field, problem in problems],
+                         [("tone", MergeReport.NOT_AN_OPTION), ("note", MergeReport.TOO_LONG)])
+
+
+
+class MergeCheckTests(unittest.TestCase):
+    
+    SOURCE = ("recipient_email,name\n"
+              "ann@Example.com,Ann\n"
+              "bad,Bob\n"
+              "ANN@example.com,Ann again\n"
+              ",Di\n"
+              "cy@example.com,\n"
+              "ed@example.com,Ed\n")
+    
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "people.csv")
+        with open(self.path, "w", encoding="utf-8", newline="") as f:
+            f.write(self.SOURCE)
+        self.template = EmailTemplate(
+            "Hello", "To: {recipient_email}\nSubject: Hi\n\nHello {name}",
+            [TemplateField("recipient_email", "To"), TemplateField("name", "Name")])
+    
+    def test_whole_file_is_checked_across_batches(self):
+        check = MergeCheck(self.path, self.template, batch_size=2).run()
+        report = check.report
+        self.assertEqual(report.row_count, 6)
+        self.assertEqual(check.ready, 2)
+        self.assertEqual(report.valid_rows(), [0, 5])
+        # The empty address is reported once, as missing
+        self.assertEqual(report.problems, {("recipient_email", "missing '@'"): 1,
+                                           ("recipient_email", MergeReport.DUPLICATE): 1,
+                                           ("recipient_email", MergeReport.MISSING): 1,
+                                           ("name", MergeReport.MISSING): 1})
+        self.assertEqual(report.samples[("recipient_email", MergeReport.DUPLICATE)], [2])
+        self.assertEqual(check.recipients.duplicates, [(2, "ANN@example.com", 0)])
+    
+    def test_batches_carry_normalized_addresses(self):
+        check = MergeCheck(self.path, self.template, batch_size=4)
+        addresses = [table.row(row)["recipient_email"]
+                     for table, report in check.batches() for row in report.valid_rows()]
+        self.assertEqual(addresses, ["ann@example.com", "ed@example.com"])
+    
+    def test_merge_report_append_offsets_rows(self):
+        fields = (TemplateField("name", "Name"),)
+        first = MergeValidator.validate(fields, MergeTable({"name": ["", "Ann"]}, 2))
+        second = MergeValidator.validate(fields, MergeTable({"name": ["Bob", ""]}, 2,
+                                                            {0: "Line 3: not valid JSON"}))
+        first.append(second)
+        self.assertEqual(first.row_count, 4)
+        self.assertEqual(first.samples[("name", MergeReport.MISSING)], [0, 3])
+        self.assertEqual(first.unreadable, {2: "Line 3: not valid JSON"})
+        self.assertEqual(first.valid_rows(), [1])
+
+
+if __name__ == "__main__":
+    unittest.main()